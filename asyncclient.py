@@ -0,0 +1,197 @@
+"""Drive many seats on many tables from one process and one asyncio event loop.
+
+Every table gets its own task, which polls the status of all our seats at that table concurrently and lets the seat
+whose turn it is act. The next poll comes as soon as the most urgent seat's *AdaptivePoller* asks for it. All
+requests share one aiohttp connection pool.
+"""
+from argparse import ArgumentParser
+import asyncio
+from collections import defaultdict
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from jsonconfig import JSONConfig
+import metrics
+from polling import AdaptivePoller
+
+
+def call_or_check(status):
+    """Default strategy, the same as *pokerclient.Player.play*: call, or check if calling is not possible."""
+    return ['call', 'check']
+
+
+class AsyncPlayer(object):
+    """One seat: the async counterpart of *pokerclient.Player*, using a session shared with other seats."""
+
+    def __init__(self, session, base_url, playername, UUID, tablename, strategy=call_or_check, poller=None):
+        self.session = session
+        self.base_url = base_url
+        self.playername = playername
+        self.UUID = UUID
+        self.tablename = tablename
+        self.strategy = strategy
+        self.poller = poller or AdaptivePoller(playername)
+        self.seat = None
+        self.status = None
+        self.status_etag = None
+
+    async def request(self, method, path, **kwargs):
+        """Send a request and return (status code, decoded JSON or text, ETag header)."""
+        async with self.session.request(method, self.base_url + path, **kwargs) as response:
+            etag = response.headers.get('ETag')
+            if response.content_type == 'application/json':
+                return response.status, await response.json(), etag
+            return response.status, await response.text(), etag
+
+    async def join_table(self, info):
+        """Take a free seat at the table described by *info* (an entry of /tables), unless we already sit there."""
+        if self.seat is not None:
+            return
+        for position, name in info['players'].items():
+            if name == self.playername:
+                self.seat = int(position)
+                return
+        for i in range(1, info['max_player_count'] + 1):
+            if str(i) not in info['players']:
+                with metrics.timer('http_join_seconds'):
+                    status, text, etag = await self.request('POST', '/table/' + self.tablename + '/actions/join',
+                                                            params={'uuid': self.UUID}, json={'position': i})
+                if status == 200:
+                    self.seat = i
+                    info['players'][str(i)] = self.playername
+                return
+
+    async def table_action(self, action, data=None):
+        with metrics.timer('http_action_seconds'):
+            status, text, etag = await self.request('POST', '/table/' + self.tablename + '/actions/' + action,
+                                                    params={'uuid': self.UUID}, json=data)
+        return status
+
+    async def get_table_status(self):
+        headers = {'If-None-Match': self.status_etag} if self.status_etag else {}
+        with metrics.timer('http_status_seconds'):
+            status, body, etag = await self.request('GET', '/table/' + self.tablename, params={'uuid': self.UUID},
+                                                    headers=headers)
+        if status == 304:
+            metrics.count('http_not_modified_total')
+            return self.status
+        if status == 200:
+            self.status = body
+            self.status_etag = etag
+            return body
+        return status
+
+    async def act(self, status):
+        """Try the actions proposed by the strategy in order, until the server accepts one."""
+        for action in self.strategy(status):
+            data = None
+            if isinstance(action, tuple):
+                action, data = action
+            if await self.table_action(action, data) == 200:
+                self.poller.acted()
+                return action
+        return None
+
+
+class MultiTableClient(object):
+    """Play all *seats*, a list of (playername, UUID, tablename), concurrently in one event loop.
+
+    *poll_interval* is the regular interval between two polls of a table; it shrinks when the action approaches
+    one of our seats and grows up to *max_interval* while none of our seats takes part in a hand.
+    """
+
+    def __init__(self, base_url, seats, strategy=call_or_check, poll_interval=0.3, max_interval=2.0,
+                 connection_limit=100, timeout=2.0):
+        if aiohttp is None:
+            raise ImportError('asyncclient needs aiohttp')
+        self.base_url = base_url
+        self.seats = seats
+        self.strategy = strategy
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.connection_limit = connection_limit
+        self.timeout = timeout
+        self.players = []
+        self.stopped = None
+
+    async def table_loop(self, tablename, players, ticks):
+        tick = 0
+        while not self.stopped.is_set() and (ticks is None or tick < ticks):
+            tick += 1
+            if any(p.seat is None for p in players):
+                await self.join(tablename, players)
+            statuses = await asyncio.gather(*(p.get_table_status() for p in players), return_exceptions=True)
+            interval = min(p.poller.next_interval(s) for p, s in zip(players, statuses))
+            turns = [p.act(s) for p, s in zip(players, statuses)
+                     if isinstance(s, dict) and s.get('current_player') == p.playername]
+            await asyncio.gather(*turns, return_exceptions=True)
+            try:
+                await asyncio.wait_for(self.stopped.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def join(self, tablename, players):
+        """Seat our players one after another from a single table listing, so they do not race for the same seat.
+        A failed listing or join is counted and left to the next tick to retry."""
+        try:
+            with metrics.timer('http_tables_seconds'):
+                status, body, etag = await players[0].request('GET', '/tables')
+            if status != 200 or not isinstance(body, dict) or not isinstance(body.get('tables'), list):
+                metrics.count('http_errors_total')
+                return
+            info = next((t for t in body['tables'] if t['name'] == tablename), None)
+            if info is None:
+                return
+            for player in players:
+                await player.join_table(info)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            metrics.count('http_errors_total')
+
+    async def run(self, ticks=None):
+        """Play until *stop* is called, or for *ticks* polls per table."""
+        self.stopped = asyncio.Event()
+        connector = aiohttp.TCPConnector(limit=self.connection_limit)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            by_table = defaultdict(list)
+            for playername, UUID, tablename in self.seats:
+                poller = AdaptivePoller(playername, min_interval=min(0.02, self.poll_interval),
+                                        base_interval=self.poll_interval, max_interval=self.max_interval)
+                by_table[tablename].append(
+                    AsyncPlayer(session, self.base_url, playername, UUID, tablename, self.strategy, poller))
+            self.players = [p for players in by_table.values() for p in players]
+            # a table whose loop fails stops alone, the other tables keep playing
+            results = await asyncio.gather(*(self.table_loop(t, players, ticks) for t, players in by_table.items()),
+                                           return_exceptions=True)
+            for tablename, result in zip(by_table, results):
+                if isinstance(result, Exception):
+                    metrics.count('table_loop_errors_total')
+                    print('stopped playing at {}: {!r}'.format(tablename, result))
+
+    def stop(self):
+        self.stopped.set()
+
+    def report(self):
+        """Return the latency statistics of every seat, see *AdaptivePoller.report*."""
+        return {p.playername: p.poller.report() for p in self.players}
+
+
+if __name__ == '__main__':
+    argparser = ArgumentParser(description='play many seats on many tables from one process')
+    argparser.add_argument('seats', type=str, nargs='+', help='seats as <playername>:<tablename>')
+    argparser.add_argument('-b', '--base_url', type=str, default='http://pokerserver.retreat.tngtech.com:5555')
+    argparser.add_argument('-c', '--configfile', type=str, default='.config')
+    argparser.add_argument('-i', '--interval', type=float, default=0.3, help='seconds between two status polls')
+    metrics.add_arguments(argparser)
+    args = argparser.parse_args()
+    metrics.start_from_args(vars(args))
+
+    config = JSONConfig(args.configfile)
+    seats = []
+    for seat in args.seats:
+        playername, tablename = seat.split(':')
+        seats.append((playername, config.get('players', playername), tablename))
+    asyncio.run(MultiTableClient(args.base_url, seats, poll_interval=args.interval).run())
@@ -0,0 +1,237 @@
+"""Reproducible speed benchmark of hand evaluation and equity calculation.
+
+Every evaluator runs over fixed-seed corpora of 5, 6 and 7 card hands: uniformly random hands, and adversarial ones
+that stress particular code paths (many pairs, wheel straights, flushes). Results are written as JSON with the rate
+and the per call latency percentiles of every case, and can be compared against a stored baseline to catch
+regressions before a deploy:
+
+    python benchmark.py --save            # store the current results as baseline
+    python benchmark.py --compare         # exit with status 1 if a case got slower than the baseline allows
+
+The cold start of the client entry points is measured as well: the time a fresh interpreter needs to import them,
+which every bot restart pays before it can act. *--compare* also fails if it exceeds *STARTUP_TARGET_MS*.
+"""
+from argparse import ArgumentParser
+from functools import partial
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import equity
+from polling import percentiles
+import preflop
+import ranking
+import ranktables
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+SIZES = (5, 6, 7)
+STARTUP_MODULES = ('pokerclient', 'client')
+# milliseconds an entry point may take to import, on top of starting an empty interpreter
+STARTUP_TARGET_MS = 75
+
+# name, input ('str' for card strings, 'int' for integer codes), function of one hand
+SCALAR_CASES = [
+    ('parse_cards', 'str', ranking.parse_cards),
+    ('find_high_card', 'str', ranking.find_high_card),
+    ('find_pair', 'str', partial(ranking.find_n_of_a_kind, 2)),
+    ('find_two_pairs', 'str', ranking.find_two_pairs),
+    ('find_three_of_a_kind', 'str', partial(ranking.find_n_of_a_kind, 3)),
+    ('find_straight', 'str', ranking.find_straight),
+    ('find_flush', 'str', ranking.find_flush),
+    ('find_full_house', 'str', ranking.find_full_house),
+    ('find_four_of_a_kind', 'str', partial(ranking.find_n_of_a_kind, 4)),
+    ('find_straight_flush', 'str', ranking.find_straight_flush),
+    ('rank_function', 'str', ranking.rank_function),
+    ('ranking.evaluate', 'int', ranking.evaluate),
+    ('ranktables.evaluate', 'int', ranktables.evaluate),
+]
+
+
+def random_hands(count, cards=7, seed=0):
+    """Return a (count, cards) array of random hands without duplicate cards, reproducible for a given *seed*."""
+    rng = np.random.default_rng(seed)
+    return np.argsort(rng.random((count, 52)), axis=1)[:, :cards]
+
+
+def _complete(rng, fixed, cards):
+    """Fill up the cards *fixed* for a hand with random other cards and shuffle the hand."""
+    hand = fixed + rng.sample([c for c in ranking.deck if c not in fixed], cards - len(fixed))
+    rng.shuffle(hand)
+    return hand
+
+
+def paired_hands(count, cards=7, seed=0):
+    """Hands made of pairs only (two or three pairs, plus a single card for odd sizes)."""
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(count):
+        ranks = rng.sample(range(13), (cards + 1) // 2)
+        hand = [4 * r + s for r in ranks for s in rng.sample(range(4), 2)][:cards]
+        rng.shuffle(hand)
+        hands.append(hand)
+    return np.array(hands)
+
+
+def wheel_hands(count, cards=7, seed=0):
+    """Hands containing an ace-to-five straight."""
+    rng = random.Random(seed)
+    return np.array([_complete(rng, [4 * r + rng.randrange(4) for r in (12, 0, 1, 2, 3)], cards)
+                     for _ in range(count)])
+
+
+def flush_hands(count, cards=7, seed=0):
+    """Hands containing at least five cards of one suit."""
+    rng = random.Random(seed)
+    hands = []
+    for _ in range(count):
+        suit = rng.randrange(4)
+        hands.append(_complete(rng, [4 * r + suit for r in rng.sample(range(13), 5)], cards))
+    return np.array(hands)
+
+
+CORPORA = {
+    'random': random_hands,
+    'pairs': paired_hands,
+    'wheel': wheel_hands,
+    'flush': flush_hands,
+}
+
+
+def measure(function, inputs, repeat=3, units=1):
+    """Call *function* on every element of *inputs*, *repeat* times over.
+
+    Return the rate of the fastest pass in *units* per second (*units* per call, e.g. the hands in a batch), and
+    the percentiles of the per call latency in microseconds of that pass.
+    """
+    clock = time.perf_counter
+    best = None
+    for _ in range(repeat):
+        times = []
+        for item in inputs:
+            start = clock()
+            function(item)
+            times.append(clock() - start)
+        if best is None or sum(times) < sum(best):
+            best = times
+    return {'rate': len(best) * units / sum(best), 'latency_us': percentiles([t * 1e6 for t in best], (50, 95, 99))}
+
+
+def exact_uncached(hole, board, opponents):
+    equity._exact_odds.cache_clear()
+    return equity.exact_odds(hole, board, opponents)
+
+
+def equity_cases(hands, calls):
+    """Yield (name, function, inputs, units) of the equity paths, with situations taken from 7 card *hands*."""
+    hands = hands[:calls].tolist()
+    flops = [(h[:2], h[2:5]) for h in hands]
+    rivers = [(h[:2], h[2:7]) for h in hands]
+    samples = 2000
+    monte_carlo = partial(equity.monte_carlo_odds, opponents=2, target_error=0, time_budget=float('inf'),
+                          max_samples=samples, batch_size=samples, workers=1, seed=0)
+    yield 'equity.monte_carlo_odds', lambda s: monte_carlo(*s), flops, samples
+    yield 'equity.exact_odds', lambda s: exact_uncached(s[0], s[1], 1), rivers, 1
+    yield 'preflop.preflop_odds', lambda s: preflop.preflop_odds(s[0], 2), flops, 1
+
+
+def startup_time(module, repeat=5):
+    """Return the milliseconds a fresh interpreter needs to import *module*, less the start of an empty one; the
+    fastest of *repeat* runs counts for both."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+
+    def fastest(code):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=directory, check=True)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    return max(fastest('import ' + module) - fastest('pass'), 0.0) * 1000
+
+
+def run(count=2000, sizes=SIZES, corpora=tuple(CORPORA), seed=0, repeat=3, batch_size=500, equity_calls=20):
+    """Run all cases and return a dict of their results, keyed by '<corpus>/<cards>/<case>' or '<case>'."""
+    results = {}
+    for name in corpora:
+        for cards in sizes:
+            hands = CORPORA[name](count, cards, seed)
+            inputs = {'int': hands.tolist()}
+            inputs['str'] = [ranking.decode_cards(h) for h in inputs['int']]
+            for case, kind, function in SCALAR_CASES:
+                results['{}/{}/{}'.format(name, cards, case)] = dict(measure(function, inputs[kind], repeat),
+                                                                    unit='hands/s')
+            batches = [hands[i:i + batch_size] for i in range(0, count, batch_size)]
+            results['{}/{}/rank_many'.format(name, cards)] = dict(
+                measure(ranking.rank_many, batches, repeat, units=batch_size), unit='hands/s')
+    for case, function, inputs, units in equity_cases(random_hands(equity_calls, 7, seed), equity_calls):
+        results[case] = dict(measure(function, inputs, repeat, units), unit='samples/s' if units > 1 else 'calls/s')
+    for module in STARTUP_MODULES:
+        ms = startup_time(module, max(repeat, 5))
+        results['startup/' + module] = {'rate': 1000 / max(ms, 1e-3), 'ms': ms, 'unit': 'starts/s'}
+    return {
+        'settings': {'count': count, 'seed': seed, 'repeat': repeat, 'batch_size': batch_size,
+                     'equity_calls': equity_calls},
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor()},
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance=0.25):
+    """Return (case, baseline rate, rate) of every case of *report* that is more than *tolerance* (a fraction)
+    slower than in the *baseline* report. Cases missing from either side are ignored."""
+    regressions = []
+    for case, result in sorted(report['results'].items()):
+        reference = baseline['results'].get(case)
+        if reference and result['rate'] < reference['rate'] * (1 - tolerance):
+            regressions.append((case, reference['rate'], result['rate']))
+    return regressions
+
+
+def over_target(report, target_ms=STARTUP_TARGET_MS):
+    """Return (case, milliseconds) of every startup case of *report* slower than *target_ms*."""
+    return [(case, result['ms']) for case, result in sorted(report['results'].items())
+            if case.startswith('startup/') and result['ms'] > target_ms]
+
+
+if __name__ == '__main__':
+    argparser = ArgumentParser(description='measure hand evaluation and equity speed')
+    argparser.add_argument('-n', '--hands', type=int, default=2000, help='number of hands per corpus')
+    argparser.add_argument('-c', '--cards', type=int, nargs='+', default=SIZES, help='cards per hand (5 to 7)')
+    argparser.add_argument('--corpora', type=str, nargs='+', default=list(CORPORA), choices=list(CORPORA))
+    argparser.add_argument('-s', '--seed', type=int, default=0)
+    argparser.add_argument('-r', '--repeat', type=int, default=3, help='passes per case, the fastest one counts')
+    argparser.add_argument('-o', '--output', type=str, help='write the JSON report to this file instead of stdout')
+    argparser.add_argument('--baseline', type=str, default=BASELINE_FILE)
+    argparser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+    argparser.add_argument('--compare', action='store_true', help='compare the results against the baseline')
+    argparser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown as a fraction')
+    args = argparser.parse_args()
+
+    report = run(args.hands, args.cards, args.corpora, args.seed, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for case, reference, rate in regressions:
+            print('{:<40} {:>14,.0f} -> {:>14,.0f} {}'.format(case, reference, rate, report['results'][case]['unit']),
+                  file=sys.stderr)
+        slow_starts = over_target(report)
+        for case, ms in slow_starts:
+            print('{:<40} {:>14.1f} ms, target {} ms'.format(case, ms, STARTUP_TARGET_MS), file=sys.stderr)
+        sys.exit(1 if regressions or slow_starts else 0)
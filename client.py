@@ -1,9 +1,8 @@
-import requests
 from argparse import ArgumentParser
 import sys
 from pprint import pprint
 import time
-from ranking import *
+from polling import AdaptivePoller
 
 UUID = 'e616926e-fdba-47dc-9655-61c5a9c02626'
 base_url = 'http://pokerserver.retreat.tngtech.com:5555'
@@ -12,11 +11,13 @@ myself = 'FetteElke'
 
 
 def register_user(username):
+    import requests
     req = requests.post(base_url + "/uuid", json={'player_name': username})
     print(f'player {username} registered with uuid {req.content}')
 
 
 def get_tables(tablename=None, do_print=False):
+    import requests
     req = requests.get(base_url + "/tables")
     tables = req.json()['tables']
     if (do_print):
@@ -35,12 +36,14 @@ def get_tables(tablename=None, do_print=False):
 
 
 def join_table(tablename, position):
+    import requests
     url = base_url + '/table/' + tablename + '/actions/join?uuid=' + UUID
     req = requests.post(url, json={'position': position})
     print(req.text)
 
 
 def table_action(tablename, action, data=None):
+    import requests
     url = base_url + '/table/' + tablename + '/actions/' + action + '?uuid=' + UUID
     req = requests.post(url, json=data)
     print(req.text)
@@ -48,6 +51,7 @@ def table_action(tablename, action, data=None):
 
 
 def get_table_status(tablename, do_print=False):
+    import requests
     url = base_url + '/table/' + tablename
     req = requests.get(url)
     if do_print:
@@ -59,25 +63,31 @@ def get_table_status(tablename, do_print=False):
 
 
 def fold_loop(tablename):
+    poller = AdaptivePoller(myself)
     while True:
         status = get_table_status(tablename)
+        interval = poller.next_interval(status)
         print('table {}, current player {}'.format(tablename, status['current_player']))
         if status['current_player'] == myself:
             table_action(tablename, 'fold')
-            print('folded')
-        time.sleep(0.5)
+            poller.acted()
+            print('folded', poller.report()['reaction'])
+        time.sleep(interval)
 
 
 def call_loop(tablename):
+    poller = AdaptivePoller(myself)
     while True:
         status = get_table_status(tablename)
+        interval = poller.next_interval(status)
         print('table {}, current player {}'.format(tablename, status['current_player']))
         if status['current_player'] == myself:
             response = table_action(tablename, 'call')
             if response != 200:
                 table_action(tablename, 'check')
-            print('called')
-        time.sleep(0.5)
+            poller.acted()
+            print('called', poller.report()['reaction'])
+        time.sleep(interval)
 
 
 
@@ -0,0 +1,316 @@
+"""A local No-Limit Hold'em engine, for offline self-play and as a table of the local stand-in server.
+
+*HoldemTable* has the interface of *localserver.MockTable* and returns table states of the same shape the server does
+(see *tablestate*), with our hole cards in 'hole_cards', so strategies written against the server play here unchanged.
+Showdowns are decided with *ranking.evaluate*, including side pots of all-in players.
+
+*self_play* plays many hands between strategies, split into chunks that run on a process pool. Every chunk gets its
+own seed drawn from a master seed, so results do not depend on the number of workers.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+import random
+import threading
+import time
+
+from pokerAI import pokerAI
+import ranking
+
+STREET_CARDS = [3, 1, 1]
+
+
+class HoldemTable(object):
+    """A table of up to *max_player_count* players, dealing hands from a deck shuffled with a seeded RNG.
+
+    With *autostart* a new hand begins as soon as the previous one ended and at least two seated players have chips;
+    otherwise *start_hand* has to be called. With *rebuy* a busted player gets a new *stack* at the next hand, the
+    chips handed out are counted in *buyins*.
+
+    Actions: 'fold', 'check', 'call' (a check when there is nothing to call) and 'raise' or 'bet' with data
+    {'amount': chips put in with this action}. A raise must add at least the last raise increment (*minimum_raise*
+    in the status) on top of the highest bet, unless it puts the player all-in.
+    """
+
+    def __init__(self, name, max_player_count=6, small_blind=1, big_blind=2, stack=1000, seed=None, autostart=True,
+                 rebuy=False):
+        self.name = name
+        self.max_player_count = max_player_count
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.stack = stack
+        self.rng = random.Random(seed)
+        self.autostart = autostart
+        self.rebuy = rebuy
+        self.lock = threading.Lock()
+        self.players = {}
+        self.stacks = {}
+        self.buyins = {}
+        self.actions = []
+        self.hand_id = 0
+        self.dealer = None
+        self.in_hand = False
+        self.order = []
+        self.active = []
+        self.hole = {}
+        self.deck = []
+        self.board = []
+        self.bets = {}
+        self.invested = {}
+        self.pot = 0
+        self.acted = set()
+        self.current = None
+        self.min_raise = big_blind
+        self.winnings = {}
+
+    def info(self):
+        return {'name': self.name, 'max_player_count': self.max_player_count, 'players': dict(self.players)}
+
+    @property
+    def current_player(self):
+        return self.order[self.current] if self.in_hand and self.current is not None else None
+
+    def status(self, playername=None):
+        status = {
+            'name': self.name,
+            'players': dict(self.players),
+            'current_player': self.current_player,
+            'community_cards': ranking.decode_cards(self.board),
+            'bets': dict(self.bets),
+            'pot': self.pot,
+            'stacks': dict(self.stacks),
+            'active_players': list(self.active),
+            'hand_id': self.hand_id,
+            'small_blind': self.small_blind,
+            'big_blind': self.big_blind,
+            'minimum_raise': self.min_raise,
+            'action_count': len(self.actions),
+        }
+        if playername in self.hole:
+            status['hole_cards'] = ranking.decode_cards(self.hole[playername])
+        return status
+
+    def join(self, playername, position):
+        if not 1 <= position <= self.max_player_count:
+            return 400, 'invalid position {}'.format(position)
+        if str(position) in self.players:
+            return 409, 'position {} is taken'.format(position)
+        if playername in self.players.values():
+            return 409, 'player {} is already seated'.format(playername)
+        self.players[str(position)] = playername
+        self.stacks.setdefault(playername, self.stack)
+        self.buyins.setdefault(playername, self.stack)
+        if self.autostart and not self.in_hand:
+            self.start_hand()
+        return 200, 'joined table {} at position {}'.format(self.name, position)
+
+    def start_hand(self):
+        """Post the blinds and deal a new hand, if at least two players have chips. Return whether a hand started."""
+        if self.rebuy:
+            for name in self.players.values():
+                if self.stacks[name] == 0:
+                    self.stacks[name] = self.stack
+                    self.buyins[name] += self.stack
+        seated = sorted(self.players.items(), key=lambda item: int(item[0]))
+        self.order = [name for position, name in seated if self.stacks[name] > 0]
+        if len(self.order) < 2:
+            self.in_hand = False
+            return False
+        # the button moves to the next player after the previous one
+        positions = [int(position) for position, name in seated if self.stacks[name] > 0]
+        following = [i for i, p in enumerate(positions) if self.dealer is None or p > self.dealer]
+        dealer = following[0] if following else 0
+        self.dealer = positions[dealer]
+        self.order = self.order[dealer + 1:] + self.order[:dealer + 1]
+        if len(self.order) == 2:
+            # heads-up the button posts the small blind
+            self.order.reverse()
+        self.hand_id += 1
+        self.in_hand = True
+        self.active = list(self.order)
+        self.deck = self.rng.sample(ranking.deck, 52)
+        self.hole = {name: [self.deck.pop(), self.deck.pop()] for name in self.order}
+        self.board = []
+        self.bets = {}
+        self.invested = {name: 0 for name in self.order}
+        self.pot = 0
+        self.acted = set()
+        self.min_raise = self.big_blind
+        self._put(self.order[0], self.small_blind)
+        self._put(self.order[1], self.big_blind)
+        self.current = None
+        self._advance(2 % len(self.order) - 1)
+        return True
+
+    def _put(self, name, chips):
+        chips = min(chips, self.stacks[name])
+        self.stacks[name] -= chips
+        self.bets[name] = self.bets.get(name, 0) + chips
+        self.invested[name] += chips
+
+    def act(self, playername, action, data):
+        if not self.in_hand or self.current_player != playername:
+            return 400, 'it is not the turn of {}'.format(playername)
+        highest = max(self.bets.values(), default=0)
+        bet = self.bets.get(playername, 0)
+        to_call = highest - bet
+        if action == 'fold':
+            self.active.remove(playername)
+        elif action in ('check', 'call'):
+            if action == 'check' and to_call > 0:
+                return 400, 'can not check, {} to call'.format(to_call)
+            self._put(playername, to_call)
+        elif action in ('raise', 'bet'):
+            try:
+                amount = int((data or {})['amount'])
+            except (KeyError, TypeError, ValueError):
+                return 400, 'raise needs data {"amount": chips}'
+            stack = self.stacks[playername]
+            if amount > stack:
+                return 400, 'only {} chips left'.format(stack)
+            if amount < to_call + self.min_raise and amount < stack:
+                return 400, 'raise to at least {}'.format(highest + self.min_raise)
+            self._put(playername, amount)
+            raised = self.bets[playername] - highest
+            if raised >= self.min_raise:
+                # a full raise reopens the betting for everyone
+                self.min_raise = raised
+                self.acted = set()
+        else:
+            return 400, 'unknown action {}'.format(action)
+        self.actions.append((playername, action, data))
+        self.acted.add(playername)
+        self._advance(self.current)
+        return 200, '{} {}'.format(playername, action)
+
+    def _advance(self, last):
+        """Pass the turn on from the player at index *last* of *order*, dealing streets and ending the hand."""
+        if len(self.active) == 1:
+            self._finish()
+            return
+        highest = max(self.bets.values(), default=0)
+        pending = [name for name in self.active if self.stacks[name] > 0
+                   and (name not in self.acted or self.bets.get(name, 0) < highest)]
+        if pending:
+            n = len(self.order)
+            for i in range(1, n + 1):
+                if self.order[(last + i) % n] in pending:
+                    self.current = (last + i) % n
+                    return
+        self._next_street()
+
+    def _next_street(self):
+        self.pot += sum(self.bets.values())
+        self.bets = {}
+        self.acted = set()
+        self.min_raise = self.big_blind
+        if len(self.board) == 5:
+            self._finish()
+            return
+        for _ in range(STREET_CARDS[len(self.board) and len(self.board) - 2]):
+            self.board.append(self.deck.pop())
+        can_act = [name for name in self.active if self.stacks[name] > 0]
+        if len(can_act) < 2:
+            # nobody left to bet against, deal the rest of the board
+            self._next_street()
+            return
+        # after the flop the first active player after the button starts, heads-up that is the big blind
+        self.current = None
+        self._advance(0 if len(self.order) == 2 else -1)
+
+    def _finish(self):
+        """Award the pot, split into side pots by the amounts the active players invested, and start the next hand."""
+        self.pot += sum(self.bets.values())
+        self.bets = {}
+        self.winnings = {name: 0 for name in self.order}
+        if len(self.active) == 1:
+            self.winnings[self.active[0]] = self.pot
+        else:
+            strengths = {name: ranking.evaluate(self.hole[name] + self.board) for name in self.active}
+            previous = 0
+            for level in sorted(set(self.invested[name] for name in self.active)):
+                pot = sum(min(chips, level) - min(chips, previous) for chips in self.invested.values())
+                eligible = [name for name in self.active if self.invested[name] >= level]
+                best = max(strengths[name] for name in eligible)
+                winners = [name for name in eligible if strengths[name] == best]
+                share, odd = divmod(pot, len(winners))
+                for i, name in enumerate(winners):
+                    self.winnings[name] += share + (i < odd)
+                previous = level
+        for name, chips in self.winnings.items():
+            self.stacks[name] += chips
+        self.in_hand = False
+        self.current = None
+        if self.autostart:
+            self.start_hand()
+
+
+def call_or_check(status):
+    return ['call', 'check']
+
+
+class AIStrategy(object):
+    """Adapt *pokerAI* to the strategy interface of *asyncclient* (a function of the status returning actions).
+    The keyword arguments are passed on to *pokerAI*; sampling runs in the calling process."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('workers', 1)
+        self.ai = pokerAI(**kwargs)
+
+    def __call__(self, status):
+        self.ai.playername = status['current_player']
+        return self.ai.get_strategy(status['hole_cards'], status)
+
+
+def play(lineup, hands, seed=0, **options):
+    """Play *hands* hands between the (playername, strategy) pairs of *lineup* at one table and return the net chips
+    of every player. Strategies whose actions are all rejected fold."""
+    table = HoldemTable('self-play', max_player_count=len(lineup), seed=seed, autostart=False, rebuy=True, **options)
+    strategies = dict(lineup)
+    for position, (name, strategy) in enumerate(lineup, 1):
+        table.join(name, position)
+    for _ in range(hands):
+        table.start_hand()
+        while table.in_hand:
+            name = table.current_player
+            status = table.status(name)
+            for action in strategies[name](status):
+                data = None
+                if isinstance(action, tuple):
+                    action, data = action
+                if table.act(name, action, data)[0] == 200:
+                    break
+            else:
+                table.act(name, 'fold', None)
+    return {name: table.stacks[name] - table.buyins[name] for name in strategies}
+
+
+def self_play(lineup, hands=1000, seed=0, chunk_size=200, workers=None):
+    """Play *hands* hands in chunks of *chunk_size* (each at a fresh table with fresh stacks) on a process pool of
+    *workers* processes (1: in this process) and return a dict with the number of hands, the net chips of every
+    player and their win rate in big blinds per 100 hands. Strategies must be picklable to run in the pool."""
+    master = random.Random(seed)
+    chunks = [(lineup, min(chunk_size, hands - start), master.getrandbits(64)) for start in range(0, hands, chunk_size)]
+    if workers == 1:
+        results = [play(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(play, *zip(*chunks)))
+    net = {name: sum(r[name] for r in results) for name, strategy in lineup}
+    big_blind = HoldemTable('').big_blind
+    return {'hands': hands, 'net': net, 'bb_per_100': {name: 100 * chips / big_blind / hands for name, chips in net.items()}}
+
+
+if __name__ == '__main__':
+    argparser = ArgumentParser(description='play hands between strategies with the local engine')
+    argparser.add_argument('-n', '--hands', type=int, default=10000)
+    argparser.add_argument('-s', '--seed', type=int, default=0)
+    argparser.add_argument('-w', '--workers', type=int, help='processes, default: one per CPU')
+    argparser.add_argument('--ai_time', type=float, default=0.002, help='decision time budget of the AI in seconds')
+    args = argparser.parse_args()
+
+    lineup = [('ai', AIStrategy(time_budget=args.ai_time)), ('caller', call_or_check), ('caller2', call_or_check)]
+    start = time.perf_counter()
+    result = self_play(lineup, args.hands, args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(result)
+    print('{:.0f} hands/s'.format(args.hands / elapsed))
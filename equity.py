@@ -0,0 +1,284 @@
+"""Equity estimation: the chance to win a showdown against random opponent hands, given hole and board cards.
+
+All cards are integer-encoded (see *ranking.encode_cards*). Monte Carlo sampling is spread over a process pool, every
+task gets its own RNG stream, and sampling stops as soon as the confidence interval is narrow enough or the time
+budget is used up. On late streets the odds can instead be enumerated exactly, and *odds* picks whichever mode is
+affordable.
+"""
+from collections import namedtuple
+from functools import lru_cache
+from itertools import combinations
+import math
+import os
+import random
+import time
+
+import metrics
+import ranking
+import ranktables
+from ranktables import evaluate, evaluate_key, hand_key
+
+# z-score of the two-sided 95% confidence interval
+Z_95 = 1.96
+
+
+class Odds(namedtuple('Odds', ['win', 'tie', 'loss', 'equity', 'error', 'samples'])):
+    """Showdown probabilities of our hand. *equity* counts split pots by our share of them, *error* is the
+    half-width of the 95% confidence interval of *equity* (zero for exact results).
+    """
+    __slots__ = ()
+
+    @property
+    def interval(self):
+        return max(0.0, self.equity - self.error), min(1.0, self.equity + self.error)
+
+
+def _showdown(hero, opponents):
+    """Return our share of the pot given our strength and the strengths of all opponents."""
+    best = max(opponents)
+    if hero > best:
+        return 1.0
+    if hero < best:
+        return 0.0
+    return 1.0 / (1 + opponents.count(best))
+
+
+def simulate(hole, board, opponents, samples, seed):
+    """Play out *samples* random deals and return the totals (wins, ties, losses, equity, squared equity).
+
+    Missing board cards and the hole cards of every opponent are drawn from the cards that are neither in
+    *hole* nor on the *board*.
+    """
+    rng = random.Random(seed)
+    dead = set(hole) | set(board)
+    live = [c for c in ranking.deck if c not in dead]
+    missing = 5 - len(board)
+    draw_count = missing + 2 * opponents
+    wins = ties = losses = 0
+    total = total_sq = 0.0
+    for _ in range(samples):
+        drawn = rng.sample(live, draw_count)
+        full_board = board + drawn[:missing]
+        hero = evaluate(hole + full_board)
+        strengths = [evaluate(drawn[i:i + 2] + full_board) for i in range(missing, draw_count, 2)]
+        share = _showdown(hero, strengths)
+        if share == 1.0:
+            wins += 1
+        elif share == 0.0:
+            losses += 1
+        else:
+            ties += 1
+        total += share
+        total_sq += share * share
+    return wins, ties, losses, total, total_sq
+
+
+def _odds(totals):
+    wins, ties, losses, total, total_sq = totals
+    n = wins + ties + losses
+    equity = total / n
+    variance = max(total_sq / n - equity * equity, 0.0)
+    return Odds(wins / n, ties / n, losses / n, equity, Z_95 * math.sqrt(variance / n), n)
+
+
+_pool = None
+_pool_workers = 0
+
+
+def get_pool(workers=None):
+    """Return the shared process pool, (re)creating it when a different number of *workers* is requested.
+
+    The pool is kept alive between calls, so only the first estimate pays for starting the processes.
+    """
+    global _pool, _pool_workers
+    workers = workers or os.cpu_count() or 1
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        # multiprocessing is only imported once a pool is needed, it is a large part of the import time otherwise
+        from concurrent.futures import ProcessPoolExecutor
+        _pool = ProcessPoolExecutor(workers)
+        _pool_workers = workers
+    return _pool
+
+
+@metrics.timed('monte_carlo_seconds')
+def monte_carlo_odds(hole, board=(), opponents=1, target_error=0.01, time_budget=0.05, max_samples=200000,
+                     batch_size=500, workers=None, seed=None, stop=None):
+    """Estimate the odds of *hole* with the known *board* cards against *opponents* random hands.
+
+    Samples are drawn in rounds of one batch of *batch_size* per worker. After each round the 95% confidence
+    interval of the equity is checked: sampling stops once its half-width is at most *target_error*, after
+    *time_budget* seconds, or after *max_samples* samples, whichever comes first. Every batch is seeded from a
+    master RNG (itself seeded with *seed*), so the workers draw from independent streams and a fixed *seed* with a
+    fixed number of rounds reproduces the result. With *workers* = 1 everything runs in this process. *stop*, a
+    function of the current *Odds*, can end sampling early, e.g. as soon as a decision based on the odds is certain.
+    """
+    hole = list(hole)
+    board = list(board)
+    if len(hole) != 2 or len(board) > 5 or opponents < 1:
+        raise ValueError('need two hole cards, at most five board cards and at least one opponent')
+    deadline = time.perf_counter() + time_budget
+    master = random.Random(seed)
+    pool = get_pool(workers) if workers != 1 else None
+    totals = [0, 0, 0, 0.0, 0.0]
+    odds = None
+    while True:
+        if pool is None:
+            results = [simulate(hole, board, opponents, batch_size, master.getrandbits(64))]
+        else:
+            futures = [pool.submit(simulate, hole, board, opponents, batch_size, master.getrandbits(64))
+                       for _ in range(_pool_workers)]
+            results = [f.result() for f in futures]
+        for result in results:
+            totals = [a + b for a, b in zip(totals, result)]
+        metrics.count('monte_carlo_samples_total', batch_size * len(results))
+        odds = _odds(totals)
+        if odds.error <= target_error or odds.samples >= max_samples or time.perf_counter() >= deadline:
+            return odds
+        if stop is not None and stop(odds):
+            return odds
+
+
+def _bits(mask):
+    """Yield the indices of the set bits of *mask*."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def _matchings(weaker, tied, remaining, k):
+    """Count the ways to deal *k* opponents disjoint hands that do not beat us.
+
+    The live cards are the bits of *remaining*. *weaker*[c] and *tied*[c] are bitmasks of the cards that, together
+    with card c, form a holding weaker than or as strong as ours. Return a list whose j-th entry is the number of
+    ordered deals in which exactly j opponents tie with us. One and two opponents are counted in closed form from
+    the vertex degrees of the holding graph, more opponents recurse on the first opponent's holding.
+    """
+    if k == 0:
+        return [1]
+    degrees = [(bin(weaker[c] & remaining).count('1'), bin(tied[c] & remaining).count('1')) for c in _bits(remaining)]
+    n_weaker = sum(w for w, t in degrees) // 2
+    n_tied = sum(t for w, t in degrees) // 2
+    if k == 1:
+        return [n_weaker, n_tied]
+    if k == 2:
+        # ordered pairs of distinct holdings minus those sharing a card; two holdings share at most one card
+        return [n_weaker * n_weaker + n_weaker - sum(w * w for w, t in degrees),
+                2 * (n_weaker * n_tied - sum(w * t for w, t in degrees)),
+                n_tied * n_tied + n_tied - sum(t * t for w, t in degrees)]
+    counts = [0] * (k + 1)
+    for c in _bits(remaining):
+        below = (1 << c) - 1
+        for shift, graph in ((0, weaker), (1, tied)):
+            for other in _bits(graph[c] & remaining & below):
+                sub = _matchings(weaker, tied, remaining & ~(1 << c) & ~(1 << other), k - 1)
+                for j, n in enumerate(sub):
+                    counts[j + shift] += n
+    return counts
+
+
+def _deals(cards, k):
+    """Number of ordered ways to deal *k* two-card hands from *cards* cards."""
+    total = 1
+    for i in range(k):
+        total *= math.comb(cards - 2 * i, 2)
+    return total
+
+
+def exact_cost(board_size, opponents):
+    """Rough number of elementary steps *exact_odds* takes, used to decide whether enumeration is affordable."""
+    live = 50 - board_size
+    runouts = math.comb(live, 5 - board_size)
+    holdings = math.comb(live - 5 + board_size, 2)
+    return runouts * holdings * max(1, holdings) ** max(0, opponents - 2)
+
+
+@lru_cache(maxsize=4096)
+def _exact_odds(hole, board, opponents):
+    dead = set(hole) | set(board)
+    live = [c for c in ranking.deck if c not in dead]
+    board = list(board)
+    board_key = hand_key(board)
+    hole_key = hand_key(hole, board_key)
+    totals = [0] * (opponents + 1)
+    deals = 0
+    for runout in combinations(live, 5 - len(board)):
+        full_board = board + list(runout)
+        runout_key = hand_key(runout, board_key)
+        hero = evaluate_key(hand_key(runout, hole_key), list(hole) + full_board)
+        remaining_cards = [c for c in live if c not in runout]
+        weaker = [0] * 52
+        tied = [0] * 52
+        for a, b in combinations(remaining_cards, 2):
+            strength = evaluate_key(runout_key + ranktables.CARD_KEYS[a] + ranktables.CARD_KEYS[b],
+                                    full_board + [a, b])
+            if strength < hero:
+                weaker[a] |= 1 << b
+                weaker[b] |= 1 << a
+            elif strength == hero:
+                tied[a] |= 1 << b
+                tied[b] |= 1 << a
+        deals += _deals(len(remaining_cards), opponents)
+        if not any(weaker) and not any(tied):
+            continue
+        remaining = sum(1 << c for c in remaining_cards)
+        for j, n in enumerate(_matchings(weaker, tied, remaining, opponents)):
+            totals[j] += n
+    win = totals[0] / deals
+    tie = sum(totals[1:]) / deals
+    equity = sum(n / (1 + j) for j, n in enumerate(totals)) / deals
+    return Odds(win, tie, 1.0 - win - tie, equity, 0.0, deals)
+
+
+@metrics.timed('exact_odds_seconds')
+def exact_odds(hole, board=(), opponents=1):
+    """Return the exact odds of *hole* with the known *board* cards against *opponents* random hands.
+
+    Every runout of the board is enumerated. Per runout the board key is computed once and every possible opponent
+    holding is evaluated once, then the deals of all opponents that do not beat us are counted combinatorially
+    instead of being enumerated. Results are cached per suit-isomorphic (hole, board) and number of opponents.
+    """
+    if len(hole) != 2 or len(board) > 5 or opponents < 1:
+        raise ValueError('need two hole cards, at most five board cards and at least one opponent')
+    hole, board = ranking.canonical_codes(hole, board)
+    return _exact_odds(hole, board, opponents)
+
+
+def odds(hole, board=(), opponents=1, exact_limit=1000000, **kwargs):
+    """Return *exact_odds* if its *exact_cost* is at most *exact_limit*, otherwise *monte_carlo_odds* with the
+    remaining keyword arguments."""
+    if exact_cost(len(board), opponents) <= exact_limit:
+        return exact_odds(hole, board, opponents)
+    return monte_carlo_odds(hole, board, opponents, **kwargs)
+
+
+# rough bound of how far the immediate hand strength can be from the equity, by number of board cards
+HAND_STRENGTH_ERROR = {3: 0.2, 4: 0.1, 5: 0.0}
+
+
+def hand_strength(hole, board, opponents=1):
+    """Cheap equity estimate after the flop: the share of opponent holdings our hand beats on the current *board*.
+
+    Only the about one thousand possible holdings are evaluated, future cards are ignored, and several opponents
+    are treated as independent. *error* is a rough bound that shrinks towards the river, where the estimate is
+    exact against one opponent; *samples* is the number of holdings.
+    """
+    if len(hole) != 2 or not 3 <= len(board) <= 5 or opponents < 1:
+        raise ValueError('need two hole cards, three to five board cards and at least one opponent')
+    board = list(board)
+    dead = set(hole) | set(board)
+    board_key = hand_key(board)
+    hero = evaluate_key(hand_key(hole, board_key), list(hole) + board)
+    weaker = tied = total = 0
+    for a, b in combinations([c for c in ranking.deck if c not in dead], 2):
+        strength = evaluate_key(board_key + ranktables.CARD_KEYS[a] + ranktables.CARD_KEYS[b], board + [a, b])
+        weaker += strength < hero
+        tied += strength == hero
+        total += 1
+    win = (weaker / total) ** opponents
+    equity = ((weaker + tied / 2) / total) ** opponents
+    tie = ((weaker + tied) / total) ** opponents - win
+    error = HAND_STRENGTH_ERROR[len(board)] + (0.1 if opponents > 1 else 0.0)
+    return Odds(win, tie, 1.0 - win - tie, equity, error, total)
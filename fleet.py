@@ -0,0 +1,168 @@
+"""Seat a fleet of bots: many *pokerclient.Player*s, on one or many tables.
+
+The table listing (GET /tables) is fetched once and indexed by table: the open positions of every table, and the
+seat of every player already seated. Seats are handed out from that index under a lock, so no two of our players
+ever try the same seat, and all joins run concurrently, so seating 50 players takes about one round trip instead
+of 50. Only a seat taken by someone else in the meantime makes a join fail; the listing is then fetched again,
+conditionally (an unchanged listing costs an empty 304 response), and the player gets the next open seat.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import metrics
+
+
+class Fleet(object):
+    """Open seats on the tables of the server at *base_url*, handed out to players.
+
+    *workers* limits the joins in flight, *attempts* the seats tried per player.
+    """
+
+    def __init__(self, base_url, workers=64, attempts=3, timeout=2.0):
+        self.base_url = base_url
+        self.workers = workers
+        self.attempts = attempts
+        self.timeout = timeout
+        # the last listing: table infos by name, None before the first fetch
+        self.tables = None
+        self.etag = None
+        # open positions by table name, in ascending order, without the seats handed out
+        self.open_seats = {}
+        # (tablename, position) by player name, of the players seated at the last fetch or by us since
+        self.seated = {}
+        # seats handed out whose join has not finished yet, kept out of the open seats of new listings
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._session = None
+
+    @property
+    def session(self):
+        """The keep-alive HTTP session for the listings, created on first use."""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    @metrics.timed('http_tables_seconds')
+    def refresh(self):
+        """Fetch the table listing, unless it did not change since the last fetch, and index it. Return whether
+        it changed."""
+        headers = {'If-None-Match': self.etag} if self.etag else {}
+        response = self.session.get(self.base_url + '/tables', headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            metrics.count('http_not_modified_total')
+            return False
+        response.raise_for_status()
+        tables = response.json()['tables']
+        with self._lock:
+            self.etag = response.headers.get('ETag')
+            self.tables = {t['name']: t for t in tables}
+            self.seated = {}
+            self.open_seats = {}
+            for t in tables:
+                for position, name in t['players'].items():
+                    self.seated[name] = (t['name'], int(position))
+                self.open_seats[t['name']] = [i for i in range(1, t['max_player_count'] + 1)
+                                              if str(i) not in t['players'] and (t['name'], i) not in self._pending]
+        return True
+
+    def reserve(self, tablename=None):
+        """Take the lowest open seat of the table *tablename*, or of the first table in the listing with an open
+        seat, out of the index and return it as (tablename, position). Return None if there is none. The seat must
+        be given back with *release* once its join finished."""
+        with self._lock:
+            names = [tablename] if tablename is not None else list(self.open_seats)
+            for name in names:
+                positions = self.open_seats.get(name)
+                if positions:
+                    seat = (name, positions.pop(0))
+                    self._pending.add(seat)
+                    return seat
+        return None
+
+    def release(self, seat, playername=None):
+        """Finish the join of a *seat* from *reserve*: taken by *playername*, or, without one, failed. A failed
+        seat stays out of the open seats until a listing shows it open again."""
+        with self._lock:
+            self._pending.discard(seat)
+            if playername is not None:
+                self.seated[playername] = seat
+
+    def seat_player(self, player):
+        """Seat one *player* at its table, or at any table if its *tablename* is None, and return the seat as
+        (tablename, position), or None if there was no open seat or all *attempts* failed."""
+        wanted = player.tablename
+        for attempt in range(self.attempts):
+            with self._lock:
+                seat = self.seated.get(player.playername)
+            if seat is not None and wanted in (None, seat[0]):
+                player.tablename, player.seat = seat
+                return seat
+            seat = self.reserve(wanted)
+            if seat is None:
+                return None
+            player.tablename = seat[0]
+            try:
+                joined = player.join_table(seat[1]) == 200
+            finally:
+                self.release(seat, player.playername if player.seat == seat[1] else None)
+            if joined:
+                return seat
+            metrics.count('fleet_join_conflicts_total')
+            player.tablename = wanted
+            self.refresh()
+        return None
+
+    @metrics.timed('fleet_seat_seconds')
+    def seat(self, players):
+        """Seat all *players* concurrently, see *seat_player*. Return their seats (or None) by player name; a
+        player whose join raised gets None as well."""
+        players = list(players)
+        if self.tables is None:
+            self.refresh()
+        if not players:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(players))) as executor:
+            futures = [(player.playername, executor.submit(self.seat_player, player)) for player in players]
+        seats = {}
+        for playername, future in futures:
+            try:
+                seats[playername] = future.result()
+            except Exception as e:
+                print('could not seat {}: {!r}'.format(playername, e))
+                seats[playername] = None
+        return seats
+
+
+if __name__ == '__main__':
+    argparser = ArgumentParser(description='seat many players at once, and let them play')
+    argparser.add_argument('players', type=str, nargs='+',
+                           help='players as <playername>:<tablename>, or <playername> for any table')
+    argparser.add_argument('-b', '--base_url', type=str, default='http://pokerserver.retreat.tngtech.com:5555')
+    argparser.add_argument('-c', '--configfile', type=str, default='.config')
+    argparser.add_argument('-w', '--workers', type=int, default=64, help='joins in flight at most')
+    argparser.add_argument('--play', action='store_true', help='play all seated players, one thread each')
+    metrics.add_arguments(argparser)
+    args = argparser.parse_args()
+    metrics.start_from_args(vars(args))
+
+    from pokerclient import Player
+    players = []
+    for spec in args.players:
+        playername, _, tablename = spec.partition(':')
+        players.append(Player(playername=playername, tablename=tablename or None, base_url=args.base_url,
+                              configfile=args.configfile))
+    seats = Fleet(args.base_url, workers=args.workers).seat(players)
+    for playername, seat in seats.items():
+        print('{}: {}'.format(playername, 'table {}, position {}'.format(*seat) if seat else 'no seat'))
+    if args.play:
+        threads = [threading.Thread(target=p.play, daemon=True) for p in players if seats[p.playername]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,250 @@
+"""Hand histories: a compact binary log of everything we observe at a table, and a fast replay of it.
+
+The recorder turns the events of a *tablestate.TableState* (plus stack and pot changes and our own actions) into
+records, one file per session. Every record is a kind byte followed by unsigned varints: cards are their integer
+codes (one byte each), player and action names are replaced by indices defined once per session by a NAME record,
+and chip amounts are stored as zigzag-encoded deltas (chips added to a bet in the current round, change of a stack,
+change of the pot), which are small numbers and mostly fit one byte. A hand typically takes well under 100 bytes.
+
+*replay* memory-maps log files and yields one *Hand* at a time, without parsing any JSON.
+"""
+from collections import namedtuple
+import glob
+import mmap
+import os
+import time
+
+_MAGIC = b'HHL2'
+# logs before hole cards had a length field, when every hand had two
+_MAGIC_V1 = b'HHL1'
+
+NAME, HAND, HOLE, BOARD, BET, FOLD, JOIN, LEAVE, TURN, ACTION, STACK, POT = range(1, 13)
+# number of varint fields following the kind byte, BOARD, HOLE and NAME have a length field instead
+_FIELDS = {HAND: 1, BET: 2, FOLD: 1, JOIN: 2, LEAVE: 2, TURN: 1, ACTION: 3, STACK: 2, POT: 1}
+
+Hand = namedtuple('Hand', ['number', 'time', 'players', 'hole_cards', 'board', 'actions', 'stacks', 'pot'])
+Hand.__doc__ = """One replayed hand. *time* is in seconds since the start of the session, *players* maps seat positions to
+names and *stacks* names to chips, both at the start of the hand. *hole_cards* maps names to integer-encoded cards,
+*board* holds integer-encoded cards. *actions* is a list of (name, action, amount) in the order they were observed;
+*action* is 'bet' (amount: total bet in the round), 'fold', or the action we sent ourselves. *pot* is the last pot
+seen, without the bets of the current round."""
+
+
+def _varint(buf, value):
+    """Append *value* (a non-negative int) to the bytearray *buf* as varint."""
+    while value >= 0x80:
+        buf.append(value & 0x7f | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class HistoryRecorder(object):
+    """Append what we observe at a table to *directory*/<session>.hhl, see the module documentation."""
+
+    def __init__(self, directory='history', session=None):
+        os.makedirs(directory, exist_ok=True)
+        session = session or '{}-{}'.format(time.strftime('%Y%m%d-%H%M%S'), os.getpid())
+        self.path = os.path.join(directory, session + '.hhl')
+        self.file = open(self.path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(_MAGIC)
+        self.start = time.monotonic()
+        self.names = {}
+        self.bets = {}
+        self.stacks = {}
+        self.pot = 0
+        self.buffer = bytearray()
+
+    def _name(self, name):
+        """Return the index of *name* plus one (0 stands for no name), defining it on first use."""
+        if name is None:
+            return 0
+        index = self.names.get(name)
+        if index is None:
+            index = self.names[name] = len(self.names) + 1
+            data = str(name).encode()
+            self.buffer.append(NAME)
+            _varint(self.buffer, index)
+            _varint(self.buffer, len(data))
+            self.buffer += data
+        return index
+
+    def _record(self, kind, *fields):
+        self.buffer.append(kind)
+        for value in fields:
+            _varint(self.buffer, value)
+
+    def observe(self, state, events):
+        """Record the *events* returned by *state.apply* and any change of the stacks and the pot."""
+        for event in events:
+            kind = event.kind
+            if kind == 'new_hand':
+                self.flush()
+                self.bets = {}
+                self._record(HAND, int((time.monotonic() - self.start) * 1000))
+            elif kind == 'hole_cards':
+                self._record(HOLE, self._name(event.player), len(state.hole_codes), *state.hole_codes)
+            elif kind == 'board':
+                cards = state.board_codes[-len(event.value):]
+                self._record(BOARD, len(cards), *cards)
+                self.bets = {}
+            elif kind == 'bet':
+                self._record(BET, self._name(event.player), _zigzag(event.value - self.bets.get(event.player, 0)))
+                self.bets[event.player] = event.value
+            elif kind == 'fold':
+                self._record(FOLD, self._name(event.player))
+            elif kind in ('joined', 'left'):
+                self._record(JOIN if kind == 'joined' else LEAVE, self._name(event.player), event.value)
+            elif kind == 'our_turn':
+                self._record(TURN, self._name(event.player))
+        for name, stack in state.stacks.items():
+            if stack != self.stacks.get(name, 0):
+                self._record(STACK, self._name(name), _zigzag(stack - self.stacks.get(name, 0)))
+                self.stacks[name] = stack
+        if state.pot != self.pot:
+            self._record(POT, _zigzag(state.pot - self.pot))
+            self.pot = state.pot
+
+    def action(self, playername, action, amount=0):
+        """Record an action we sent to the server."""
+        self._record(ACTION, self._name(playername), self._name(action), _zigzag(amount or 0))
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer = bytearray()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_records(path):
+    """Yield the records of the log file *path* as (kind, fields) with names resolved and deltas undone. A cut off
+    last record is skipped, an unknown kind of record raises ValueError."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= len(_MAGIC):
+            return
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic = data[:len(_MAGIC)]
+        if magic not in (_MAGIC, _MAGIC_V1):
+            raise ValueError('{} is not a hand history log'.format(path))
+        names = [None]
+        bets = {}
+        stacks = {}
+        pot = 0
+        pos = len(_MAGIC)
+        end = len(data)
+
+        def varint():
+            nonlocal pos
+            value = shift = 0
+            while True:
+                if pos >= end:
+                    raise EOFError
+                byte = data[pos]
+                pos += 1
+                value |= (byte & 0x7f) << shift
+                if byte < 0x80:
+                    return value
+                shift += 7
+
+        while pos < end:
+            kind = data[pos]
+            pos += 1
+            if kind == NAME:
+                # names are defined in the order of their indices
+                index, length = varint(), varint()
+                if index != len(names):
+                    raise ValueError('{}: name {} defined out of order, expected {}'.format(path, index, len(names)))
+                if pos + length > end:
+                    raise EOFError
+                names.append(data[pos:pos + length].decode())
+                pos += length
+                continue
+            if kind == BOARD:
+                yield kind, [varint() for _ in range(varint())]
+                bets = {}
+                continue
+            if kind == HOLE:
+                name = names[varint()]
+                yield kind, (name, [varint() for _ in range(2 if magic == _MAGIC_V1 else varint())])
+                continue
+            count = _FIELDS.get(kind)
+            if count is None:
+                raise ValueError('{}: unknown record kind {} at {}'.format(path, kind, pos - 1))
+            fields = [varint() for _ in range(count)]
+            if kind == HAND:
+                bets = {}
+                yield kind, (fields[0] / 1000,)
+            elif kind == BET:
+                name = names[fields[0]]
+                bets[name] = bets.get(name, 0) + _unzigzag(fields[1])
+                yield kind, (name, bets[name])
+            elif kind == STACK:
+                name = names[fields[0]]
+                stacks[name] = stacks.get(name, 0) + _unzigzag(fields[1])
+                yield kind, (name, stacks[name])
+            elif kind == POT:
+                pot += _unzigzag(fields[0])
+                yield kind, (pot,)
+            elif kind == ACTION:
+                yield kind, (names[fields[0]], names[fields[1]], _unzigzag(fields[2]))
+            else:
+                yield kind, (names[fields[0]],) + tuple(fields[1:])
+    except EOFError:
+        # the last record was cut off, as a recorder killed while writing leaves it: the log ends before it
+        pass
+    finally:
+        data.close()
+
+
+def replay(paths):
+    """Yield the *Hand*s recorded in the log files *paths* (a file, a directory of logs, or a list of files)."""
+    if isinstance(paths, str):
+        paths = sorted(glob.glob(os.path.join(paths, '*.hhl'))) if os.path.isdir(paths) else [paths]
+    for path in paths:
+        players = {}
+        stacks = {}
+        pot = 0
+        hand = None
+        number = 0
+        for kind, fields in read_records(path):
+            if kind == HAND:
+                if hand is not None:
+                    yield hand._replace(pot=pot)
+                number += 1
+                hand = Hand(number, fields[0], dict(players), {}, [], [], dict(stacks), 0)
+            elif kind == JOIN:
+                players[fields[1]] = fields[0]
+            elif kind == LEAVE:
+                if players.get(fields[1]) == fields[0]:
+                    del players[fields[1]]
+            elif kind == STACK:
+                stacks[fields[0]] = fields[1]
+            elif kind == POT:
+                pot = fields[0]
+            elif hand is None:
+                continue
+            elif kind == HOLE:
+                hand.hole_cards[fields[0]] = list(fields[1])
+            elif kind == BOARD:
+                hand.board.extend(fields)
+            elif kind == BET:
+                hand.actions.append((fields[0], 'bet', fields[1]))
+            elif kind == FOLD:
+                hand.actions.append((fields[0], 'fold', 0))
+            elif kind == ACTION:
+                hand.actions.append(fields)
+        if hand is not None:
+            yield hand._replace(pot=pot)
@@ -1,23 +1,178 @@
+"""An INI config file with JSON values, safe to share between processes.
+
+Values are stored JSON-encoded and decoded on the first *get*; the decoded value is cached until the option is *set*
+or removed, or the file is read again. Values that are not valid JSON (e.g. written by hand) are returned as the raw
+string.
+
+Several bots may use one file at the same time. *save* takes an exclusive lock (on *filename*.lock, the config file
+itself is replaced on every save), re-reads the file, applies only the options changed in this process on top, and
+replaces the file atomically. Concurrent writers thus never leave a partially written file and do not drop each
+other's entries. *refresh* re-reads the file if another process changed it since. Files of earlier versions, which
+JSON-encoded the option names instead of the values, are read with the names decoded.
+"""
 import configparser
+from contextlib import contextmanager
 import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_UNSET = object()
+
+
+def _decode(value):
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
 
 
 class JSONConfig(configparser.RawConfigParser):
     def __init__(self, filename):
         self.filename = filename
+        # decoded values by (section, option), also the index for lookups such as playername -> UUID
+        self._cache = {}
+        # options set or removed since the last save, by (section, option); option None stands for a whole section
+        self._changes = {}
+        self._stamp = None
+        self._lock_file = None
+        self._lock_depth = 0
         super().__init__()
         self.optionxform = str
+        self._reload()
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        """Replace the contents with those of the file, keeping the changes that are not saved yet."""
+        for section in self.sections():
+            super().remove_section(section)
+        for option in list(self.defaults()):
+            super().remove_option(self.default_section, option)
+        self._stamp = self._file_stamp()
         self.read(self.filename)
+        self._unquote_options()
+        for (section, option), value in self._changes.items():
+            if option is None:
+                super().remove_section(section)
+            elif value is None:
+                if self.has_section(section):
+                    super().remove_option(section, option)
+            else:
+                if section != self.default_section and not self.has_section(section):
+                    self.add_section(section)
+                super().set(section, option, value)
+
+    def _unquote_options(self):
+        """Rename the options that earlier versions wrote with a JSON-encoded name instead of a JSON-encoded value,
+        such as "FetteElke" = uuid in the players section. An option that also exists unquoted is left alone. The
+        file itself is migrated by the next *save*."""
+        for section in self.sections():
+            for option in super().options(section):
+                if len(option) < 2 or option[0] != '"' or option[-1] != '"':
+                    continue
+                name = _decode(option)
+                if isinstance(name, str) and not super().has_option(section, name):
+                    value = super().get(section, option)
+                    super().remove_option(section, option)
+                    super().set(section, name, value)
+
+    def refresh(self):
+        """Re-read the file if it changed since it was last read or saved. Return whether it did."""
+        if self._file_stamp() == self._stamp:
+            return False
+        self._reload()
+        return True
+
+    def _record(self, section, option, value):
+        key = (section, option)
+        # move the key to the end, the changes are replayed in order
+        self._changes.pop(key, None)
+        self._changes[key] = value
+        if option is None:
+            self._cache = {k: v for k, v in self._cache.items() if k[0] != section}
+        else:
+            self._cache.pop(key, None)
+
+    def read(self, filenames, encoding=None):
+        self._cache.clear()
+        return super().read(filenames, encoding)
+
+    def read_file(self, f, source=None):
+        self._cache.clear()
+        return super().read_file(f, source)
+
+    @contextmanager
+    def locked(self):
+        """Hold the exclusive lock of the config file shared by all processes. The lock is reentrant, so *save*
+        may be called inside, e.g. to look up and register a player as one step. Without *fcntl* (on Windows)
+        there is no lock, writes are still atomic."""
+        if self._lock_depth == 0 and fcntl is not None:
+            self._lock_file = open(self.filename + '.lock', 'a')
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        self._lock_depth += 1
+        try:
+            yield self
+        finally:
+            self._lock_depth -= 1
+            if self._lock_depth == 0 and self._lock_file is not None:
+                # closing the file releases the lock
+                self._lock_file.close()
+                self._lock_file = None
 
     def save(self):
-        with open(self.filename, 'w') as cfgfile:
-            self.write(cfgfile)
+        """Merge the changes of this process into the current file and replace it atomically, under the lock."""
+        with self.locked():
+            self._reload()
+            tmp = '{}.{}.tmp'.format(self.filename, os.getpid())
+            with open(tmp, 'w') as cfgfile:
+                self.write(cfgfile)
+                cfgfile.flush()
+                os.fsync(cfgfile.fileno())
+            os.replace(tmp, self.filename)
+            self._changes = {}
+            self._stamp = self._file_stamp()
 
-    def get(self, *args, **kwargs):
+    def get(self, section, option, *, raw=False, vars=None, fallback=_UNSET):
+        """Return the decoded value of *option*. The returned object is shared with later calls, do not modify it."""
+        key = (section, option)
+        if vars is None:
+            try:
+                return self._cache[key]
+            except KeyError:
+                pass
         try:
-            return json.loads(super().get(*args, **kwargs))
-        except json.JSONDecodeError:
-            return super().get(*args, **kwargs)
+            value = _decode(super().get(section, option, raw=raw, vars=vars))
+        except (configparser.NoSectionError, configparser.NoOptionError):
+            if fallback is _UNSET:
+                raise
+            return fallback
+        if vars is None:
+            self._cache[key] = value
+        return value
+
+    def set(self, section, option, value=None):
+        """Store *value* JSON-encoded, adding the *section* if it does not exist yet."""
+        if section != self.default_section and not self.has_section(section):
+            self.add_section(section)
+        encoded = json.dumps(value)
+        super().set(section, option, encoded)
+        self._record(section, option, encoded)
+
+    def remove_option(self, section, option):
+        existed = super().remove_option(section, option)
+        self._record(section, option, None)
+        return existed
 
-    def set(self, section, value, *args, **kwargs):
-        return super().set(section, json.dumps(value), *args, **kwargs)
\ No newline at end of file
+    def remove_section(self, section):
+        existed = super().remove_section(section)
+        self._record(section, None, None)
+        return existed
@@ -0,0 +1,179 @@
+"""A local stand-in for the poker server, speaking the same HTTP API, so clients can be tested offline. Tables are
+*MockTable*s, which only pass the turn around, or real games of *engine.HoldemTable*.
+
+Routes:
+    POST /uuid                               register a player, returns its uuid
+    GET  /tables                             list all tables
+    GET  /table/<name>?uuid=<uuid>           status of a table
+    POST /table/<name>/actions/<action>?uuid=<uuid>
+                                             join a table ('join', {'position': n}) or act ('call', 'check', ...)
+"""
+from argparse import ArgumentParser
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+import uuid
+
+
+class MockTable(object):
+    """A table without any poker: the seated players act in turn, every action passes on the turn."""
+
+    def __init__(self, name, max_player_count=6):
+        self.name = name
+        self.max_player_count = max_player_count
+        self.players = {}
+        self.current_position = None
+        self.actions = []
+        self.lock = threading.Lock()
+
+    def info(self):
+        return {'name': self.name, 'max_player_count': self.max_player_count, 'players': dict(self.players)}
+
+    def status(self, playername=None):
+        return {
+            'name': self.name,
+            'players': dict(self.players),
+            'current_player': self.players.get(self.current_position),
+            'community_cards': [],
+            'action_count': len(self.actions),
+        }
+
+    def join(self, playername, position):
+        if not 1 <= position <= self.max_player_count:
+            return 400, 'invalid position {}'.format(position)
+        if str(position) in self.players:
+            return 409, 'position {} is taken'.format(position)
+        if playername in self.players.values():
+            return 409, 'player {} is already seated'.format(playername)
+        self.players[str(position)] = playername
+        if self.current_position is None:
+            self.current_position = str(position)
+        return 200, 'joined table {} at position {}'.format(self.name, position)
+
+    def act(self, playername, action, data):
+        if self.players.get(self.current_position) != playername:
+            return 400, 'it is not the turn of {}'.format(playername)
+        self.actions.append((playername, action, data))
+        positions = sorted(self.players, key=int)
+        self.current_position = positions[(positions.index(self.current_position) + 1) % len(positions)]
+        return 200, '{} {}'.format(playername, action)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops the connections of a fleet joining at once, which are retried a second later
+    request_queue_size = 128
+
+
+class LocalServer(object):
+    """Serve *tables* (objects with the interface of *MockTable*) on localhost in a background thread."""
+
+    def __init__(self, tables, host='127.0.0.1', port=0):
+        self.tables = {t.name: t for t in tables}
+        self.uuids = {}
+        self.request_count = 0
+        self.httpd = _HTTPServer((host, port), self._handler())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def register(self, playername):
+        player_uuid = str(uuid.uuid4())
+        self.uuids[player_uuid] = playername
+        return player_uuid
+
+    def handle(self, method, url, body):
+        """Dispatch one request and return (status code, JSON-serializable or text body)."""
+        self.request_count += 1
+        parsed = urlparse(url)
+        parts = [p for p in parsed.path.split('/') if p]
+        playername = self.uuids.get(parse_qs(parsed.query).get('uuid', [None])[0])
+        if method == 'POST' and parts == ['uuid']:
+            return 200, self.register(body['player_name'])
+        if method == 'GET' and parts == ['tables']:
+            return 200, {'tables': [t.info() for t in self.tables.values()]}
+        if len(parts) < 2 or parts[0] != 'table' or parts[1] not in self.tables:
+            return 404, 'not found'
+        table = self.tables[parts[1]]
+        with table.lock:
+            if method == 'GET' and len(parts) == 2:
+                return 200, table.status(playername)
+            if method == 'POST' and len(parts) == 4 and parts[2] == 'actions':
+                if playername is None:
+                    return 403, 'unknown uuid'
+                if parts[3] == 'join':
+                    return table.join(playername, int(body['position']))
+                return table.act(playername, parts[3], body)
+        return 404, 'not found'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                body = json.loads(raw) if raw else None
+                status, payload = server.handle(self.command, self.path, body)
+                if isinstance(payload, str):
+                    data, content_type = payload.encode(), 'text/plain'
+                else:
+                    data, content_type = json.dumps(payload, sort_keys=True).encode(), 'application/json'
+                # support conditional requests, so unchanged table states cost no body
+                etag = '"{}"'.format(hashlib.sha1(data).hexdigest())
+                if self.command == 'GET' and status == 200 and self.headers.get('If-None-Match') == etag:
+                    status, data = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                if self.command == 'GET':
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _respond
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == '__main__':
+    argparser = ArgumentParser(description='run a local stand-in poker server')
+    argparser.add_argument('-p', '--port', type=int, default=5555)
+    argparser.add_argument('-t', '--tables', type=str, nargs='+', default=['table1'], help='names of the tables')
+    argparser.add_argument('--holdem', action='store_true', help="deal No-Limit Hold'em instead of passing turns")
+    argparser.add_argument('-s', '--seed', type=int, help="seed of the Hold'em decks")
+    args = argparser.parse_args()
+
+    if args.holdem:
+        from engine import HoldemTable
+        tables = [HoldemTable(name, seed=args.seed) for name in args.tables]
+    else:
+        tables = [MockTable(name) for name in args.tables]
+    server = LocalServer(tables, port=args.port)
+    print('serving on', server.url)
+    server.httpd.serve_forever()
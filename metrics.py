@@ -0,0 +1,310 @@
+"""Lightweight instrumentation: counters and latency histograms of network calls, evaluation batches and decisions.
+
+Instrumentation is off by default; an instrumented call then costs one check of the module flag *enabled*. *enable*
+turns it on for the process. Histograms have fixed, logarithmically spaced buckets (*BUCKETS*, a microsecond to ten
+seconds), so recording a value is a bisect and a few additions, and memory does not grow with the observations.
+
+The values are dumped periodically to a file by a *Dumper* (JSON, or the Prometheus text format for a '.prom' file,
+as read e.g. by the textfile collector of the node exporter), or served as Prometheus text at /metrics by a
+*MetricsServer*. With a *profile_dir* given to *enable*, the functions instrumented with profile=True (a decision)
+run under cProfile and write one profile per call into that directory, to be read with pstats or snakeviz.
+"""
+import atexit
+import bisect
+from contextlib import contextmanager
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+BUCKETS = tuple(m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)) + (10.0,)
+PREFIX = 'poker_'
+
+enabled = False
+profile_dir = None
+_profile_count = 0
+
+
+class Histogram(object):
+    """Counts of observed values per bucket of *BUCKETS*; the last count is for values above the last bucket."""
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding the *q* quantile (the maximum for the overflow bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= rank and seen:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self):
+        if not self.count:
+            return {'count': 0}
+        result = {'count': self.count, 'sum': self.sum, 'mean': self.sum / self.count, 'max': self.max}
+        for q in (50, 95, 99):
+            result['p{}'.format(q)] = self.quantile(q / 100)
+        return result
+
+
+class Registry(object):
+    """The counters and histograms of a process, by name. Threads record and read them under one lock, so no count
+    is lost and a dump sees consistent values."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def snapshot(self):
+        """Return a JSON-serializable dict of all values; histograms are summarized by count, sum, mean, max and
+        (bucket resolution) percentiles."""
+        with self._lock:
+            return {
+                'time': time.time(),
+                'pid': os.getpid(),
+                'counters': dict(self.counters),
+                'histograms': {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+    def prometheus(self):
+        """Return all values in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = [(name, list(h.counts), h.sum, h.count) for name, h in sorted(self.histograms.items())]
+        lines = []
+        for name, value in counters:
+            lines.append('# TYPE {0}{1} counter\n{0}{1} {2}'.format(PREFIX, name, value))
+        for name, counts, total, count in histograms:
+            lines.append('# TYPE {}{} histogram'.format(PREFIX, name))
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float('inf'),), counts):
+                cumulative += n
+                lines.append('{}{}_bucket{{le="{}"}} {}'.format(PREFIX, name, '+Inf' if bound == float('inf')
+                                                                 else repr(bound), cumulative))
+            lines.append('{0}{1}_sum {2!r}\n{0}{1}_count {3}'.format(PREFIX, name, total, count))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def enable(profile=None):
+    """Start recording. With a directory *profile*, calls instrumented with profile=True are also profiled."""
+    global enabled, profile_dir
+    if profile:
+        os.makedirs(profile, exist_ok=True)
+    profile_dir = profile
+    enabled = True
+
+
+def disable():
+    global enabled, profile_dir
+    enabled = False
+    profile_dir = None
+
+
+def count(name, n=1):
+    """Add *n* to the counter *name* (by convention ending in '_total')."""
+    if enabled:
+        REGISTRY.count(name, n)
+
+
+def observe(name, value):
+    """Record *value* in the histogram *name* (by convention ending in the unit, e.g. '_seconds')."""
+    if enabled:
+        REGISTRY.observe(name, value)
+
+
+def _profiled(name, function, args, kwargs):
+    global _profile_count
+    import cProfile
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(function, *args, **kwargs)
+    finally:
+        # the duration includes the profiling overhead
+        REGISTRY.observe(name, time.perf_counter() - start)
+        _profile_count += 1
+        profiler.dump_stats(os.path.join(profile_dir, '{}-{}-{}.prof'.format(name, os.getpid(), _profile_count)))
+
+
+def timed(name, profile=False):
+    """Decorator recording the seconds every call of the function takes in the histogram *name*. With *profile*,
+    calls run under cProfile while profiling is enabled."""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            if profile and profile_dir:
+                return _profiled(name, function, args, kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                REGISTRY.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def timer(name):
+    """Record the seconds the block takes in the histogram *name*, e.g. around an await in a coroutine."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(name, time.perf_counter() - start)
+
+
+def start(path=None, port=None, interval=10.0, profile=None, host='127.0.0.1'):
+    """Enable recording if any of the options is given, dump to *path* every *interval* seconds, serve /metrics
+    on *host*:*port* and profile into the directory *profile*, as asked. Return the started reporters, which are
+    also stopped at exit (the last dump included)."""
+    reporters = []
+    if path is None and port is None and profile is None:
+        return reporters
+    enable(profile)
+    if path is not None:
+        reporters.append(Dumper(path, interval).start())
+    if port is not None:
+        reporters.append(MetricsServer(host, port).start())
+    for reporter in reporters:
+        atexit.register(reporter.stop)
+    return reporters
+
+
+def add_arguments(argparser):
+    """Add the command line options of *start* to *argparser*."""
+    argparser.add_argument('--metrics_file', type=str, help='dump metrics to this file, Prometheus text for *.prom')
+    argparser.add_argument('--metrics_interval', type=float, default=10.0, help='seconds between two dumps')
+    argparser.add_argument('--metrics_port', type=int, help='serve Prometheus metrics at /metrics on this port')
+    argparser.add_argument('--metrics_host', type=str, default='127.0.0.1',
+                           help='address to serve metrics on, 0.0.0.0 for all interfaces')
+    argparser.add_argument('--profile_dir', type=str, help='write a cProfile profile of every decision here')
+
+
+def start_from_args(params):
+    """Call *start* with the options of *add_arguments*, removing them from the dict *params*."""
+    return start(params.pop('metrics_file'), params.pop('metrics_port'), params.pop('metrics_interval'),
+                 params.pop('profile_dir'), params.pop('metrics_host'))
+
+
+class Dumper(object):
+    """Write the values of *registry* to *path* every *interval* seconds from a daemon thread, and once more on
+    *stop*. The file is replaced atomically, so readers never see a partial dump."""
+
+    def __init__(self, path, interval=10.0, registry=REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def dump(self):
+        if self.path.endswith('.prom'):
+            data = self.registry.prometheus()
+        else:
+            data = json.dumps(self.registry.snapshot(), indent=2, sort_keys=True)
+        tmp = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.dump()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.dump()
+
+
+class MetricsServer(object):
+    """Serve the values of *registry* in the Prometheus text format at /metrics, in a background thread."""
+
+    def __init__(self, host='127.0.0.1', port=0, registry=REGISTRY):
+        # only imported when serving, to keep the client startup fast
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                data = registry.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}/metrics'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
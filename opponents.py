@@ -0,0 +1,152 @@
+"""Statistics of every opponent we played with, aggregated from the table status stream across hands and sessions.
+
+*OpponentStats* is fed like *history.HistoryRecorder*, with a *tablestate.TableState* and the events its *apply*
+returned, and counts per player:
+
+    hands        hands dealt in
+    vpip         hands in which the player put chips in voluntarily preflop (a call or a raise, blinds do not count)
+    pfr          hands in which the player raised preflop
+    aggressive   bets and raises after the flop
+    passive      calls after the flop
+    showdowns    hands in which the player was still in when the river was done
+
+Actions are inferred from the bets: a bet above the highest bet of the round so far is a bet or raise, a bet matching
+it a call. The bets of the first status of a hand are the blinds. Every event costs a constant amount of work, and
+the counts of all players live in one array of unsigned ints, *FIELDS* consecutive entries per player.
+
+The counts are written to *path* every *interval* seconds (atomically, like the metrics dumps) and on *save*, and
+*load* restores them at startup. *get* returns the ratios of one player as *PlayerStats* in about a microsecond, cheap
+enough for every decision.
+"""
+from array import array
+from collections import namedtuple
+import json
+import os
+import sys
+import time
+
+FIELDS = ('hands', 'vpip', 'pfr', 'aggressive', 'passive', 'showdowns')
+HANDS, VPIP, PFR, AGGRESSIVE, PASSIVE, SHOWDOWNS = range(len(FIELDS))
+_MAGIC = b'OPS1'
+
+PlayerStats = namedtuple('PlayerStats', ['hands', 'vpip', 'pfr', 'aggression_factor', 'showdown_rate'])
+PlayerStats.__doc__ = """The ratios of one player: *vpip*, *pfr* and *showdown_rate* are fractions of the *hands*,
+*aggression_factor* is postflop bets and raises per call."""
+
+
+class OpponentStats(object):
+    """Per-player counts, see the module documentation. With a *path*, they are loaded from it if it exists and
+    saved to it every *interval* seconds while observing."""
+
+    def __init__(self, path=None, interval=60.0):
+        self.path = path
+        self.interval = interval
+        self.index = {}
+        self.counts = array('I')
+        # the state of the current hand
+        self._max_bet = 0
+        self._vpip = set()
+        self._pfr = set()
+        self._active = []
+        self._river = False
+        self._saved = time.monotonic()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def _slot(self, name):
+        """Return the offset of the counts of *name*, adding the player if it is new."""
+        offset = self.index.get(name)
+        if offset is None:
+            offset = self.index[name] = len(self.counts)
+            self.counts.extend([0] * len(FIELDS))
+        return offset
+
+    def observe(self, state, events):
+        """Count the *events* returned by *state.apply*."""
+        # the bets of the first status of a hand are the blinds
+        blinds = any(event.kind == 'new_hand' for event in events)
+        for event in events:
+            kind = event.kind
+            if kind == 'new_hand':
+                self._end_hand()
+                dealt = state.active_players if state.active_players is not None else state.players.values()
+                for name in dealt:
+                    self.counts[self._slot(name) + HANDS] += 1
+                self._max_bet = max(state.bets.values(), default=0)
+                self._vpip = set()
+                self._pfr = set()
+            elif kind == 'board':
+                self._max_bet = 0
+            elif kind == 'bet' and not blinds:
+                self._bet(event.player, event.value, not state.board)
+        self._active = list(state.active_players or ())
+        self._river = len(state.board) == 5
+        if self.path is not None and time.monotonic() - self._saved >= self.interval:
+            self.save()
+
+    def _bet(self, name, amount, preflop):
+        offset = self._slot(name)
+        aggressive = amount > self._max_bet
+        self._max_bet = max(self._max_bet, amount)
+        if preflop:
+            if name not in self._vpip:
+                self._vpip.add(name)
+                self.counts[offset + VPIP] += 1
+            if aggressive and name not in self._pfr:
+                self._pfr.add(name)
+                self.counts[offset + PFR] += 1
+        else:
+            self.counts[offset + (AGGRESSIVE if aggressive else PASSIVE)] += 1
+
+    def _end_hand(self):
+        """Count the showdown of the hand that just ended, if it had one."""
+        if self._river and len(self._active) >= 2:
+            for name in self._active:
+                self.counts[self._slot(name) + SHOWDOWNS] += 1
+        self._active = []
+        self._river = False
+
+    def get(self, name):
+        """Return the *PlayerStats* of *name*, or None if we never saw the player in a hand."""
+        offset = self.index.get(name)
+        if offset is None:
+            return None
+        hands, vpip, pfr, aggressive, passive, showdowns = self.counts[offset:offset + len(FIELDS)]
+        if not hands:
+            return None
+        return PlayerStats(hands, vpip / hands, pfr / hands, aggressive / passive if passive else float(aggressive),
+                           showdowns / hands)
+
+    def save(self, path=None):
+        """Write all counts to *path* (by default the *path* of the store), replacing the file atomically."""
+        path = path or self.path
+        names = sorted(self.index, key=self.index.get)
+        header = json.dumps({'fields': FIELDS, 'names': names, 'byteorder': sys.byteorder}).encode()
+        tmp = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(_MAGIC + len(header).to_bytes(4, 'little') + header)
+            self.counts.tofile(f)
+        os.replace(tmp, path)
+        self._saved = time.monotonic()
+
+    def load(self, path):
+        """Replace all counts with those saved in *path*. Fields the file does not know start at zero."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:4] != _MAGIC:
+            raise ValueError('{} is not an opponent statistics file'.format(path))
+        length = int.from_bytes(data[4:8], 'little')
+        header = json.loads(data[8:8 + length])
+        saved = array('I')
+        saved.frombytes(data[8 + length:])
+        if header['byteorder'] != sys.byteorder:
+            saved.byteswap()
+        fields = header['fields']
+        if list(fields) == list(FIELDS):
+            self.counts = saved
+        else:
+            self.counts = array('I', bytes(saved.itemsize * len(FIELDS) * len(header['names'])))
+            for field, source in ((f, i) for i, f in enumerate(fields) if f in FIELDS):
+                target = FIELDS.index(field)
+                self.counts[target::len(FIELDS)] = saved[source::len(fields)]
+        self.index = {name: i * len(FIELDS) for i, name in enumerate(header['names'])}
@@ -1,19 +1,156 @@
-from jsonconfig import JSONConfig
-from ranking import *
+from ranking import create_card, encode_cards
+import equity
+import metrics
+from equity import Odds
+import preflop
+import ranges
 import random
+import time
+
+
+def board_cards(table_info):
+    """Return the community cards of the table status *table_info*."""
+    return table_info.get('community_cards') or []
+
+
+def count_opponents(table_info):
+    """Return the number of other players still in the hand described by *table_info* (at least one): those in
+    *active_players* if the status lists them, otherwise all seated players."""
+    active = table_info.get('active_players')
+    players = active if active is not None else table_info.get('players') or {}
+    return max(len(players) - 1, 1)
+
+
+def betting(table_info, playername):
+    """Return (to_call, pot, stack) of *playername* from the table status: the chips needed to match the highest bet
+    of the current round, the pot including all bets of the round (*pot* in the status holds the earlier rounds)
+    and our remaining chips, None if the status does not tell."""
+    bets = table_info.get('bets') or {}
+    to_call = max(bets.values(), default=0) - bets.get(playername, 0)
+    pot = table_info.get('pot', 0) + sum(bets.values())
+    stack = (table_info.get('stacks') or {}).get(playername)
+    return to_call, pot, stack
 
 
 class pokerAI(object):
-    def __init__(self):
+    def __init__(self, time_budget=0.05, target_error=0.01, workers=None, exact_limit=1000000, playername=None,
+                 raise_margin=0.15, bet_fraction=0.75, stats=None, read_margin=0.05, min_hands=30):
         self.full_deck = {create_card(i, j) for i in range(2, 15) for j in 'hsdc'}
+        self.time_budget = time_budget
+        self.target_error = target_error
+        self.workers = workers
+        self.exact_limit = exact_limit
+        self.playername = playername
+        self.raise_margin = raise_margin
+        self.bet_fraction = bet_fraction
+        self.stats = stats
+        self.read_margin = read_margin
+        self.min_hands = min_hands
+        self.last_odds = None
 
     def get_winning_odds(self, cards, table_info):
-        pass
+        """Return the showdown odds of our hole *cards* against every opponent at the table, see *equity.Odds*.
+        Preflop odds come from the precomputed table, later they are enumerated exactly when that is cheap enough
+        (late streets, few opponents) and sampled otherwise.
+        """
+        hole = encode_cards(cards)
+        board = encode_cards(board_cards(table_info))
+        opponents = count_opponents(table_info)
+        if not board:
+            odds = preflop.preflop_odds(hole, opponents)
+            if odds is not None:
+                return odds
+        return equity.odds(hole, board, opponents, exact_limit=self.exact_limit, target_error=self.target_error,
+                           time_budget=self.time_budget, workers=self.workers)
+
+    def get_range_odds(self, cards, table_info, villain, max_runouts=200):
+        """Return the heads-up odds of our hole *cards* against an opponent whose holding is in the *villain* range
+        (a *ranges.Range* or range notation such as 'QQ+, AKs'), see *ranges.range_odds*."""
+        return ranges.hand_vs_range(encode_cards(cards), villain, encode_cards(board_cards(table_info)),
+                                    max_runouts=max_runouts)
+
+    def quick_odds(self, hole, board, opponents):
+        """Return the cheapest available estimate: the preflop table, the immediate hand strength after the flop,
+        or an uninformed guess with maximal error."""
+        odds = preflop.preflop_odds(hole, opponents) if not board else equity.hand_strength(hole, board, opponents)
+        if odds is None:
+            fair = 1.0 / (opponents + 1)
+            odds = Odds(fair, 0.0, 1.0 - fair, fair, 1.0, 0)
+        return odds
+
+    def read(self, table_info):
+        """Return how much the bet we face says, from the *stats* (an *opponents.OpponentStats*) of the player with
+        the highest bet: 1 if that player rarely raises (preflop) or bets and raises (later), -1 if it does so all
+        the time, 0 if neither, or we have no bet to face or not seen the player in *min_hands* hands yet."""
+        bets = table_info.get('bets')
+        if self.stats is None or not bets:
+            return 0
+        name = max(bets, key=bets.get)
+        stats = self.stats.get(name) if name != self.playername else None
+        if stats is None or stats.hands < self.min_hands:
+            return 0
+        if not board_cards(table_info):
+            return 1 if stats.pfr < 0.1 else -1 if stats.pfr > 0.3 else 0
+        return 1 if stats.aggression_factor < 1 else -1 if stats.aggression_factor > 3 else 0
+
+    def thresholds(self, to_call, pot, opponents, tendency=0):
+        """Return the equities (call, raise) at which calling and raising become profitable: calling needs the pot
+        odds, raising a margin above our fair share of the pot, and above the pot odds. With a *tendency* from
+        *read*, calling needs *read_margin* more (or less) than the pot odds."""
+        call = to_call / (pot + to_call) if to_call > 0 else 0.0
+        if to_call > 0:
+            call = min(max(call + tendency * self.read_margin, 0.0), 1.0)
+        fair = 1.0 / (opponents + 1)
+        return call, min(0.95, max(fair, call) + self.raise_margin)
+
+    def decide(self, equity, to_call, pot, stack, opponents, tendency=0):
+        """Return the actions to try for our *equity*, best first."""
+        call, raise_at = self.thresholds(to_call, pot, opponents, tendency)
+        if equity >= raise_at and (stack is None or stack > to_call):
+            amount = to_call + max(1, round(self.bet_fraction * (pot + to_call)))
+            if stack is not None:
+                amount = min(amount, stack)
+            return [('raise', {'amount': amount}), 'call', 'check']
+        if to_call == 0:
+            return ['check', 'call']
+        if equity >= call:
+            return ['call', 'check']
+        return ['fold', 'check']
+
+    @metrics.timed('decision_seconds', profile=True)
+    def get_strategy(self, cards, table_info, deadline=None):
+        """Return the actions to try for our hole *cards*, best first, as action names or (name, data) tuples.
+
+        The decision is anytime: it starts from the cheapest equity estimate (*quick_odds*) and refines it by
+        sampling only while the confidence interval of the equity still contains one of the *thresholds* from
+        the pot odds and bet sizes of the status (and the *read* of the bettor), and only until the *deadline* (a *time.perf_counter* value,
+        *time_budget* from now by default). Whatever is known at that point decides.
+        """
+        deadline = time.perf_counter() + self.time_budget if deadline is None else deadline
+        hole = encode_cards(cards)
+        board = encode_cards(board_cards(table_info))
+        opponents = count_opponents(table_info)
+        to_call, pot, stack = betting(table_info, self.playername)
+        tendency = self.read(table_info)
+        thresholds = self.thresholds(to_call, pot, opponents, tendency)
+
+        def settled(odds):
+            low, high = odds.interval
+            return not any(low < t < high for t in thresholds)
 
-    def get_strategy(self, cards, table_info):
-        pass
+        odds = self.quick_odds(hole, board, opponents)
+        remaining = deadline - time.perf_counter()
+        if not settled(odds) and remaining > 0:
+            metrics.count('decisions_sampled_total')
+            odds = equity.monte_carlo_odds(hole, board, opponents, target_error=self.target_error,
+                                           time_budget=remaining, workers=self.workers, stop=settled)
+        self.last_odds = odds
+        return self.decide(odds.equity, to_call, pot, stack, opponents, tendency)
 
 
 if __name__ == '__main__':
     ai = pokerAI()
-    print(ai.full_deck, len(ai.full_deck))
\ No newline at end of file
+    cards = random.sample(sorted(ai.full_deck), 5)
+    table_info = {'players': {'1': 'FetteElke', '2': 'a', '3': 'b'}, 'community_cards': cards[2:]}
+    print(cards[:2], table_info['community_cards'], ai.get_winning_odds(cards[:2], table_info))
+    print(ai.get_strategy(cards[:2], table_info))
@@ -1,79 +1,232 @@
-import requests
 from argparse import ArgumentParser
+import random
 import time
 from jsonconfig import JSONConfig
-from ranking import *
+from history import HistoryRecorder
+import metrics
+from opponents import OpponentStats
+from polling import AdaptivePoller
+from pokerAI import pokerAI
+from tablestate import TableState
+
+# server errors that are worth another try, the request did not change anything
+RETRY_STATUS = {502, 503, 504}
+
 
 class Player(object):
+    """A seat at one table. Construction is cheap: *requests*, the HTTP session, the config file and the
+    registration with the server are only touched when they are first needed."""
+
     def __init__(self, **kwargs):
-        self.UUID = 'e616926e-fdba-47dc-9655-61c5a9c02626'
+        self._UUID = None
+        self._session = None
+        self._config = None
+        self.configfile = '.config'
         self.base_url = 'http://pokerserver.retreat.tngtech.com:5555'
         self.playername = 'FetteElke'
+        self.tablename = None
+        self.timeout = 2.0
+        self.retries = 3
+        self.backoff = 0.05
+        self.pool_size = 4
+        self.decision_time = 0.5
+        self.history_dir = None
+        self.stats_file = None
         for k, v in kwargs.items():
             if v is not None:
-                self.__dict__[k] = v
+                setattr(self, k, v)
                 print('setting', k, v)
-        self.config = JSONConfig(self.configfile)
-        for player in self.config.items('players'):
-            if player[0] == self.playername:
-                self.UUID = player[1]
+        self.seat = None
+        self.status = None
+        self.status_etag = None
+        self.poller = AdaptivePoller(self.playername)
+        self.table = TableState(self.playername)
+        self.stats = OpponentStats(self.stats_file) if self.stats_file else None
+        self.ai = pokerAI(playername=self.playername, time_budget=self.decision_time, stats=self.stats)
+        self.history = HistoryRecorder(self.history_dir) if self.history_dir else None
+
+    @property
+    def session(self):
+        """The keep-alive HTTP session, created on first use."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    @property
+    def config(self):
+        if self._config is None:
+            self._config = JSONConfig(self.configfile)
+        return self._config
+
+    @property
+    def UUID(self):
+        """Our UUID: given explicitly, or looked up in the config file (registering the player if it is not there)
+        when it is first needed."""
+        if self._UUID is None:
+            self.find_uuid()
+        return self._UUID
+
+    @UUID.setter
+    def UUID(self, UUID):
+        self._UUID = UUID
+
+    def find_uuid(self):
+        """Look up our UUID in the config file, or register the player if it is not there. Both happen under the
+        config file lock, so bots sharing the file register a name only once."""
+        with self.config.locked():
+            self.config.refresh()
+            UUID = self.config.get('players', self.playername, fallback=None)
+            if UUID:
+                self.UUID = UUID
                 print(f'found player {self.playername} with UUID {self.UUID}')
-        else:
+                return
             print(f'registering player {self.playername}')
             self.register_user()
             print(f'registered player {self.playername} with UUID {self.UUID}')
 
+    def request(self, method, path, idempotent=True, **kwargs):
+        """Send a request over the player's keep-alive session and return the response.
+
+        Connection failures are retried up to *retries* times with jittered exponential backoff. Requests that
+        are *idempotent* are retried on timeouts and gateway errors as well; actions are not, since the server
+        may already have applied them.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        import requests
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, self.base_url + path, **kwargs)
+                if not idempotent or response.status_code not in RETRY_STATUS or attempt == self.retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                retry = idempotent or isinstance(e, requests.ConnectTimeout)
+                if not retry or attempt == self.retries:
+                    metrics.count('http_errors_total')
+                    raise
+            metrics.count('http_retries_total')
+            time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    @metrics.timed('http_register_seconds')
     def register_user(self):
-        self.UUID = requests.post(self.base_url + "/uuid", json={'player_name': self.playername}).text
+        self.UUID = self.request('POST', '/uuid', idempotent=False, json={'player_name': self.playername}).text
         self.config.set('players', self.playername, self.UUID)
         self.config.save()
 
+    @metrics.timed('http_tables_seconds')
     def get_table_info(self):
-        req = requests.get(self.base_url + "/tables")
+        req = self.request('GET', '/tables')
         tables = req.json()['tables']
         for t in tables:
             if t['name'] == self.tablename:
                 return t
         return None
 
-    def join_table(self):
-        info = self.get_table_info()
-        if self.playername in info['players'].values():
-            return
-        for i in range(1, info['max_player_count'] + 1):
-            if str(i) not in info['players']:
-                position = i
-                break
-        url = self.base_url + '/table/' + self.tablename + '/actions/join?uuid=' + self.UUID
-        req = requests.post(url, json={'position': position})
+    @metrics.timed('http_join_seconds')
+    def join_table(self, position=None):
+        """Take a seat at the table, unless we already sit there: at *position* if given (e.g. handed out by a
+        *fleet.Fleet*), otherwise at the first free position of the table listing. Return the status code of the
+        join request, 200 if we already sit there, or None if there is no free seat."""
+        if self.seat is not None:
+            return 200
+        if position is None:
+            info = self.get_table_info()
+            if info is None:
+                return None
+            for p, name in info['players'].items():
+                if name == self.playername:
+                    self.seat = int(p)
+                    return 200
+            position = next((i for i in range(1, info['max_player_count'] + 1) if str(i) not in info['players']),
+                            None)
+            if position is None:
+                return None
+        req = self.request('POST', '/table/' + self.tablename + '/actions/join', idempotent=False,
+                           params={'uuid': self.UUID}, json={'position': position})
         print(req.text)
+        if req.status_code == 200:
+            self.seat = position
+        return req.status_code
 
+    @metrics.timed('http_action_seconds')
     def table_action(self, action, data=None):
-        url = self.base_url + '/table/' + self.tablename + '/actions/' + action + '?uuid=' + self.UUID
-        req = requests.post(url, json=data)
+        req = self.request('POST', '/table/' + self.tablename + '/actions/' + action, idempotent=False,
+                           params={'uuid': self.UUID}, json=data)
         print(req.text)
         return req.status_code
 
+    @metrics.timed('http_status_seconds')
     def get_table_status(self):
-        url = self.base_url + '/table/' + self.tablename + '?uuid=' + self.UUID
-        req = requests.get(url)
+        """Return the table status, or the HTTP status code on errors. If the server supports conditional
+        requests and the status did not change since the last call, the previous status is returned."""
+        headers = {'If-None-Match': self.status_etag} if self.status_etag else {}
+        req = self.request('GET', '/table/' + self.tablename, params={'uuid': self.UUID}, headers=headers)
+        if req.status_code == 304:
+            metrics.count('http_not_modified_total')
+            return self.status
         if req.status_code == 200:
-            return req.json()
+            status = self.status = req.json()
+            self.status_etag = req.headers.get('ETag')
+            if self.seat is not None and self.playername not in (status.get('players') or {}).values():
+                # we lost our seat, join again on the next tick
+                self.seat = None
+            return status
         else:
             return req.status_code
 
+    def decide(self, status, deadline=None):
+        """Return the actions to try on our turn, best first. Without our hole cards in the status there is
+        nothing to decide, and we call or check."""
+        if not self.table.hole_cards:
+            return ['call', 'check']
+        return self.ai.get_strategy(self.table.hole_cards, status, deadline)
+
+    def act(self, status):
+        """Decide within *decision_time* and try the actions in order until the server accepts one."""
+        for action in self.decide(status, time.perf_counter() + self.decision_time):
+            data = None
+            if isinstance(action, tuple):
+                action, data = action
+            if self.table_action(action, data) == 200:
+                if self.history:
+                    self.history.action(self.playername, action, (data or {}).get('amount'))
+                return action
+        return None
+
     def play(self):
-        while True:
-            self.join_table()
-            status = self.get_table_status()
-            print('table {}, current player {}'.format(self.tablename, status['current_player']))
-            if status['current_player'] == self.playername:
-                print(status)
-                response = self.table_action('call')
-                if response != 200:
-                    self.table_action('check')
-                print('called')
-            time.sleep(0.3)
+        try:
+            while True:
+                self.join_table()
+                status = self.get_table_status()
+                interval = self.poller.next_interval(status)
+                if not isinstance(status, dict):
+                    time.sleep(interval)
+                    continue
+                events = self.table.apply(status)
+                if self.history:
+                    self.history.observe(self.table, events)
+                if self.stats:
+                    self.stats.observe(self.table, events)
+                for event in events:
+                    print('table {}: {}'.format(self.tablename, event))
+                if self.table.our_turn:
+                    print('action', self.act(status))
+                    self.poller.acted()
+                time.sleep(interval)
+        finally:
+            if self.history:
+                self.history.close()
+            if self.stats:
+                self.stats.save()
+            print('latency', self.poller.report())
 
 
 if __name__ == '__main__':
@@ -84,7 +237,14 @@ if __name__ == '__main__':
     argparser.add_argument('-t', '--tablename', type=str, help='name of the table to join')
     argparser.add_argument('-b', '--base_url', type=str, help='set the address of the poker server')
     argparser.add_argument('-c', '--configfile', type=str, default='.config')
+    argparser.add_argument('--timeout', type=float, help='timeout of every request in seconds')
+    argparser.add_argument('--retries', type=int, help='how often failed requests are retried')
+    argparser.add_argument('--decision_time', type=float, help='seconds to spend on a decision at most')
+    argparser.add_argument('--history_dir', type=str, default='history', help='directory of the hand history logs')
+    argparser.add_argument('--stats_file', type=str, default='opponents.stats', help='file of the opponent statistics')
+    metrics.add_arguments(argparser)
 
     params = vars(argparser.parse_args())
+    metrics.start_from_args(params)
     player = Player(**params)
     # player.play()
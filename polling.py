@@ -0,0 +1,83 @@
+"""Adaptive polling: decide how long to wait before the next table status request.
+
+The closer the action is to our seat, the shorter the interval, so we notice our turn quickly. While we are out of
+the hand, not seated, or the table is idle, the interval grows exponentially, so we do not hammer the server.
+The poller also measures how long it took us to notice our turn and to act on it.
+"""
+import time
+
+
+def percentiles(values, points=(50, 95)):
+    """Return a dict with count, mean, the given percentiles (nearest rank) and max of *values*."""
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+    result = {'count': len(values), 'mean': sum(values) / len(values), 'max': values[-1]}
+    for p in points:
+        result['p{}'.format(p)] = values[min(len(values) - 1, int(p / 100 * len(values)))]
+    return result
+
+
+def seats_until_turn(status, playername):
+    """Return how many players act before us (0 if it is our turn), or None if we are not part of the hand.
+
+    Players are ordered by seat position; if the status lists the *active_players* of the hand, only those count.
+    """
+    if not isinstance(status, dict) or not status.get('current_player'):
+        return None
+    seats = sorted((status.get('players') or {}).items(), key=lambda item: int(item[0]))
+    active = status.get('active_players')
+    names = [name for position, name in seats if active is None or name in active]
+    if playername not in names or status['current_player'] not in names:
+        return None
+    return (names.index(playername) - names.index(status['current_player'])) % len(names)
+
+
+class AdaptivePoller(object):
+    def __init__(self, playername, min_interval=0.02, base_interval=0.3, max_interval=2.0, backoff=1.5):
+        self.playername = playername
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.idle_interval = base_interval
+        self.last_poll = None
+        self.our_turn = False
+        self.turn_seen = None
+        self.detection = []
+        self.reaction = []
+
+    def next_interval(self, status, now=None):
+        """Record a poll that returned *status* and return the seconds to wait before the next one."""
+        now = time.monotonic() if now is None else now
+        distance = seats_until_turn(status, self.playername)
+        if distance == 0:
+            if not self.our_turn and self.last_poll is not None:
+                # our turn started at some point since the previous poll, this is the worst case delay
+                self.detection.append(now - self.last_poll)
+                self.turn_seen = now
+            self.our_turn = True
+            interval = self.min_interval
+        else:
+            self.our_turn = False
+            if distance is None:
+                self.idle_interval = min(self.max_interval, self.idle_interval * self.backoff)
+                interval = self.idle_interval
+            else:
+                self.idle_interval = self.base_interval
+                interval = min(self.base_interval, self.min_interval * 2 ** (distance - 1))
+        self.last_poll = now
+        return interval
+
+    def acted(self, now=None):
+        """Record that we acted on our turn, measuring the reaction latency from the start of the turn."""
+        now = time.monotonic() if now is None else now
+        if self.turn_seen is not None:
+            self.reaction.append(now - self.turn_seen + self.detection[-1])
+            self.turn_seen = None
+        self.our_turn = False
+
+    def report(self):
+        """Return latency statistics in seconds: *detection* is the time until we noticed our turn (upper bound),
+        *reaction* the time from the start of the turn until our action was answered."""
+        return {'detection': percentiles(self.detection), 'reaction': percentiles(self.reaction)}
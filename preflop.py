@@ -0,0 +1,107 @@
+"""Preflop equity of the 169 starting hand classes against one to nine random opponents.
+
+Before the flop only the ranks of the hole cards and whether they are suited matter, so every hand falls into one of
+169 classes: pairs ('QQ'), suited ('AKs') and offsuit ('AKo') hands. Their odds are precomputed by simulation, stored
+in *TABLE_FILE* and looked up instantly.
+"""
+from argparse import ArgumentParser
+import json
+import math
+import os
+
+import ranking
+from equity import Odds, Z_95
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.json')
+MAX_OPPONENTS = 9
+RANK_CHARS = '23456789TJQKA'
+
+
+def hand_class(hole):
+    """Return the starting hand class of two integer-encoded hole cards, e.g. 'AKs', 'T9o' or 'QQ'."""
+    high, low = sorted(hole, reverse=True)
+    name = RANK_CHARS[high >> 2] + RANK_CHARS[low >> 2]
+    if high >> 2 == low >> 2:
+        return name
+    return name + ('s' if high & 3 == low & 3 else 'o')
+
+
+def hand_classes():
+    """Return all 169 starting hand classes, each with a representative pair of integer-encoded hole cards."""
+    classes = {}
+    for high in range(13):
+        for low in range(high + 1):
+            hands = [[4 * high, 4 * low + 1]]
+            if high != low:
+                hands.append([4 * high, 4 * low])
+            for hole in hands:
+                classes[hand_class(hole)] = hole
+    return classes
+
+
+def simulate_class(hole, samples, rng):
+    """Deal *samples* random boards and hands of *MAX_OPPONENTS* opponents against *hole* with numpy.
+
+    The first k opponents of every deal form a deal against k opponents, so one simulation yields the odds against
+    1 to *MAX_OPPONENTS* opponents. Return a list of [win, tie, equity, error] for every opponent count.
+    """
+    import numpy as np
+    live = np.array([c for c in ranking.deck if c not in hole])
+    drawn = rng.permuted(np.tile(live, (samples, 1)), axis=1)[:, :5 + 2 * MAX_OPPONENTS]
+    board = drawn[:, :5]
+    hero = ranking.rank_many(np.hstack([np.tile(hole, (samples, 1)), board]))
+    best = np.zeros(samples, dtype=np.int64)
+    ties = np.zeros(samples, dtype=np.int64)
+    results = []
+    for k in range(MAX_OPPONENTS):
+        opponent = ranking.rank_many(np.hstack([drawn[:, 5 + 2 * k:7 + 2 * k], board]))
+        ties = np.where(opponent > best, 1, ties + (opponent == best))
+        best = np.maximum(best, opponent)
+        win = hero > best
+        tie = hero == best
+        share = np.where(win, 1.0, np.where(tie, 1.0 / (1 + ties), 0.0))
+        error = Z_95 * share.std() / math.sqrt(samples)
+        results.append([round(float(x), 5) for x in (win.mean(), tie.mean(), share.mean(), error)])
+    return results
+
+
+def build_table(samples=100000, seed=0, path=TABLE_FILE):
+    """Simulate every starting hand class with *samples* deals and write the table to *path*."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    table = {name: simulate_class(hole, samples, rng) for name, hole in hand_classes().items()}
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        # one line per hand class keeps the file readable and diffable
+        f.write('{{"samples": {}, "seed": {}, "odds": {{\n'.format(samples, seed))
+        f.write(',\n'.join('"{}": {}'.format(name, json.dumps(odds)) for name, odds in table.items()))
+        f.write('\n}}\n')
+    os.replace(tmp, path)
+
+
+_table = None
+
+
+def load_table(path=TABLE_FILE):
+    global _table
+    with open(path) as f:
+        _table = json.load(f)
+    return _table
+
+
+def preflop_odds(hole, opponents):
+    """Return the precomputed *equity.Odds* of two integer-encoded *hole* cards against *opponents* random hands,
+    or None if the table does not cover that many opponents."""
+    if not 1 <= opponents <= MAX_OPPONENTS:
+        return None
+    table = _table or load_table()
+    win, tie, equity, error = table['odds'][hand_class(hole)][opponents - 1]
+    return Odds(win, tie, 1.0 - win - tie, equity, error, table['samples'])
+
+
+if __name__ == '__main__':
+    argparser = ArgumentParser(description='build the preflop equity table')
+    argparser.add_argument('-n', '--samples', type=int, default=100000, help='simulated deals per starting hand')
+    argparser.add_argument('-s', '--seed', type=int, default=0)
+    args = argparser.parse_args()
+    build_table(args.samples, args.seed)
@@ -1,6 +1,8 @@
-from unittest import TestCase, skip
-from unittest.mock import Mock
-from collections import defaultdict, OrderedDict, Counter
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import permutations
+
+import metrics
 
 suits = ['s', 'c', 'd', 'h']
 
@@ -16,6 +18,10 @@ def parse_cards(cards):
     return sorted([(int(rank.get(c[0], (c[0]))), c[-1]) for c in cards], key=lambda x: -x[0])
 
 
+# rank of the first character of a card string; parsed cards carry the rank itself
+_RANK_VALUES = dict({str(r): r for r in range(2, 10)}, **{'1': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14})
+
+
 def create_card(rank, suit):
     int2rank = {
         11: 'J',
@@ -74,34 +80,32 @@ def find_two_pairs(cards):
     return pairs + [card[0] for card in pc if card[0] not in pairs][:1]
 
 
+def _suit_masks(cards):
+    """Return the 13-bit rank masks (bit r - 2 set for rank r) of *cards* by suit, for the suits present. *cards*
+    are card strings or parsed (rank, suit) tuples; a card given twice counts once."""
+    masks = {}
+    for c in cards:
+        masks[c[-1]] = masks.get(c[-1], 0) | 1 << (_RANK_VALUES.get(c[0], c[0]) - 2)
+    return masks
+
+
 def find_straight(cards):
     """If *cards* contain a straight, return the rank of its highest card. Otherwise return None.
     A straight consists of five cards of sequential rank, e.g. ['2h', '3c', '4d', '5d', '6h']. As a special rule, aces may be used with rank 1, so ['Ac', '2h', '3c', '4d', '5d'] also forms a (lower) straight.
     """
-    ranks = list(OrderedDict.fromkeys([rank for rank, suit in parse_cards(cards)]))
-    if ranks[0] == 14:
-        ranks.append(1)
-    if len(ranks) < 5:
-        return None
-    for i in range(len(ranks)):
-        cmp = ranks[i:i+5]
-        if len(cmp) < 5:
-            continue
-        if cmp == list(range(cmp[0], cmp[0]-5, -1)):
-            return cmp[0]
-    return None
+    mask = 0
+    for suit_mask in _suit_masks(cards).values():
+        mask |= suit_mask
+    return _STRAIGHT_HIGH[mask] or None
 
 
 def find_flush(cards):
-    """If *cards* contain a flush (five cards of the same suit), return the ranks of its cards, sorted in descending order. Otherwise return None."""
-    pc = parse_cards(cards)
-    count = defaultdict(int)
-    for c in pc:
-        count[c[1]] += 1
-    for s in suits:
-        if count[s] >= 5:
-            return [card[0] for card in pc if card[1] == s][:5]
-    return None
+    """If *cards* contain a flush (five cards of the same suit), return the ranks of its cards, sorted in descending order. Otherwise return None.
+    With more than nine cards several suits may hold a flush, the best one is returned."""
+    top = max([_TOP_FIVE[m] for m in _suit_masks(cards).values() if bin(m).count('1') >= 5], default=0)
+    if not top:
+        return None
+    return [(top >> shift) & 0xF for shift in (16, 12, 8, 4, 0)]
 
 
 def find_full_house(cards):
@@ -124,14 +128,12 @@ def find_full_house(cards):
 
 def find_straight_flush(cards):
     """If *cards* contain a straight flush (a straight, where all cards are of the same suit), return the rank of its highest card. Otherwise return None.
+    Every suit is checked, so with more than nine cards the highest straight flush of all suits is returned.
     """
-    suitcount = Counter([suit for rank, suit in parse_cards(cards)])
-    for suit, count in suitcount.items():
-        if count >= 5:
-            return find_straight([c for c in cards if c[-1] == suit])
-    return None
+    return max([_STRAIGHT_HIGH[m] for m in _suit_masks(cards).values()], default=0) or None
 
 
+@metrics.timed('rank_function_seconds')
 def rank_function(cards):
     functions = [
         find_straight_flush,
@@ -151,172 +153,446 @@ def rank_function(cards):
             return 9 - i, rank
 
 
-class TestFindHighCard(TestCase):
-    def test_empty(self):
-        self.assertEqual([], find_high_card([]))
+# Integer card encoding: card = 4 * (rank - 2) + suit index, so 0..51 with the
+# rank in the upper bits (card >> 2 is 0 for deuces, 12 for aces) and the suit
+# in the lowest two bits (card & 3 indexes *suits*).
+deck = list(range(52))
+# the 36 cards of short-deck (6+) hold'em, sixes to aces
+SHORT_DECK = [c for c in deck if c >> 2 >= 4]
+
 
-    def test_less_than_five(self):
-        cards = parse_cards(['5d', 'Jh', 'As'])
-        self.assertEqual([14, 11, 5], find_high_card(cards))
+def encode_card(card):
+    """Convert a card string such as '10d' (or a parsed (rank, suit) tuple) into its integer code."""
+    rank, suit = parse_cards([card])[0]
+    return 4 * (rank - 2) + suits.index(suit)
 
-    def test_more_than_five(self):
-        cards = parse_cards(['5d', 'Jh', 'As', '10c', '2c', '2d', '4d'])
-        self.assertEqual([14, 11, 10, 5, 4], find_high_card(cards))
 
+def encode_cards(cards):
+    return [encode_card(c) for c in cards]
 
-class TestNOfAKind(TestCase):
-    def test_not_found(self):
-        cards = parse_cards(['5d', 'Jh', 'As', '10c', '2c', '3d', '4d'])
-        self.assertIsNone(find_n_of_a_kind(2, cards))
 
-    def test_one_result(self):
-        cards = parse_cards(['5d', 'Jh', 'As', '10c', '2c', '2d', '4d'])
-        self.assertEqual([2, 14, 11, 10], find_n_of_a_kind(2, cards))
+def decode_card(card):
+    """Convert an integer card code back into its string representation."""
+    return create_card((card >> 2) + 2, suits[card & 3])
 
-    def test_two_results(self):
-        cards = parse_cards(['5d', '5c', '5h', '2s', '2c', '2d', 'As'])
-        self.assertEqual([5, 14, 2], find_n_of_a_kind(3, cards))
 
-    def test_bigger_n(self):
-        cards = parse_cards(['5d', 'Jh', 'As', '10c', '5c', '5d', '5d'])
-        self.assertEqual([5, 14], find_n_of_a_kind(4, cards))
+def decode_cards(cards):
+    return [decode_card(c) for c in cards]
 
 
-class TestFindTwoPairs(TestCase):
-    def test_not_found(self):
-        cards = parse_cards(['5d', 'Jh', 'As', '5c', '2c', '3d', '4d'])
-        self.assertIsNone(find_two_pairs(cards))
+_suit_permutations = list(permutations(range(4)))
 
-    def test_found(self):
-        cards = parse_cards(['5d', 'Jh', 'As', '5c', '2c', '2d', '4d'])
-        self.assertEqual([5, 2, 14], find_two_pairs(cards))
 
-    def test_only_four_cards(self):
-        cards = parse_cards(['5d', '5c', '2c', '2d'])
-        self.assertEqual([5, 2], find_two_pairs(cards))
+def canonical_codes(hole, board=()):
+    """Map integer-encoded *hole* and *board* cards to a representative that is the same for all hands which only
+    differ by a permutation of the suits, e.g. AhKh on a 2h7c9d board and AsKs on a 2s7d9c board.
+
+    Return a pair of sorted tuples (hole, board), the smallest one among all 24 suit relabellings.
+    """
+    best = None
+    for perm in _suit_permutations:
+        key = (tuple(sorted(c & ~3 | perm[c & 3] for c in hole)), tuple(sorted(c & ~3 | perm[c & 3] for c in board)))
+        if best is None or key < best:
+            best = key
+    return best
+
+
+def canonical_cards(hole, board=()):
+    """String version of *canonical_codes*: return the canonical (hole, board) lists of card strings."""
+    hole, board = canonical_codes(encode_cards(hole), encode_cards(board))
+    return decode_cards(hole), decode_cards(board)
 
-    def test_three_pairs(self):
-        cards = parse_cards(['5d', '2h', 'As', '5c', '2c', 'Jd', 'Jd'])
-        self.assertEqual([11, 5, 14], find_two_pairs(cards))
 
+def _build_rank_tables():
+    """Return the tables *_STRAIGHT_HIGH* and *_TOP_FIVE*, indexed by a 13-bit rank mask (bit r - 2 set for rank r).
 
-class TestFindStraight(TestCase):
-    def test_not_found(self):
-        cards = parse_cards(['4d', '7h', '2s', '5c', '7c', '6d', 'Qd'])
-        self.assertIsNone(find_straight(cards))
-
-    def test_with_double(self):
-        cards = parse_cards(['4d', '7h', '8s', '5c', '7c', '6d', 'Qd'])
-        self.assertEqual(8, find_straight(cards))
-
-    def test_straight_with_six_cards(self):
-        cards = parse_cards(['4d', '8h', '3s', '5c', '7c', '6d', 'Qd'])
-        self.assertEqual(8, find_straight(cards))
-
-    def test_find_straight_low_ace(self):
-        cards = parse_cards(['4d', '8h', '3s', '5c', '2c', '7d', 'Ad'])
-        self.assertEqual(5, find_straight(cards))
-
-    def test_dont_use_low_ace_if_better_straight_possible(self):
-        cards = parse_cards(['4d', '8h', '3s', '5c', '2c', '6d', 'Ad'])
-        self.assertEqual(6, find_straight(cards))
-
-    def test_no_low_king(self):
-        cards = parse_cards(['Kd', '8h', '3s', '4c', '2c', '7d', 'Ad'])
-        self.assertIsNone(find_straight(cards))
-
-
-class TestFindFlush(TestCase):
-    def test_not_found(self):
-        cards = parse_cards(['10d', '8d', '3c', '5h', 'Qd', '7d', 'As'])
-        self.assertIsNone(find_flush(cards))
-
-    def test_find_flush(self):
-        cards = parse_cards(['10d', '8d', '3d', '5d', 'Qd', 'As'])
-        self.assertEqual([12, 10, 8, 5, 3], find_flush(cards))
-
-    def test_more_than_five_cards(self):
-        cards = parse_cards(['10d', '8d', '3d', '5d', 'Qd', '7d', 'As'])
-        self.assertEqual([12, 10, 8, 7, 5], find_flush(cards))
-
-
-class TestFindFullHouse(TestCase):
-    def test_no_triple(self):
-        cards = parse_cards(['10d', '10s', '3c', '3h', 'Qd', '7d', 'As'])
-        self.assertIsNone(find_full_house(cards))
-
-    def test_no_pair(self):
-        cards = parse_cards(['10d', '10s', '3c', '10h', 'Qd', '7d', 'As'])
-        self.assertIsNone(find_full_house(cards))
-
-    def test_find_full_house(self):
-        cards = parse_cards(['10d', '10s', '3d', '5d', '3h', '3c', 'As'])
-        self.assertEqual([3, 10], find_full_house(cards))
-
-    def test_choose_best(self):
-        cards = parse_cards(['10d', '10s', '3d', 'Qd', '3h', '3c', 'Qs'])
-        self.assertEqual([3, 12], find_full_house(cards))
-
-    def two_triples(self):
-        cards = parse_cards(['10d', '10s', '10h', '3d', '3h', 'Qc', '3s'])
-        self.assertEqual([3, 12], find_full_house(cards))
-
-
-class TestFindStraightFlush(TestCase):
-    def test_no_flush(self):
-        cards = parse_cards(['2d', '3d', '4s', '5c', '6d', '7d', '8d'])
-        self.assertIsNone(find_straight_flush(cards))
-
-    def test_no_straight(self):
-        cards = parse_cards(['10d', '10d', '3d', '3d', 'Qd', '7d', 'Ad'])
-        self.assertIsNone(find_straight_flush(cards))
-
-    def test_find_straight_flush(self):
-        cards = parse_cards(['2d', '3d', '4d', '5d', '6d', '7d', '8c'])
-        self.assertEqual(7, find_straight_flush(cards))
-
-    def test_with_low_ace(self):
-        cards = parse_cards(['2d', '3d', '4d', '5d', '6c', '7c', 'Ad'])
-        self.assertEqual(5, find_straight_flush(cards))
-
-
-class TestRanking(TestCase):
-    def test_ranking(self):
-        # In particular check cases where two rankings apply (e.g. Full House and Flush)
-        card_sets = [
-            # Straight Flush
-            ['As', 'Ks', 'Qs', 'Js', '10s', '2c', '3c'],
-            ['Ks', 'Qs', 'Js', '10s', '9s', '2c', '3c'],
-            # 4 of a kind
-            ['10s', '10d', '10c', '10h', 'As', '2c', '2d'],
-            ['10s', '10d', '10c', '10h', 'Ks', '2c', '2d'],
-            # Full House
-            ['As', 'Ad', 'Ah', 'Kh', 'Ks', '2c', '2d'],
-            ['3s', '3d', '3h', 'Kh', 'Ks', '2c', '2d'],
-            # Flush
-            ['3s', 'Ks', '4s', '10s', '7s', '2c', '2d'],
-            ['3s', 'Qs', '4s', '10s', '7s', '2c', '2d'],
-            # Straight
-            ['3s', '4d', '5h', '6d', '7c', '2c', '2d'],
-            ['As', '2c', '3s', '4d', '5h', '7c', '2d'],
-            # 3 of a kind
-            ['10s', '10d', '10c', 'Ah', 'Ks', '3c', '2d'],
-            ['10s', '10d', '10c', 'Ah', 'Qs', '3c', '2d'],
-            # Two Pairs
-            ['10s', '10d', 'Kh', '4c', '4c', '2h', '6d'],
-            ['10s', '10d', 'Ah', '3c', '3c', '2h', '6d'],
-            ['10s', '10d', '4h', '3c', '3c', '2h', '6d'],
-            # 2 of a kind
-            ['10s', '10d', 'Ah', '4c', '5c', '2h', '6d'],
-            ['10s', '10d', 'Kh', '3c', '5c', '2h', '6d'],
-            # High card
-            ['Qs', '10d', 'Ah', '3c', '5c', '2h', '6d'],
-            ['Qs', '10d', 'Kh', '3c', '5c', '2h', '6d'],
-        ]
-
-        ranks = [rank_function(c) for c in card_sets]
-        for rank, card_set in zip(ranks, card_sets):
-            print(rank, card_set)
-
-        sorted_card_sets = sorted(card_sets, key=rank_function, reverse=True)
-        self.assertListEqual(card_sets, sorted_card_sets)
+    *_STRAIGHT_HIGH* holds the rank of the highest straight in the mask (5 for the wheel) or 0. It is filled by
+    marking every superset of the ten straight patterns, lowest straight first, so the highest one wins.
+    *_TOP_FIVE* holds the five highest ranks of the mask packed into nibbles like the ranks of *pack_strength*,
+    zero padded. The entry of a mask is its highest rank followed by the top four of the mask without it, so the
+    table is doubled once per rank with shifts of the entries so far.
+    """
+    size = 1 << 13
+    straight_high = bytearray(size)
+    for high in range(5, 15):
+        pattern = 0b1000000001111 if high == 5 else 0b11111 << (high - 6)
+        free = (size - 1) & ~pattern
+        subset = free
+        while True:
+            straight_high[pattern | subset] = high
+            if not subset:
+                break
+            subset = (subset - 1) & free
+    top_five = [0]
+    for r in range(13):
+        # the masks with highest bit r, in order, are those below 1 << r with bit r added
+        top_five += [(r + 2) << 16 | value >> 4 for value in top_five]
+    return straight_high, top_five
+
+
+_STRAIGHT_HIGH, _TOP_FIVE = _build_rank_tables()
+
+
+def pack_strength(category, ranks):
+    """Pack a category and a list of tie-breaking ranks into one comparable integer.
+
+    Every rank takes four bits, the list is padded with zeros to five entries. Since ranks are never zero,
+    integer comparison is identical to comparing the (category, ranks) tuples returned by *rank_function*.
+    """
+    value = category
+    for i in range(5):
+        value <<= 4
+        if i < len(ranks):
+            value |= ranks[i]
+    return value
+
+
+def unpack_strength(value):
+    """Inverse of *pack_strength*: return the (category, tie break) tuple in the format of *rank_function*."""
+    category = value >> 20
+    ranks = [(value >> shift) & 0xF for shift in (16, 12, 8, 4, 0)]
+    ranks = [r for r in ranks if r]
+    if category in (5, 9):
+        return category, ranks[0]
+    return category, ranks
+
+
+def evaluate(cards):
+    """Return the strength of the integer-encoded *cards* as a single integer.
+
+    The cards are scanned once to build rank counts and per-suit rank masks, everything else is bit
+    arithmetic. The result orders hands exactly like *rank_function* does, and *unpack_strength* turns it
+    back into the tuple *rank_function* would have returned. Cards are assumed to be distinct.
+    """
+    counts = [0] * 13
+    suit_masks = [0, 0, 0, 0]
+    suit_counts = [0, 0, 0, 0]
+    for c in cards:
+        r = c >> 2
+        counts[r] += 1
+        suit_masks[c & 3] |= 1 << r
+        suit_counts[c & 3] += 1
+    return _strength(counts, suit_masks, suit_counts, suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3])
+
+
+def _strength(counts, suit_masks, suit_counts, mask):
+    """The strength of a hand given by its rank *counts*, per-suit rank masks and card counts, and its rank *mask*."""
+    # with more than nine cards several suits may hold a flush, the best (straight) flush of all counts
+    flush = straight_flush = 0
+    for s in range(4):
+        if suit_counts[s] >= 5:
+            suit_mask = suit_masks[s]
+            straight_flush = max(straight_flush, _STRAIGHT_HIGH[suit_mask])
+            if _TOP_FIVE[suit_mask] > _TOP_FIVE[flush]:
+                flush = suit_mask
+    if straight_flush:
+        return 9 << 20 | straight_flush << 16
+
+    quad = None
+    trips = []
+    pairs = []
+    for r in range(12, -1, -1):
+        n = counts[r]
+        if n >= 4:
+            if quad is None:
+                quad = r
+        elif n == 3:
+            trips.append(r)
+        elif n == 2:
+            pairs.append(r)
+
+    # the values are packed as in *pack_strength*; kickers are the top ranks of the remaining mask from
+    # *_TOP_FIVE*, shifted below the ranks packed before them and cut to their number
+    if quad is not None:
+        return 8 << 20 | (quad + 2) << 16 | (_TOP_FIVE[mask & ~(1 << quad)] >> 4) & 0xF000
+    if trips and (pairs or len(trips) > 1):
+        pair = max(pairs[:1] + trips[1:2])
+        return 7 << 20 | (trips[0] + 2) << 16 | (pair + 2) << 12
+    if flush:
+        return 6 << 20 | _TOP_FIVE[flush]
+    high = _STRAIGHT_HIGH[mask]
+    if high:
+        return 5 << 20 | high << 16
+    if trips:
+        return 4 << 20 | (trips[0] + 2) << 16 | (_TOP_FIVE[mask & ~(1 << trips[0])] >> 4) & 0xFF00
+    if len(pairs) >= 2:
+        kicker = (_TOP_FIVE[mask & ~(1 << pairs[0]) & ~(1 << pairs[1])] >> 8) & 0xF00
+        return 3 << 20 | (pairs[0] + 2) << 16 | (pairs[1] + 2) << 12 | kicker
+    if pairs:
+        return 2 << 20 | (pairs[0] + 2) << 16 | (_TOP_FIVE[mask & ~(1 << pairs[0])] >> 4) & 0xFFF0
+    return 1 << 20 | _TOP_FIVE[mask]
+
+
+def rank_value(cards):
+    """Like *rank_function*, but return the comparable integer strength of the card strings *cards*."""
+    return evaluate(encode_cards(cards))
+
+
+# the lowest short-deck straight, with the ace below the six
+_SHORT_WHEEL = 1 << 12 | 0b1111 << 4
+
+
+def _short_straight_high(mask):
+    """*_STRAIGHT_HIGH* for short-deck rank masks, which have no deuces to fives: the ace-to-nine straight is 9."""
+    high = _STRAIGHT_HIGH[mask]
+    if not high and mask & _SHORT_WHEEL == _SHORT_WHEEL:
+        return 9
+    return high
+
+
+def evaluate_short_deck(cards):
+    """Return the strength of the integer-encoded short-deck *cards* (from *SHORT_DECK*) as a single integer.
+
+    With fewer low cards flushes are rarer than full houses in short-deck, so a flush beats a full house: category 7
+    is a flush and 6 a full house, the other categories and the packing are those of *evaluate*. An ace also plays
+    below the six, making A-6-7-8-9 the lowest straight. Straights still beat three of a kind.
+    """
+    counts = [0] * 13
+    suit_masks = [0, 0, 0, 0]
+    suit_counts = [0, 0, 0, 0]
+    for c in cards:
+        r = c >> 2
+        counts[r] += 1
+        suit_masks[c & 3] |= 1 << r
+        suit_counts[c & 3] += 1
+    mask = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+    flush = straight_flush = 0
+    for s in range(4):
+        if suit_counts[s] >= 5:
+            straight_flush = max(straight_flush, _short_straight_high(suit_masks[s]))
+            if _TOP_FIVE[suit_masks[s]] > _TOP_FIVE[flush]:
+                flush = suit_masks[s]
+    if straight_flush:
+        return 9 << 20 | straight_flush << 16
+    # the Hold'em strength is right for four of a kind and below a straight, with the short-deck changes on top
+    strength = _strength(counts, suit_masks, suit_counts, mask)
+    category = strength >> 20
+    if category == 8:
+        return strength
+    if flush:
+        return 7 << 20 | _TOP_FIVE[flush]
+    if category == 7:
+        return 6 << 20 | strength & 0xFFFFF
+    if category < 5 and mask & _SHORT_WHEEL == _SHORT_WHEEL:
+        return 5 << 20 | 9 << 16
+    return strength
+
+
+class HandState(object):
+    """The evaluation state of a growing hand, e.g. our hole cards plus the board so far, kept up to date card by
+    card: rank counts, per-suit rank masks and card counts, and the rank mask that straights are found in.
+
+    Adding or removing a card is O(1), so a hand is carried from street to street (or along a sampled runout)
+    instead of being rebuilt. *strength* equals *evaluate* of the cards, *outs* lists the cards that would improve
+    the hand category.
+    """
+    __slots__ = ('counts', 'suit_masks', 'suit_counts', 'mask', 'used', 'size')
+
+    def __init__(self, cards=()):
+        self.counts = [0] * 13
+        self.suit_masks = [0, 0, 0, 0]
+        self.suit_counts = [0, 0, 0, 0]
+        self.mask = 0
+        self.used = 0
+        self.size = 0
+        for c in cards:
+            self.add_card(c)
+
+    def add_card(self, card):
+        """Add the integer-encoded *card*, which must not be in the hand yet."""
+        bit = 1 << card
+        if self.used & bit:
+            raise ValueError('{} is already in the hand'.format(decode_card(card)))
+        r = card >> 2
+        self.counts[r] += 1
+        self.suit_masks[card & 3] |= 1 << r
+        self.suit_counts[card & 3] += 1
+        self.mask |= 1 << r
+        self.used |= bit
+        self.size += 1
+        return self
+
+    def remove_card(self, card):
+        """Remove the integer-encoded *card*, which must be in the hand."""
+        bit = 1 << card
+        if not self.used & bit:
+            raise ValueError('{} is not in the hand'.format(decode_card(card)))
+        r = card >> 2
+        self.counts[r] -= 1
+        self.suit_masks[card & 3] &= ~(1 << r)
+        self.suit_counts[card & 3] -= 1
+        if not self.counts[r]:
+            self.mask &= ~(1 << r)
+        self.used &= ~bit
+        self.size -= 1
+        return self
+
+    def copy(self):
+        other = HandState.__new__(HandState)
+        other.counts = list(self.counts)
+        other.suit_masks = list(self.suit_masks)
+        other.suit_counts = list(self.suit_counts)
+        other.mask = self.mask
+        other.used = self.used
+        other.size = self.size
+        return other
+
+    @property
+    def cards(self):
+        """The integer-encoded cards of the hand, in ascending order."""
+        return [c for c in deck if self.used >> c & 1]
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, card):
+        return bool(self.used >> card & 1)
+
+    def __repr__(self):
+        return 'HandState({})'.format(decode_cards(self.cards))
+
+    def strength(self):
+        """Return the strength of the hand, identical to *evaluate* of its cards."""
+        return _strength(self.counts, self.suit_masks, self.suit_counts, self.mask)
+
+    def category(self):
+        """Return the hand category, 1 (high card) to 9 (straight flush) as in *rank_function*."""
+        return self.strength() >> 20
+
+    def outs(self, dead=()):
+        """Return the cards, in ascending order, that are neither in the hand nor *dead* and raise the hand category
+        when added.
+
+        Without a flush at stake the suit of the added card does not matter, so the category is computed once per
+        rank; only cards whose suit already has four or more cards in the hand are evaluated one by one.
+        """
+        current = self.category()
+        unavailable = self.used
+        for c in dead:
+            unavailable |= 1 << c
+        counts = self.counts
+        result = []
+        for r in range(13):
+            counts[r] += 1
+            by_rank = _strength(counts, self.suit_masks, self.suit_counts, self.mask | 1 << r) >> 20 > current
+            counts[r] -= 1
+            for s in range(4):
+                card = 4 * r + s
+                if unavailable >> card & 1:
+                    continue
+                if self.suit_counts[s] >= 4:
+                    self.add_card(card)
+                    improves = self.category() > current
+                    self.remove_card(card)
+                else:
+                    improves = by_rank
+                if improves:
+                    result.append(card)
+        return result
+
+
+def _bit_length_many(values):
+    """Vectorized int.bit_length for non-negative integers below 2**52."""
+    import numpy as np
+    return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+
+
+@lru_cache(maxsize=None)
+def _rank_tables_many():
+    """*_STRAIGHT_HIGH* and *_TOP_FIVE* as numpy arrays, to look up whole arrays of masks."""
+    import numpy as np
+    return np.frombuffer(_STRAIGHT_HIGH, dtype=np.uint8).astype(np.int64), np.array(_TOP_FIVE, dtype=np.int64)
+
+
+def _straight_high_many(masks):
+    """The *_STRAIGHT_HIGH* entries of an array of rank masks."""
+    return _rank_tables_many()[0][masks]
+
+
+def _top_ranks_many(masks, n):
+    """Return an (N, n) array of the *n* highest ranks of every rank mask, padded with zeros."""
+    import numpy as np
+    top_five = _rank_tables_many()[1][masks]
+    return np.column_stack([(top_five >> (16 - 4 * i)) & 0xF for i in range(n)])
+
+
+def _pack_many(category, *columns):
+    """Vectorized *pack_strength*, each column holds one tie-breaking rank (or an (N, k) block of them)."""
+    import numpy as np
+    ranks = np.column_stack(columns)
+    value = np.full(len(ranks), category, dtype=np.int64)
+    for i in range(5):
+        value <<= 4
+        if i < ranks.shape[1]:
+            value |= ranks[:, i]
+    return value
+
+
+@metrics.timed('rank_many_seconds')
+def rank_many(hands):
+    """Evaluate an (N, 5..7) integer array of encoded hands at once and return an array of N strengths.
+
+    Every hand gets the same value *evaluate* would return. Rank histograms, suit histograms and rank masks are
+    built with array operations over all hands, and every category is then resolved with bit operations on the
+    masks, so there is no Python loop over the hands.
+    """
+    import numpy as np
+    hands = np.asarray(hands, dtype=np.int64)
+    if hands.ndim != 2 or not 5 <= hands.shape[1] <= 7:
+        raise ValueError('expected an (N, 5..7) array of cards, got shape {}'.format(hands.shape))
+    metrics.count('rank_many_hands_total', len(hands))
+    rows = np.arange(len(hands))
+    rank_idx = hands >> 2
+    suit_idx = hands & 3
+    bits = 1 << rank_idx
+
+    # accumulate one card position (column) at a time, there is no loop over the hands themselves
+    counts = np.zeros((len(hands), 13), dtype=np.int64)
+    suit_counts = np.zeros((len(hands), 4), dtype=np.int64)
+    suit_masks = np.zeros((len(hands), 4), dtype=np.int64)
+    for col in range(hands.shape[1]):
+        counts[rows, rank_idx[:, col]] += 1
+        suit_counts[rows, suit_idx[:, col]] += 1
+        suit_masks[rows, suit_idx[:, col]] |= bits[:, col]
+    mask = suit_masks[:, 0] | suit_masks[:, 1] | suit_masks[:, 2] | suit_masks[:, 3]
+    rank_bits = 1 << np.arange(13)
+    quad_mask = ((counts >= 4) * rank_bits).sum(axis=1)
+    trips_mask = ((counts == 3) * rank_bits).sum(axis=1)
+    pairs_mask = ((counts == 2) * rank_bits).sum(axis=1)
+
+    flush_suit = suit_counts.argmax(axis=1)
+    is_flush = suit_counts[rows, flush_suit] >= 5
+    flush_mask = np.where(is_flush, suit_masks[rows, flush_suit], 0)
+    straight_flush = _straight_high_many(flush_mask)
+    straight = _straight_high_many(mask)
+
+    quad = _bit_length_many(quad_mask) - 1
+    trips = _bit_length_many(trips_mask) - 1
+    trips_bit = np.where(trips >= 0, 1 << np.maximum(trips, 0), 0)
+    full_house_pair = _bit_length_many((trips_mask | pairs_mask) & ~trips_bit) - 1
+    pair = _bit_length_many(pairs_mask) - 1
+    pair_bit = np.where(pair >= 0, 1 << np.maximum(pair, 0), 0)
+    second_pair = _bit_length_many(pairs_mask & ~pair_bit) - 1
+    second_pair_bit = np.where(second_pair >= 0, 1 << np.maximum(second_pair, 0), 0)
+
+    conditions = [
+        straight_flush > 0,
+        quad >= 0,
+        (trips >= 0) & (full_house_pair >= 0),
+        is_flush,
+        straight > 0,
+        trips >= 0,
+        second_pair >= 0,
+        pair >= 0,
+    ]
+    choices = [
+        _pack_many(9, straight_flush),
+        _pack_many(8, quad + 2, _top_ranks_many(mask & ~(1 << np.maximum(quad, 0)), 1)),
+        _pack_many(7, trips + 2, full_house_pair + 2),
+        _pack_many(6, _top_ranks_many(flush_mask, 5)),
+        _pack_many(5, straight),
+        _pack_many(4, trips + 2, _top_ranks_many(mask & ~trips_bit, 2)),
+        _pack_many(3, pair + 2, second_pair + 2, _top_ranks_many(mask & ~pair_bit & ~second_pair_bit, 1)),
+        _pack_many(2, pair + 2, _top_ranks_many(mask & ~pair_bit, 3)),
+    ]
+    return np.select(conditions, choices, _pack_many(1, _top_ranks_many(mask, 5)))
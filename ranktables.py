@@ -0,0 +1,267 @@
+"""Lookup-table hand evaluator on top of the integer card encoding of *ranking*.
+
+Every card contributes a precomputed key: a rank part, chosen such that the sum over any multiset of at most seven
+ranks (at most four of each) is unique, and a suit part that counts the cards of each suit in a 4-bit field. Evaluating
+a hand of up to seven cards is a sum of card keys and one or two table lookups:
+
+* if a suit field overflows into its high bit (five or more cards of one suit), the rank mask of that suit indexes
+  the flush table. With at most seven cards a flush can not also hold a full house or four of a kind.
+* otherwise the rank part of the key indexes the non-flush table.
+
+Both tables store indices into the sorted list of distinct hand strengths, and the strengths are exactly those
+returned by *ranking.evaluate*. The tables are generated on first use, written to *TABLE_FILE* and memory-mapped
+when the first hand is evaluated, so importing the module stays cheap.
+
+Omaha hands are evaluated with the same tables by an *OmahaBoard*, see there.
+"""
+from itertools import combinations
+import mmap
+import os
+import struct
+from array import array
+
+import metrics
+import ranking
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ranktables.bin')
+
+RANK_KEYS = [1, 5, 24, 112, 521, 2247, 9244, 30823, 103066, 250154, 667453, 1526359, 3453520]
+MAX_CARDS = 7
+
+_SUIT_SHIFT = 25
+_RANK_MASK = (1 << _SUIT_SHIFT) - 1
+# every suit counter starts at 3, so it reaches 8 (its high bit) with the fifth card of that suit
+_SUIT_BASE = 0x3333 << _SUIT_SHIFT
+_FLUSH_BITS = 0x8888 << _SUIT_SHIFT
+CARD_KEYS = [RANK_KEYS[c >> 2] + (1 << (_SUIT_SHIFT + 4 * (c & 3))) for c in ranking.deck]
+
+_HEADER = struct.Struct('<4sII')
+_MAGIC = b'RKT1'
+_NONFLUSH_SIZE = 4 * RANK_KEYS[-1] + 3 * RANK_KEYS[-2] + 1
+
+# set by *load_tables*
+_classes = _flush_table = _nonflush_table = None
+
+
+def _rank_multisets(max_cards, rank=12):
+    """Yield all lists of rank indices (descending, at most four of each) with up to *max_cards* entries."""
+    if rank < 0:
+        yield []
+        return
+    for n in range(min(4, max_cards) + 1):
+        for rest in _rank_multisets(max_cards - n, rank - 1):
+            yield [rank] * n + rest
+
+
+def build_tables(path=TABLE_FILE):
+    """Generate the lookup tables and write them to *path*.
+
+    The file is written to a temporary name first and then renamed, so concurrently starting processes never
+    map a partially written file.
+    """
+    flush = {}
+    for mask in range(1 << 13):
+        ranks = [r for r in range(13) if mask >> r & 1]
+        if 5 <= len(ranks) <= MAX_CARDS:
+            flush[mask] = ranking.evaluate([4 * r for r in ranks])
+    nonflush = {}
+    for ranks in _rank_multisets(MAX_CARDS):
+        if ranks:
+            # deal the suits round-robin, so no suit gets more than two cards and copies of a rank differ in suit
+            cards = [4 * r + i % 4 for i, r in enumerate(ranks)]
+            nonflush[sum(RANK_KEYS[r] for r in ranks)] = ranking.evaluate(cards)
+
+    classes = sorted(set(flush.values()) | set(nonflush.values()))
+    index = {strength: i for i, strength in enumerate(classes)}
+    flush_table = array('H', bytes(2 << 13))
+    for mask, strength in flush.items():
+        flush_table[mask] = index[strength]
+    nonflush_table = array('H', bytes(2 * _NONFLUSH_SIZE))
+    for key, strength in nonflush.items():
+        nonflush_table[key] = index[strength]
+
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(classes), _NONFLUSH_SIZE))
+        array('I', classes).tofile(f)
+        flush_table.tofile(f)
+        nonflush_table.tofile(f)
+    os.replace(tmp, path)
+
+
+def load_tables(path=TABLE_FILE):
+    """Memory-map the tables in *path*, generating the file first if it does not exist or is outdated."""
+    global _classes, _flush_table, _nonflush_table
+    for attempt in range(2):
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, n_classes, nonflush_size = _HEADER.unpack_from(data)
+            if magic == _MAGIC and nonflush_size == _NONFLUSH_SIZE:
+                view = memoryview(data)
+                offset = _HEADER.size
+                _classes = view[offset:offset + 4 * n_classes].cast('I').tolist()
+                offset += 4 * n_classes
+                _flush_table = view[offset:offset + (2 << 13)].cast('H')
+                offset += 2 << 13
+                _nonflush_table = view[offset:offset + 2 * nonflush_size].cast('H')
+                return
+            data.close()
+        build_tables(path)
+    raise RuntimeError('could not load hand evaluation tables from {}'.format(path))
+
+
+def evaluate(cards):
+    """Return the strength of up to seven integer-encoded *cards*, identical to *ranking.evaluate*."""
+    if len(cards) > MAX_CARDS:
+        return ranking.evaluate(cards)
+    key = sum(map(CARD_KEYS.__getitem__, cards), _SUIT_BASE)
+    flush = key & _FLUSH_BITS
+    try:
+        if flush:
+            suit = (flush >> _SUIT_SHIFT).bit_length() // 4 - 1
+            mask = 0
+            for c in cards:
+                if c & 3 == suit:
+                    mask |= 1 << (c >> 2)
+            return _classes[_flush_table[mask]]
+        return _classes[_nonflush_table[key & _RANK_MASK]]
+    except TypeError:
+        # the tables are not loaded yet; checking for that in the exception handler keeps the fast path free
+        if _classes is not None:
+            raise
+        load_tables()
+        return evaluate(cards)
+
+
+def hand_key(cards, key=_SUIT_BASE):
+    """Return the table key of *cards*. Passing the key of other cards as *key* adds *cards* to them, so the key of
+    a board can be computed once and reused for every holding or runout that completes it.
+    """
+    return sum(map(CARD_KEYS.__getitem__, cards), key)
+
+
+def evaluate_key(key, cards):
+    """Return the strength of *cards*, given their (possibly incrementally computed) key. The cards themselves
+    are only looked at if they contain a flush.
+    """
+    if key & _FLUSH_BITS:
+        return evaluate(cards)
+    try:
+        return _classes[_nonflush_table[key & _RANK_MASK]]
+    except TypeError:
+        if _classes is not None:
+            raise
+        load_tables()
+        return evaluate_key(key, cards)
+
+
+def rank_value(cards):
+    """Like *ranking.rank_value*, but evaluated with the lookup tables."""
+    return evaluate(ranking.encode_cards(cards))
+
+
+# the rank masks of the ten straights, the wheel first
+_STRAIGHT_MASKS = [1 << 12 | 0b1111] + [0b11111 << r for r in range(9)]
+
+
+class OmahaBoard(object):
+    """The (partial) board of an Omaha hand, prepared once to evaluate any number of holdings on it.
+
+    An Omaha hand is made of exactly two of the hole cards and three of the board cards, up to 6 * 10 combinations.
+    Most of them need not be evaluated one by one:
+
+    * A combination without a flush is one entry of the non-flush table, at the sum of the rank keys of the pair
+      and of the triple. The keys of the board triples are summed here once, and combinations with the same ranks
+      (on a paired board, or with a paired holding) are looked up once.
+    * A flush needs a suited pair on a board triple of the same suit. Only those combinations go to the flush table.
+    * Without a flush, the board limits the best category: four of a kind if it is paired, a straight if three of
+      its ranks fit into one, three of a kind otherwise. A flush beating that limit ends the evaluation.
+
+    Strengths are those of *ranking.evaluate* for the best combination.
+    """
+    __slots__ = ('cards', 'triple_keys', 'suited_triples', 'max_category')
+
+    def __init__(self, board):
+        if len(board) < 3:
+            raise ValueError('an Omaha board has at least three cards, got {}'.format(len(board)))
+        self.cards = tuple(board)
+        triples = list(combinations(self.cards, 3))
+        self.triple_keys = sorted({sum(RANK_KEYS[c >> 2] for c in triple) for triple in triples})
+        # the rank masks of the board triples of one suit, by suit
+        self.suited_triples = {}
+        for a, b, c in triples:
+            if a & 3 == b & 3 == c & 3:
+                self.suited_triples.setdefault(a & 3, []).append(1 << (a >> 2) | 1 << (b >> 2) | 1 << (c >> 2))
+        mask = 0
+        for c in self.cards:
+            mask |= 1 << (c >> 2)
+        if bin(mask).count('1') < len(self.cards):
+            self.max_category = 8
+        elif any(bin(mask & straight).count('1') >= 3 for straight in _STRAIGHT_MASKS):
+            self.max_category = 5
+        else:
+            self.max_category = 4
+
+    def evaluate(self, hole):
+        """Return the strength of the best hand of two of the integer-encoded *hole* cards and three board cards."""
+        pairs = list(combinations(hole, 2))
+        if not pairs:
+            raise ValueError('an Omaha holding has at least two cards, got {}'.format(len(hole)))
+        try:
+            best = -1
+            for suit, triples in self.suited_triples.items():
+                for a, b in pairs:
+                    if a & 3 == suit and b & 3 == suit:
+                        pair = 1 << (a >> 2) | 1 << (b >> 2)
+                        best = max(best, max(_flush_table[pair | triple] for triple in triples))
+            if best >= 0 and _classes[best] >> 20 > self.max_category:
+                return _classes[best]
+            keys = {RANK_KEYS[a >> 2] + RANK_KEYS[b >> 2] for a, b in pairs}
+            best = max(best, max(_nonflush_table[key + triple] for key in keys for triple in self.triple_keys))
+            return _classes[best]
+        except TypeError:
+            if _classes is not None:
+                raise
+            load_tables()
+            return self.evaluate(hole)
+
+
+def evaluate_omaha(hole, board):
+    """Return the Omaha strength of the integer-encoded *hole* cards on *board*, see *OmahaBoard*. To evaluate
+    several holdings on one board, create the *OmahaBoard* once and call its *evaluate* instead."""
+    return OmahaBoard(board).evaluate(hole)
+
+
+_arrays = None
+
+
+@metrics.timed('evaluate_many_seconds')
+def evaluate_many(hands):
+    """Evaluate an (..., 5..7) integer array of encoded hands with the lookup tables and return an array of their
+    strengths, the batched counterpart of *evaluate*. Keys are summed and looked up with array operations; only the
+    flush masks are built per card position.
+    """
+    global _arrays
+    import numpy as np
+    if _arrays is None:
+        if _classes is None:
+            load_tables()
+        _arrays = (np.array(CARD_KEYS, dtype=np.int64), np.array(_classes, dtype=np.int64),
+                   np.frombuffer(_flush_table, dtype=np.uint16), np.frombuffer(_nonflush_table, dtype=np.uint16))
+    card_keys, classes, flush_table, nonflush_table = _arrays
+    hands = np.asarray(hands, dtype=np.int64)
+    if hands.ndim < 2 or not 5 <= hands.shape[-1] <= MAX_CARDS:
+        raise ValueError('expected an (..., 5..7) array of cards, got shape {}'.format(hands.shape))
+    metrics.count('evaluate_many_hands_total', hands.size // hands.shape[-1])
+    keys = card_keys[hands].sum(axis=-1) + _SUIT_BASE
+    index = nonflush_table[keys & _RANK_MASK]
+    flush = keys & _FLUSH_BITS
+    flushed = np.nonzero(flush)
+    if flushed[0].size:
+        suit = np.select([flush[flushed] >> (_SUIT_SHIFT + 4 * s + 3) & 1 == 1 for s in range(4)], range(4))
+        cards = hands[flushed]
+        mask = np.where((cards & 3) == suit[:, None], 1 << (cards >> 2), 0).sum(axis=-1)
+        index[flushed] = flush_table[mask]
+    return classes[index]
+
@@ -0,0 +1,141 @@
+"""Incremental model of one table, fed with the status dicts returned by the server.
+
+Every status is compared with the previous one, only the fields that changed are updated, and every change is
+reported as an *Event*, so strategy code can react to what happened instead of re-reading the whole status:
+
+    new_hand      a new hand started (value: hand id, or the hand count if the server sends none)
+    hole_cards    our hole cards were dealt (value: list of card strings)
+    board         community cards were dealt (value: list of the new card strings)
+    bet           a player's bet in the current round grew (player, value: new bet)
+    fold          a player left the hand (player)
+    joined, left  a player took or left a seat (player, value: position)
+    our_turn      it became our turn
+
+Status fields used, all optional: players ({position: name}), current_player, community_cards, hole_cards,
+bets ({name: chips}), stacks ({name: chips}), pot, active_players ([name, ...]) and hand_id.
+
+*hand* is a *ranking.HandState* of our hole cards and the board, updated with each newly dealt card, so the strength
+of our hand and our outs are available on every street without evaluating the cards again from scratch.
+"""
+from collections import namedtuple
+
+import ranking
+
+Event = namedtuple('Event', ['kind', 'player', 'value'])
+Event.__new__.__defaults__ = (None, None)
+
+STREETS = {0: 'preflop', 3: 'flop', 4: 'turn', 5: 'river'}
+
+
+class TableState(object):
+    __slots__ = ('playername', 'players', 'current_player', 'board', 'board_codes', 'hole_cards', 'hole_codes',
+                 'hand', 'bets', 'stacks', 'pot', 'active_players', 'hand_id', 'hand_count', 'listeners', '_last')
+
+    def __init__(self, playername):
+        self.playername = playername
+        self.players = {}
+        self.current_player = None
+        self.board = []
+        self.board_codes = []
+        self.hole_cards = []
+        self.hole_codes = []
+        self.hand = ranking.HandState()
+        self.bets = {}
+        self.stacks = {}
+        self.pot = 0
+        self.active_players = None
+        self.hand_id = None
+        self.hand_count = 0
+        self.listeners = {}
+        self._last = None
+
+    @property
+    def street(self):
+        return STREETS.get(len(self.board))
+
+    @property
+    def our_turn(self):
+        return self.current_player == self.playername
+
+    def to_call(self):
+        """Chips we have to add to match the highest bet of the current round."""
+        return max(self.bets.values(), default=0) - self.bets.get(self.playername, 0)
+
+    def subscribe(self, kind, callback):
+        """Call *callback(event)* for every future event of the given *kind*."""
+        self.listeners.setdefault(kind, []).append(callback)
+
+    def apply(self, status):
+        """Update the state with a new *status* dict and return the list of events it caused."""
+        if status is self._last or not isinstance(status, dict):
+            return []
+        self._last = status
+        events = []
+
+        players = status.get('players') or {}
+        if players != self.players:
+            for position, name in players.items():
+                if self.players.get(position) != name:
+                    events.append(Event('joined', name, int(position)))
+            for position, name in self.players.items():
+                if players.get(position) != name:
+                    events.append(Event('left', name, int(position)))
+            self.players = dict(players)
+
+        board = status.get('community_cards') or []
+        hole_cards = status.get('hole_cards') or []
+        hand_id = status.get('hand_id')
+        new_hand = (hand_id != self.hand_id if hand_id is not None
+                    else len(board) < len(self.board) or (hole_cards and hole_cards != self.hole_cards))
+        if new_hand:
+            self.hand_id = hand_id
+            self.hand_count += 1
+            self.board, self.board_codes = [], []
+            self.hole_cards, self.hole_codes = [], []
+            self.hand = ranking.HandState()
+            self.bets = {}
+            self.active_players = None
+            events.append(Event('new_hand', value=hand_id if hand_id is not None else self.hand_count))
+
+        if hole_cards != self.hole_cards:
+            self.hole_cards = list(hole_cards)
+            self.hole_codes = ranking.encode_cards(hole_cards)
+            self.hand = ranking.HandState(self.hole_codes + self.board_codes)
+            events.append(Event('hole_cards', self.playername, self.hole_cards))
+        if len(board) > len(self.board):
+            # only the new cards need encoding
+            dealt = list(board[len(self.board):])
+            self.board = list(board)
+            codes = ranking.encode_cards(dealt)
+            self.board_codes += codes
+            for card in codes:
+                self.hand.add_card(card)
+            self.bets = {}
+            events.append(Event('board', value=dealt))
+
+        bets = status.get('bets') or {}
+        if bets != self.bets:
+            for name, amount in bets.items():
+                if amount > self.bets.get(name, 0):
+                    events.append(Event('bet', name, amount))
+            self.bets = dict(bets)
+
+        active = status.get('active_players')
+        if active is not None and active != self.active_players:
+            if self.active_players is not None:
+                events.extend(Event('fold', name) for name in self.active_players if name not in active)
+            self.active_players = list(active)
+
+        self.stacks = status.get('stacks') or self.stacks
+        self.pot = status.get('pot', self.pot)
+
+        current = status.get('current_player')
+        if current != self.current_player or new_hand:
+            self.current_player = current
+            if current == self.playername:
+                events.append(Event('our_turn', current))
+
+        for event in events:
+            for callback in self.listeners.get(event.kind, ()):
+                callback(event)
+        return events
@@ -0,0 +1,93 @@
+import asyncio
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+import asyncclient
+from asyncclient import MultiTableClient
+from localserver import LocalServer, MockTable
+import metrics
+
+
+@skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestMultiTableClient(TestCase):
+    def setUp(self):
+        self.tables = [MockTable('t{}'.format(i), max_player_count=4) for i in range(3)]
+        self.server = LocalServer(self.tables).start()
+        self.addCleanup(self.server.stop)
+
+    def seats(self, per_table):
+        return [('p{}{}'.format(t.name, i), self.server.register('p{}{}'.format(t.name, i)), t.name)
+                for t in self.tables for i in range(per_table)]
+
+    def test_all_seats_play(self):
+        client = MultiTableClient(self.server.url, self.seats(3), poll_interval=0.01)
+        asyncio.run(client.run(ticks=10))
+        for table in self.tables:
+            self.assertEqual(3, len(table.players))
+            self.assertEqual({name for name in table.players.values()}, {name for name, a, d in table.actions})
+        self.assertTrue(all(p.seat is not None for p in client.players))
+        self.assertTrue(all(r['reaction']['count'] for r in client.report().values()))
+
+    def test_strategy_fallback(self):
+        def raise_first(status):
+            return [('raise', {'amount': 10}), 'call']
+
+        table = self.tables[0]
+        table.act = lambda name, action, data, act=table.act: (400, 'no') if action == 'raise' else act(name, action, data)
+        client = MultiTableClient(self.server.url, self.seats(2)[:2], strategy=raise_first, poll_interval=0.01)
+        asyncio.run(client.run(ticks=4))
+        self.assertTrue(table.actions)
+        self.assertEqual({'call'}, {action for name, action, data in table.actions})
+
+    def test_stop(self):
+        client = MultiTableClient(self.server.url, self.seats(1), poll_interval=10)
+
+        async def run_and_stop():
+            task = asyncio.ensure_future(client.run())
+            await asyncio.sleep(0.2)
+            client.stop()
+            await asyncio.wait_for(task, 1)
+
+        asyncio.run(run_and_stop())
+
+    def test_bad_listing(self):
+        self.addCleanup(metrics.REGISTRY.reset)
+        self.addCleanup(metrics.disable)
+        metrics.enable()
+        bad = [(500, 'server error'), (200, 'garbage'), (200, {'no tables': []})]
+
+        def handle(method, url, body, handle=self.server.handle):
+            if method == 'GET' and url == '/tables' and bad:
+                self.server.request_count += 1
+                return bad.pop(0)
+            return handle(method, url, body)
+
+        self.server.handle = handle
+        client = MultiTableClient(self.server.url, self.seats(1)[:1], poll_interval=0.01)
+        asyncio.run(client.run(ticks=5))
+        self.assertEqual(1, len(self.tables[0].players))
+        self.assertEqual(3, metrics.REGISTRY.counters['http_errors_total'])
+
+    def test_failing_table(self):
+        client = MultiTableClient(self.server.url, self.seats(1), poll_interval=0.01)
+
+        async def join(tablename, players, join=client.join):
+            if tablename == 't0':
+                raise RuntimeError('broken table')
+            await join(tablename, players)
+
+        client.join = join
+        asyncio.run(client.run(ticks=3))
+        self.assertEqual([0, 1, 1], [len(t.players) for t in self.tables])
+
+
+class TestWithoutAiohttp(TestCase):
+    def test_needs_aiohttp(self):
+        with patch.object(asyncclient, 'aiohttp', None):
+            with self.assertRaisesRegex(ImportError, 'aiohttp'):
+                MultiTableClient('http://localhost', [])
@@ -0,0 +1,53 @@
+import json
+from unittest import TestCase
+
+from benchmark import CORPORA, SIZES, compare, measure, over_target, run
+import ranking
+
+
+class TestCorpora(TestCase):
+    def check(self, corpus, minimum_category, maximum_category=9):
+        for cards in SIZES:
+            hands = CORPORA[corpus](50, cards, seed=1)
+            self.assertEqual((50, cards), hands.shape)
+            for hand in hands.tolist():
+                self.assertEqual(cards, len(set(hand)))
+                self.assertTrue(minimum_category <= ranking.evaluate(hand) >> 20 <= maximum_category)
+            self.assertTrue((hands == CORPORA[corpus](50, cards, seed=1)).all())
+
+    def test_random(self):
+        self.check('random', 1)
+
+    def test_pairs(self):
+        self.check('pairs', 3, 3)
+
+    def test_wheel(self):
+        self.check('wheel', 5)
+
+    def test_flush(self):
+        self.check('flush', 6)
+
+
+class TestHarness(TestCase):
+    def test_measure(self):
+        result = measure(len, [[1, 2]] * 10, repeat=2, units=5)
+        self.assertEqual(10, result['latency_us']['count'])
+        self.assertGreater(result['rate'], 0)
+        self.assertLessEqual(result['latency_us']['p50'], result['latency_us']['p99'])
+
+    def test_run(self):
+        report = run(count=20, sizes=(7,), corpora=('wheel',), repeat=1, batch_size=10, equity_calls=1)
+        self.assertIn('wheel/7/find_straight', report['results'])
+        self.assertIn('wheel/7/rank_many', report['results'])
+        self.assertIn('equity.exact_odds', report['results'])
+        self.assertGreaterEqual(report['results']['startup/pokerclient']['ms'], 0)
+        json.dumps(report)
+
+    def test_compare(self):
+        baseline = {'results': {'a': {'rate': 100.0}, 'b': {'rate': 100.0}, 'c': {'rate': 100.0}}}
+        report = {'results': {'a': {'rate': 90.0}, 'b': {'rate': 50.0}, 'd': {'rate': 1.0}}}
+        self.assertEqual([('b', 100.0, 50.0)], compare(report, baseline, tolerance=0.25))
+
+    def test_over_target(self):
+        report = {'results': {'startup/a': {'ms': 20.0}, 'startup/b': {'ms': 90.0}, 'c': {'rate': 1.0}}}
+        self.assertEqual([('startup/b', 90.0)], over_target(report, target_ms=75))
@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+from engine import AIStrategy, HoldemTable, call_or_check, play, self_play
+from localserver import LocalServer
+import ranking
+
+
+class TestHoldemTable(TestCase):
+    def table(self, players=('a', 'b', 'c'), stack=1000, seed=1):
+        table = HoldemTable('t', seed=seed, stack=stack, autostart=False)
+        for position, name in enumerate(players, 1):
+            table.join(name, position)
+        table.start_hand()
+        return table
+
+    def test_blinds_and_order(self):
+        table = self.table()
+        self.assertEqual({'b': 1, 'c': 2}, table.bets)
+        self.assertEqual('a', table.current_player)
+        status = table.status('a')
+        self.assertEqual(2, len(status['hole_cards']))
+        self.assertNotEqual(status['hole_cards'], table.status('b')['hole_cards'])
+        self.assertNotIn('hole_cards', table.status('x'))
+        self.assertEqual({'a': 1000, 'b': 999, 'c': 998}, status['stacks'])
+
+    def test_heads_up_button_posts_small_blind(self):
+        table = self.table(('a', 'b'))
+        self.assertEqual({'a': 1, 'b': 2}, table.bets)
+        self.assertEqual('a', table.current_player)
+        table.act('a', 'call', None)
+        table.act('b', 'check', None)
+        self.assertEqual(3, len(table.board))
+        self.assertEqual('b', table.current_player)
+
+    def test_betting_round(self):
+        table = self.table()
+        self.assertEqual(400, table.act('a', 'check', None)[0])
+        self.assertEqual(400, table.act('a', 'raise', {'amount': 3})[0])
+        self.assertEqual(200, table.act('a', 'raise', {'amount': 6})[0])
+        table.act('b', 'call', None)
+        table.act('c', 'fold', None)
+        self.assertEqual(3, len(table.board))
+        self.assertEqual(14, table.pot)
+        self.assertEqual(['b', 'a'], table.active)
+        self.assertEqual('b', table.current_player)
+
+    def test_fold_wins_pot(self):
+        table = self.table()
+        table.act('a', 'fold', None)
+        table.act('b', 'fold', None)
+        self.assertFalse(table.in_hand)
+        self.assertEqual({'a': 1000, 'b': 999, 'c': 1001}, table.stacks)
+
+    def test_side_pots(self):
+        table = self.table(stack=100)
+        table.stacks.update({'a': 20, 'b': 49})
+        table.hole = {'a': ranking.encode_cards(['As', 'Ad']), 'b': ranking.encode_cards(['Ks', 'Kd']),
+                      'c': ranking.encode_cards(['Qs', 'Qd'])}
+        table.deck = ranking.encode_cards(['2c', '3c', '4h', '7d', '9s', '10h'])
+        table.act('a', 'raise', {'amount': 20})
+        table.act('b', 'raise', {'amount': 49})
+        table.act('c', 'call', None)
+        self.assertFalse(table.in_hand)
+        self.assertEqual(5, len(table.board))
+        self.assertEqual({'a': 60, 'b': 60, 'c': 50}, table.stacks)
+
+    def test_chips_are_conserved(self):
+        result = play([('a', call_or_check), ('b', AIStrategy(time_budget=0.001)), ('c', call_or_check)], 30, seed=3)
+        self.assertEqual(0, sum(result.values()))
+
+    def test_deterministic(self):
+        lineup = [('a', call_or_check), ('b', call_or_check)]
+        first = self_play(lineup, hands=100, seed=5, chunk_size=30, workers=1)
+        self.assertEqual(first, self_play(lineup, hands=100, seed=5, chunk_size=30, workers=2))
+        self.assertEqual(0, sum(first['net'].values()))
+
+    def test_local_server(self):
+        table = HoldemTable('holdem', seed=1)
+        with LocalServer([table]) as server:
+            for position, name in enumerate(('a', 'b'), 1):
+                code, text = server.handle('POST', '/table/holdem/actions/join?uuid=' + server.register(name),
+                                           {'position': position})
+                self.assertEqual(200, code)
+            uuid = next(u for u, name in server.uuids.items() if name == table.current_player)
+            code, status = server.handle('GET', '/table/holdem?uuid=' + uuid, None)
+            self.assertEqual(2, len(status['hole_cards']))
+            self.assertEqual(200, server.handle('POST', '/table/holdem/actions/call?uuid=' + uuid, None)[0])
@@ -0,0 +1,159 @@
+from itertools import combinations
+import itertools
+import random
+import time
+from unittest import TestCase
+
+from equity import _deals, _exact_odds, _matchings, _showdown, exact_odds, hand_strength, monte_carlo_odds, odds
+import ranking
+from ranking import evaluate
+
+
+class TestMonteCarlo(TestCase):
+    def test_river_nuts(self):
+        hole = ranking.encode_cards(['As', 'Ks'])
+        board = ranking.encode_cards(['Qs', 'Js', '10s', '2d', '3c'])
+        odds = monte_carlo_odds(hole, board, opponents=3, workers=1, seed=1)
+        self.assertEqual((1.0, 0.0, 0.0, 1.0, 0.0), odds[:5])
+
+    def test_board_plays(self):
+        hole = ranking.encode_cards(['2c', '3d'])
+        board = ranking.encode_cards(['As', 'Ks', 'Qs', 'Js', '10s'])
+        odds = monte_carlo_odds(hole, board, opponents=1, workers=1, seed=1)
+        self.assertEqual((0.0, 1.0, 0.0, 0.5), odds[:4])
+
+    def test_pocket_aces(self):
+        hole = ranking.encode_cards(['Ah', 'Ad'])
+        odds = monte_carlo_odds(hole, opponents=1, target_error=0.01, time_budget=10, workers=1, seed=7)
+        self.assertLessEqual(odds.error, 0.01)
+        self.assertAlmostEqual(0.85, odds.equity, delta=0.02)
+        low, high = odds.interval
+        self.assertLess(low, odds.equity)
+        self.assertGreater(high, odds.equity)
+
+    def test_reproducible(self):
+        hole = ranking.encode_cards(['7h', '8h'])
+        first = monte_carlo_odds(hole, opponents=2, max_samples=1000, time_budget=10, workers=1, seed=3)
+        second = monte_carlo_odds(hole, opponents=2, max_samples=1000, time_budget=10, workers=1, seed=3)
+        self.assertEqual(first, second)
+
+    def test_time_budget(self):
+        hole = ranking.encode_cards(['7h', '2c'])
+        start = time.perf_counter()
+        odds = monte_carlo_odds(hole, opponents=5, target_error=0, time_budget=0.05, batch_size=100, workers=1)
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertLess(odds.samples, 200000)
+
+    def test_process_pool(self):
+        hole = ranking.encode_cards(['Kh', 'Kd'])
+        odds = monte_carlo_odds(hole, opponents=1, target_error=0.02, time_budget=10, workers=2, seed=5)
+        self.assertAlmostEqual(0.82, odds.equity, delta=0.04)
+        self.assertEqual(0, odds.samples % 1000)
+
+
+class TestHandStrength(TestCase):
+    def test_river_is_exact(self):
+        hole = ranking.encode_cards(['Ah', 'Kd'])
+        board = ranking.encode_cards(['Ac', '7s', '7d', '2h', '9c'])
+        expected = exact_odds(hole, board, 1)
+        odds = hand_strength(hole, board, 1)
+        self.assertAlmostEqual(expected.equity, odds.equity)
+        self.assertAlmostEqual(expected.win, odds.win)
+        self.assertEqual(0.0, odds.error)
+
+    def test_flop(self):
+        hole = ranking.encode_cards(['Jh', 'Jd'])
+        board = ranking.encode_cards(['Qc', '7s', '2d'])
+        odds = hand_strength(hole, board, 2)
+        self.assertTrue(0.5 < odds.equity < 0.9)
+        self.assertGreater(odds.error, 0)
+        self.assertLess(hand_strength(hole, board, 3).equity, odds.equity)
+
+
+class TestExact(TestCase):
+    def brute_force(self, hole, board, opponents):
+        """Enumerate every runout and every ordered deal of the opponents' hands."""
+        dead = set(hole) | set(board)
+        live = [c for c in ranking.deck if c not in dead]
+        total = count = 0
+        for runout in combinations(live, 5 - len(board)):
+            full_board = list(board) + list(runout)
+            rest = [c for c in live if c not in runout]
+            hero = evaluate(hole + full_board)
+
+            def deal(cards, k):
+                if k == 0:
+                    yield []
+                    return
+                for a, b in combinations(cards, 2):
+                    for others in deal([c for c in cards if c not in (a, b)], k - 1):
+                        yield [[a, b]] + others
+            for hands in deal(rest, opponents):
+                total += _showdown(hero, [evaluate(h + full_board) for h in hands])
+                count += 1
+        return total / count, count
+
+    def test_river_heads_up(self):
+        hole = ranking.encode_cards(['Ah', 'Kd'])
+        board = ranking.encode_cards(['Ac', '7s', '7d', '2h', '9c'])
+        odds = exact_odds(hole, board, 1)
+        equity, count = self.brute_force(hole, board, 1)
+        self.assertAlmostEqual(equity, odds.equity)
+        self.assertEqual(count, odds.samples)
+        self.assertAlmostEqual(1.0, odds.win + odds.tie + odds.loss)
+
+    def test_matchings(self):
+        rng = random.Random(4)
+        cards = list(range(8))
+        weaker = [0] * 52
+        tied = [0] * 52
+        labels = {}
+        for a, b in combinations(cards, 2):
+            labels[a, b] = label = rng.choice(['weaker', 'tied', 'stronger'])
+            graph = {'weaker': weaker, 'tied': tied}.get(label)
+            if graph is not None:
+                graph[a] |= 1 << b
+                graph[b] |= 1 << a
+        edges = [(a, b) for (a, b), label in labels.items() if label != 'stronger']
+        for k in (1, 2, 3, 4):
+            expected = [0] * (k + 1)
+            for deal in itertools.product(edges, repeat=k):
+                if len(set(c for edge in deal for c in edge)) == 2 * k:
+                    expected[sum(labels[edge] == 'tied' for edge in deal)] += 1
+            self.assertEqual(expected, _matchings(weaker, tied, (1 << 8) - 1, k))
+
+    def test_multiway_agrees_with_monte_carlo(self):
+        hole = ranking.encode_cards(['Qh', 'Qd'])
+        board = ranking.encode_cards(['Qs', '7s', '2d', '2h', '9c'])
+        for opponents in (2, 3):
+            odds = exact_odds(hole, board, opponents)
+            self.assertEqual(_deals(45, opponents), odds.samples)
+            estimate = monte_carlo_odds(hole, board, opponents, target_error=0.005, time_budget=10, workers=1, seed=6)
+            self.assertAlmostEqual(odds.equity, estimate.equity, delta=0.01)
+
+    def test_ties(self):
+        hole = ranking.encode_cards(['2c', '3d'])
+        board = ranking.encode_cards(['As', 'Ks', 'Qs', 'Js', '10s'])
+        for opponents in (1, 2, 3):
+            odds = exact_odds(hole, board, opponents)
+            self.assertEqual((0.0, 1.0), (odds.win, odds.tie))
+            self.assertAlmostEqual(1.0 / (1 + opponents), odds.equity)
+
+    def test_turn_agrees_with_monte_carlo(self):
+        hole = ranking.encode_cards(['8h', '9h'])
+        board = ranking.encode_cards(['10h', 'Jc', '2h', '3s'])
+        odds = exact_odds(hole, board, 2)
+        estimate = monte_carlo_odds(hole, board, 2, target_error=0.01, time_budget=10, workers=1, seed=2)
+        self.assertAlmostEqual(odds.equity, estimate.equity, delta=0.02)
+
+    def test_isomorphic_cache(self):
+        _exact_odds.cache_clear()
+        first = exact_odds(ranking.encode_cards(['Ah', 'Kh']), ranking.encode_cards(['2h', '7c', '9d', 'Qs', '3h']))
+        second = exact_odds(ranking.encode_cards(['As', 'Ks']), ranking.encode_cards(['2s', '7d', '9c', 'Qh', '3s']))
+        self.assertEqual(first, second)
+        self.assertEqual(1, _exact_odds.cache_info().hits)
+
+    def test_mode_selection(self):
+        hole = ranking.encode_cards(['8h', '9h'])
+        self.assertEqual(0.0, odds(hole, ranking.encode_cards(['10h', 'Jc', '2h', '3s', '4d']), 1).error)
+        self.assertGreater(odds(hole, (), 4, workers=1, seed=1).error, 0.0)
@@ -0,0 +1,77 @@
+import time
+from unittest import TestCase
+
+from fleet import Fleet
+from localserver import LocalServer, MockTable
+from pokerclient import Player
+
+
+class SlowPlayer(Player):
+    def join_table(self, position=None):
+        time.sleep(0.2)
+        return super().join_table(position)
+
+
+class TestFleet(TestCase):
+    def setUp(self):
+        self.tables = [MockTable('t1'), MockTable('t2')]
+        self.server = LocalServer(self.tables).start()
+        self.addCleanup(self.server.stop)
+        self.server.register('outsider')
+        self.tables[0].join('outsider', 1)
+        self.fleet = Fleet(self.server.url)
+
+    def player(self, playername, tablename=None, cls=Player):
+        return cls(playername=playername, UUID=self.server.register(playername), tablename=tablename,
+                   base_url=self.server.url, backoff=0)
+
+    def test_seat_many(self):
+        players = [self.player('p{}'.format(i)) for i in range(11)]
+        seats = self.fleet.seat(players)
+        self.assertEqual(11, len(set(seats.values())))
+        self.assertEqual(6, len(self.tables[0].players))
+        self.assertEqual(6, len(self.tables[1].players))
+        for player in players:
+            tablename, position = seats[player.playername]
+            self.assertEqual((tablename, position), (player.tablename, player.seat))
+            table = self.tables[0] if tablename == 't1' else self.tables[1]
+            self.assertEqual(player.playername, table.players[str(position)])
+        # one listing, one join per player
+        self.assertEqual(1 + 11, self.server.request_count)
+
+    def test_no_open_seat(self):
+        players = [self.player('p{}'.format(i), 't1') for i in range(6)]
+        seats = self.fleet.seat(players)
+        self.assertEqual(5, len([seat for seat in seats.values() if seat]))
+        self.assertEqual(1, list(seats.values()).count(None))
+
+    def test_already_seated(self):
+        player = self.player('p')
+        self.tables[1].join('p', 3)
+        self.assertEqual({'p': ('t2', 3)}, self.fleet.seat([player]))
+        self.assertEqual(3, player.seat)
+        self.assertEqual(200, player.join_table())
+
+    def test_seat_taken_meanwhile(self):
+        self.fleet.refresh()
+        self.server.register('other')
+        self.tables[0].join('other', 2)
+        player = self.player('p', 't1')
+        self.assertEqual({'p': ('t1', 3)}, self.fleet.seat([player]))
+        self.assertEqual('p', self.tables[0].players['3'])
+
+    def test_conditional_refresh(self):
+        self.assertTrue(self.fleet.refresh())
+        self.assertFalse(self.fleet.refresh())
+        self.tables[1].join('outsider', 1)
+        self.assertTrue(self.fleet.refresh())
+        self.assertEqual([2, 3, 4, 5, 6], self.fleet.open_seats['t2'])
+
+    def test_concurrent_joins(self):
+        players = [self.player('p{}'.format(i), cls=SlowPlayer) for i in range(10)]
+        # the first listing also pays for importing requests
+        self.fleet.refresh()
+        start = time.perf_counter()
+        seats = self.fleet.seat(players)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(10, len(set(seats.values())))
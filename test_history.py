@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from history import HAND, HOLE, NAME, POT, _MAGIC, HistoryRecorder, _unzigzag, _varint, _zigzag, read_records, replay
+from tablestate import TableState
+
+
+class TestHistory(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def play(self, recorder, hand_id):
+        state = TableState('me')
+        statuses = [
+            {'players': {'1': 'me', '2': 'villain'}, 'hand_id': hand_id, 'hole_cards': ['As', 'Kd'],
+             'bets': {'me': 1, 'villain': 2}, 'stacks': {'me': 999, 'villain': 998}, 'current_player': 'me'},
+            {'players': {'1': 'me', '2': 'villain'}, 'hand_id': hand_id, 'hole_cards': ['As', 'Kd'],
+             'bets': {'me': 6, 'villain': 2}, 'stacks': {'me': 994, 'villain': 998}, 'current_player': 'villain'},
+            {'players': {'1': 'me', '2': 'villain'}, 'hand_id': hand_id, 'hole_cards': ['As', 'Kd'],
+             'community_cards': ['2c', '3c', '10h'], 'pot': 12, 'stacks': {'me': 994, 'villain': 994},
+             'current_player': 'villain', 'active_players': ['me', 'villain']},
+            {'players': {'1': 'me', '2': 'villain'}, 'hand_id': hand_id, 'hole_cards': ['As', 'Kd'],
+             'community_cards': ['2c', '3c', '10h'], 'pot': 12, 'stacks': {'me': 1006, 'villain': 994},
+             'current_player': None, 'active_players': ['me']},
+        ]
+        for i, status in enumerate(statuses):
+            recorder.observe(state, state.apply(status))
+            if i == 0:
+                recorder.action('me', 'raise', 6)
+
+    def test_round_trip(self):
+        recorder = HistoryRecorder(self.directory, session='s1')
+        for hand_id in range(3):
+            self.play(recorder, hand_id)
+        recorder.close()
+        hands = list(replay(self.directory))
+        self.assertEqual([1, 2, 3], [h.number for h in hands])
+        hand = hands[1]
+        self.assertEqual({1: 'me', 2: 'villain'}, hand.players)
+        self.assertEqual({'me': [48, 46]}, hand.hole_cards)
+        self.assertEqual([1, 5, 35], hand.board)
+        self.assertEqual([('me', 'bet', 1), ('villain', 'bet', 2), ('me', 'raise', 6), ('me', 'bet', 6),
+                          ('villain', 'fold', 0)], hand.actions)
+        self.assertEqual({'me': 1006, 'villain': 994}, hand.stacks)
+        self.assertEqual(12, hand.pot)
+        self.assertLess(os.path.getsize(recorder.path) / 3, 100)
+
+    def test_sessions_and_empty_files(self):
+        for session in ('a', 'b'):
+            recorder = HistoryRecorder(self.directory, session=session)
+            self.play(recorder, 1)
+            recorder.close()
+        HistoryRecorder(self.directory, session='c').close()
+        self.assertEqual(2, len(list(replay(self.directory))))
+
+    def test_varint(self):
+        buf = bytearray()
+        values = [0, 1, -1, 63, -64, 300, -100000, 2 ** 40]
+        for value in values:
+            _varint(buf, _zigzag(value))
+        path = os.path.join(self.directory, 'raw.hhl')
+        with open(path, 'wb') as f:
+            f.write(_MAGIC + bytes([POT]) + buf[:1])
+        self.assertEqual([(POT, (0,))], list(read_records(path)))
+        self.assertEqual(values, [_unzigzag(_zigzag(v)) for v in values])
+
+    def test_names_out_of_order(self):
+        path = os.path.join(self.directory, 'corrupt.hhl')
+        with open(path, 'wb') as f:
+            f.write(_MAGIC + bytes([NAME, 2, 1]) + b'a')
+        with self.assertRaises(ValueError):
+            list(read_records(path))
+
+    def test_omaha_hole_cards(self):
+        recorder = HistoryRecorder(self.directory, session='omaha')
+        state = TableState('me')
+        recorder.observe(state, state.apply({'players': {'1': 'me', '2': 'villain'}, 'hand_id': 1,
+                                             'hole_cards': ['As', 'Kd', 'Qh', 'Jc'], 'bets': {'me': 1}}))
+        recorder.close()
+        self.assertEqual({'me': [48, 46, 43, 37]}, next(replay(recorder.path)).hole_cards)
+
+    def test_old_format(self):
+        path = os.path.join(self.directory, 'old.hhl')
+        with open(path, 'wb') as f:
+            f.write(b'HHL1' + bytes([NAME, 1, 2]) + b'me' + bytes([HAND, 0, HOLE, 1, 48, 46, POT, 2]))
+        self.assertEqual([(HAND, (0.0,)), (HOLE, ('me', [48, 46])), (POT, (1,))], list(read_records(path)))
+
+    def test_truncated(self):
+        recorder = HistoryRecorder(self.directory, session='cut')
+        for hand_id in range(2):
+            self.play(recorder, hand_id)
+        recorder.close()
+        complete = list(replay(recorder.path))
+        with open(recorder.path, 'rb+') as f:
+            f.truncate(os.path.getsize(recorder.path) - 1)
+        hands = list(replay(self.directory))
+        self.assertEqual(2, len(hands))
+        self.assertEqual(complete[0], hands[0])
+        self.assertEqual(complete[1].board, hands[1].board)
+        # a cut off name
+        with open(os.path.join(self.directory, 'name.hhl'), 'wb') as f:
+            f.write(_MAGIC + bytes([NAME, 1, 5]) + b'me')
+        self.assertEqual([], list(read_records(f.name)))
+
+    def test_unknown_kind(self):
+        path = os.path.join(self.directory, 'unknown.hhl')
+        with open(path, 'wb') as f:
+            f.write(_MAGIC + bytes([POT, 2, 99, 0]))
+        with self.assertRaises(ValueError):
+            list(read_records(path))
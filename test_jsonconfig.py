@@ -0,0 +1,109 @@
+import configparser
+import multiprocessing
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import jsonconfig
+from jsonconfig import JSONConfig
+
+
+def register_players(filename, prefix, count):
+    for i in range(count):
+        config = JSONConfig(filename)
+        config.set('players', '{}{}'.format(prefix, i), 'uuid-{}-{}'.format(prefix, i))
+        config.save()
+
+
+class TestJSONConfig(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.filename = os.path.join(self.directory, '.config')
+        with open(self.filename, 'w') as f:
+            f.write('[players]\na = "uuid-a"\nb = plain text\n\n[limits]\nseats = [1, 2]\n')
+
+    def test_decode(self):
+        config = JSONConfig(self.filename)
+        self.assertEqual('uuid-a', config.get('players', 'a'))
+        self.assertEqual('plain text', config.get('players', 'b'))
+        self.assertEqual([1, 2], config.get('limits', 'seats'))
+        self.assertIsNone(config.get('players', 'c', fallback=None))
+        with self.assertRaises(configparser.NoOptionError):
+            config.get('players', 'c')
+
+    def test_baseline_format(self):
+        # earlier versions encoded the option name, not the value
+        with open(self.filename, 'w') as f:
+            f.write('[players]\n"a" = uuid-a\n"b" = uuid-old\nb = "uuid-b"\n')
+        config = JSONConfig(self.filename)
+        self.assertEqual('uuid-a', config.get('players', 'a'))
+        self.assertEqual('uuid-b', config.get('players', 'b'))
+        config.set('players', 'c', 'uuid-c')
+        config.save()
+        with open(self.filename) as f:
+            self.assertIn('\na = uuid-a\n', f.read())
+        self.assertEqual('uuid-a', JSONConfig(self.filename).get('players', 'a'))
+
+    def test_cache(self):
+        config = JSONConfig(self.filename)
+        with patch('jsonconfig._decode', wraps=jsonconfig._decode) as decode:
+            config.get('players', 'a')
+            config.get('players', 'a')
+            self.assertEqual(1, decode.call_count)
+            config.set('players', 'a', 'new')
+            config.get('players', 'a')
+            self.assertEqual(2, decode.call_count)
+        self.assertEqual('new', config.get('players', 'a'))
+
+    def test_set_adds_section(self):
+        config = JSONConfig(self.filename)
+        config.set('other', 'x', {'k': 1})
+        config.save()
+        self.assertEqual({'k': 1}, JSONConfig(self.filename).get('other', 'x'))
+
+    def test_save_merges(self):
+        first = JSONConfig(self.filename)
+        second = JSONConfig(self.filename)
+        first.set('players', 'c', 'uuid-c')
+        second.set('players', 'd', 'uuid-d')
+        second.remove_option('players', 'b')
+        first.save()
+        second.save()
+        config = JSONConfig(self.filename)
+        self.assertEqual(['a', 'c', 'd'], sorted(config.options('players')))
+        self.assertEqual([], [name for name in os.listdir(self.directory) if name.endswith('.tmp')])
+
+    def test_refresh(self):
+        config = JSONConfig(self.filename)
+        self.assertFalse(config.refresh())
+        other = JSONConfig(self.filename)
+        other.set('players', 'c', 'uuid-c')
+        other.save()
+        self.assertIsNone(config.get('players', 'c', fallback=None))
+        self.assertTrue(config.refresh())
+        self.assertEqual('uuid-c', config.get('players', 'c'))
+
+    def test_unsaved_changes_survive_refresh(self):
+        config = JSONConfig(self.filename)
+        config.remove_section('limits')
+        config.set('players', 'c', 'uuid-c')
+        other = JSONConfig(self.filename)
+        other.set('players', 'd', 'uuid-d')
+        other.save()
+        config.refresh()
+        self.assertEqual('uuid-c', config.get('players', 'c'))
+        self.assertEqual('uuid-d', config.get('players', 'd'))
+        self.assertFalse(config.has_section('limits'))
+
+    def test_concurrent_processes(self):
+        processes = [multiprocessing.Process(target=register_players, args=(self.filename, p, 10)) for p in 'wxyz']
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        config = JSONConfig(self.filename)
+        self.assertEqual(2 + 40, len(config.options('players')))
+        self.assertEqual('uuid-x-7', config.get('players', 'x7'))
@@ -0,0 +1,34 @@
+import json
+from unittest import TestCase
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from localserver import LocalServer, MockTable
+
+
+class TestLocalServer(TestCase):
+    def setUp(self):
+        self.server = LocalServer([MockTable('t1')]).start()
+        self.addCleanup(self.server.stop)
+
+    def post(self, path, data):
+        request = Request(self.server.url + path, json.dumps(data).encode(), {'Content-Type': 'application/json'})
+        with urlopen(request) as response:
+            return response.read().decode()
+
+    def test_join_and_act(self):
+        player_uuid = self.post('/uuid', {'player_name': 'a'})
+        self.post('/table/t1/actions/join?uuid=' + player_uuid, {'position': 2})
+        self.post('/table/t1/actions/call?uuid=' + player_uuid, {})
+        self.assertEqual({'2': 'a'}, self.server.tables['t1'].players)
+        self.assertEqual([('a', 'call', {})], self.server.tables['t1'].actions)
+
+    def test_conditional_status(self):
+        with urlopen(self.server.url + '/table/t1') as response:
+            etag = response.headers['ETag']
+        with self.assertRaises(HTTPError) as cm:
+            urlopen(Request(self.server.url + '/table/t1', headers={'If-None-Match': etag}))
+        self.assertEqual(304, cm.exception.code)
+        self.server.tables['t1'].join('a', 1)
+        with urlopen(Request(self.server.url + '/table/t1', headers={'If-None-Match': etag})) as response:
+            self.assertEqual({'1': 'a'}, json.loads(response.read())['players'])
@@ -0,0 +1,150 @@
+from argparse import ArgumentParser
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from unittest import TestCase
+from urllib.request import urlopen
+
+import metrics
+from metrics import Dumper, Histogram, MetricsServer, Registry
+import ranking
+
+
+@metrics.timed('work_seconds', profile=True)
+def work(n):
+    metrics.count('work_total', n)
+    return sum(range(n))
+
+
+class TestHistogram(TestCase):
+    def test_quantiles(self):
+        histogram = Histogram()
+        for value in [0.0002] * 90 + [0.03] * 9 + [20.0]:
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(100, snapshot['count'])
+        self.assertEqual(0.00025, snapshot['p50'])
+        self.assertEqual(0.05, snapshot['p95'])
+        self.assertEqual(0.05, snapshot['p99'])
+        self.assertEqual(20.0, snapshot['max'])
+        self.assertEqual(20.0, histogram.quantile(1.0))
+
+    def test_prometheus(self):
+        registry = Registry()
+        registry.count('calls_total', 3)
+        registry.observe('call_seconds', 0.004)
+        registry.observe('call_seconds', 100.0)
+        lines = registry.prometheus().splitlines()
+        self.assertIn('# TYPE poker_calls_total counter', lines)
+        self.assertIn('poker_calls_total 3', lines)
+        self.assertIn('poker_call_seconds_bucket{le="0.0025"} 0', lines)
+        self.assertIn('poker_call_seconds_bucket{le="0.005"} 1', lines)
+        self.assertIn('poker_call_seconds_bucket{le="+Inf"} 2', lines)
+        self.assertIn('poker_call_seconds_count 2', lines)
+
+    def test_concurrent_recording(self):
+        registry = Registry()
+        interval = sys.getswitchinterval()
+        self.addCleanup(sys.setswitchinterval, interval)
+        sys.setswitchinterval(1e-6)
+        done = threading.Event()
+
+        def record(thread):
+            for i in range(5000):
+                registry.count('calls_total')
+                registry.count('thread_{}_{}_total'.format(thread, i % 500))
+                registry.observe('call_seconds', 0.001)
+
+        def read():
+            while not done.is_set():
+                registry.prometheus()
+                registry.snapshot()
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        writers = [threading.Thread(target=record, args=(i,)) for i in range(8)]
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        reader.join()
+        self.assertEqual(8 * 5000, registry.counters['calls_total'])
+        self.assertEqual(8 * 5000, registry.histograms['call_seconds'].count)
+        self.assertEqual(8 * 5000, sum(registry.histograms['call_seconds'].counts))
+
+
+class TestInstrumentation(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(metrics.REGISTRY.reset)
+        self.addCleanup(metrics.disable)
+        metrics.REGISTRY.reset()
+
+    def test_disabled(self):
+        self.assertEqual(45, work(10))
+        with metrics.timer('block_seconds'):
+            pass
+        self.assertEqual({}, metrics.REGISTRY.counters)
+        self.assertEqual({}, metrics.REGISTRY.histograms)
+
+    def test_enabled(self):
+        metrics.enable()
+        work(10)
+        work(5)
+        with metrics.timer('block_seconds'):
+            pass
+        snapshot = metrics.REGISTRY.snapshot()
+        self.assertEqual({'work_total': 15}, snapshot['counters'])
+        self.assertEqual(2, snapshot['histograms']['work_seconds']['count'])
+        self.assertEqual(1, snapshot['histograms']['block_seconds']['count'])
+        json.dumps(snapshot)
+
+    def test_profile(self):
+        metrics.enable(profile=self.directory)
+        self.assertEqual(45, work(10))
+        profiles = os.listdir(self.directory)
+        self.assertEqual(1, len(profiles))
+        self.assertTrue(profiles[0].startswith('work_seconds-'))
+        self.assertEqual(1, metrics.REGISTRY.histograms['work_seconds'].count)
+
+    def test_dumper(self):
+        metrics.enable()
+        work(3)
+        for name in ('metrics.json', 'metrics.prom'):
+            path = os.path.join(self.directory, name)
+            dumper = Dumper(path, interval=0.01).start()
+            dumper.stop()
+            with open(path) as f:
+                data = f.read()
+            if name.endswith('.json'):
+                self.assertEqual(3, json.loads(data)['counters']['work_total'])
+            else:
+                self.assertIn('poker_work_total 3', data)
+        self.assertEqual(['metrics.json', 'metrics.prom'], sorted(os.listdir(self.directory)))
+
+    def test_server(self):
+        metrics.enable()
+        work(4)
+        with MetricsServer() as server:
+            text = urlopen(server.url).read().decode()
+        self.assertIn('poker_work_total 4', text)
+        self.assertIn('poker_work_seconds_count 1', text)
+
+    def test_local_by_default(self):
+        argparser = ArgumentParser()
+        metrics.add_arguments(argparser)
+        params = vars(argparser.parse_args(['--metrics_port', '0']))
+        server, = metrics.start_from_args(params)
+        self.addCleanup(server.stop)
+        self.assertEqual({}, params)
+        self.assertEqual('127.0.0.1', server.httpd.server_address[0])
+
+    def test_instrumented_paths(self):
+        metrics.enable()
+        ranking.rank_function(['As', 'Ks', 'Qs', 'Js', '10s'])
+        self.assertEqual(1, metrics.REGISTRY.histograms['rank_function_seconds'].count)
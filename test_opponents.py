@@ -0,0 +1,87 @@
+from array import array
+import json
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+from opponents import _MAGIC, OpponentStats, PlayerStats
+from tablestate import TableState
+
+
+def hand(hand_id):
+    """The statuses of a hand: a and b post the blinds, me calls, a raises, b folds, me calls. a bets the flop and me
+    calls, me bets the river and a calls."""
+    players = {'1': 'me', '2': 'a', '3': 'b'}
+    preflop = [{'a': 5, 'b': 10}, {'a': 5, 'b': 10, 'me': 10}, {'a': 30, 'b': 10, 'me': 10},
+               {'a': 30, 'b': 10, 'me': 30}]
+    statuses = [{'players': players, 'hand_id': hand_id, 'bets': bets,
+                 'active_players': ['me', 'a', 'b'] if i < 3 else ['me', 'a']} for i, bets in enumerate(preflop)]
+    board = ['2c', '3c', '10h', 'Kd', 'Ad']
+    for cards, bets in ((3, {'a': 20}), (3, {'a': 20, 'me': 20}), (4, {}), (5, {'me': 50}), (5, {'me': 50, 'a': 50})):
+        statuses.append({'players': players, 'hand_id': hand_id, 'bets': bets, 'community_cards': board[:cards],
+                         'active_players': ['me', 'a']})
+    return statuses
+
+
+class TestOpponentStats(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'opponents.stats')
+
+    def play(self, stats, hands=1):
+        state = TableState('me')
+        for hand_id in range(hands):
+            for status in hand(hand_id):
+                stats.observe(state, state.apply(status))
+        # the next hand ends the last one
+        stats.observe(state, state.apply(hand(hands)[0]))
+
+    def test_counts(self):
+        stats = OpponentStats()
+        self.play(stats)
+        self.assertEqual(PlayerStats(2, 0.5, 0.5, 1.0, 0.5), stats.get('a'))
+        self.assertEqual(PlayerStats(2, 0.5, 0.0, 1.0, 0.5), stats.get('me'))
+        self.assertEqual(PlayerStats(2, 0.0, 0.0, 0.0, 0.0), stats.get('b'))
+        self.assertIsNone(stats.get('c'))
+        self.assertEqual(3 * 6, len(stats.counts))
+
+    def test_save_and_load(self):
+        stats = OpponentStats(self.path)
+        self.play(stats, 3)
+        stats.save()
+        loaded = OpponentStats(self.path)
+        for name in ('me', 'a', 'b'):
+            self.assertEqual(stats.get(name), loaded.get(name))
+        self.play(loaded)
+        # three hands, the fourth started, and another two
+        self.assertEqual(6, loaded.get('a').hands)
+        self.assertEqual([], [name for name in os.listdir(self.directory) if name.endswith('.tmp')])
+
+    def test_periodic_save(self):
+        stats = OpponentStats(self.path, interval=3600)
+        self.play(stats)
+        self.assertFalse(os.path.exists(self.path))
+        stats.interval = 0
+        self.play(stats)
+        self.assertEqual(4, OpponentStats(self.path).get('a').hands)
+
+    def test_load_other_fields(self):
+        # a file of a version that counted hands and raises only, in another order
+        header = json.dumps({'fields': ['pfr', 'hands'], 'names': ['a', 'b'], 'byteorder': sys.byteorder}).encode()
+        with open(self.path, 'wb') as f:
+            f.write(_MAGIC + len(header).to_bytes(4, 'little') + header + array('I', [1, 10, 0, 20]).tobytes())
+        stats = OpponentStats(self.path)
+        self.assertEqual(PlayerStats(10, 0.0, 0.1, 0.0, 0.0), stats.get('a'))
+        self.assertEqual(20, stats.get('b').hands)
+        self.play(stats)
+        self.assertEqual(22, stats.get('b').hands)
+
+    def test_not_a_stats_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'nothing')
+        with self.assertRaises(ValueError):
+            OpponentStats(self.path)
+
@@ -0,0 +1,82 @@
+import time
+from unittest import TestCase
+
+from opponents import AGGRESSIVE, HANDS, PASSIVE, PFR, OpponentStats
+from pokerAI import betting, count_opponents, pokerAI
+
+
+def opponent(stats, name, hands, pfr=0, aggressive=0, passive=0):
+    offset = stats._slot(name)
+    stats.counts[offset + HANDS] = hands
+    stats.counts[offset + PFR] = pfr
+    stats.counts[offset + AGGRESSIVE] = aggressive
+    stats.counts[offset + PASSIVE] = passive
+
+
+class TestStrategy(TestCase):
+    def status(self, board=(), bets=None, pot=0, players=('me', 'a'), stack=1000):
+        return {'players': {str(i + 1): name for i, name in enumerate(players)}, 'community_cards': list(board),
+                'bets': bets or {}, 'pot': pot, 'stacks': {name: stack for name in players}}
+
+    def setUp(self):
+        self.ai = pokerAI(playername='me', workers=1)
+
+    def test_betting(self):
+        self.assertEqual((40, 160, 1000), betting(self.status(bets={'me': 20, 'a': 60}, pot=80), 'me'))
+        self.assertEqual((0, 0, None), betting({}, 'me'))
+
+    def test_folded_players_are_no_opponents(self):
+        status = self.status(players=('me', 'a', 'b', 'c'))
+        self.assertEqual(3, count_opponents(status))
+        status['active_players'] = ['me', 'c']
+        self.assertEqual(1, count_opponents(status))
+        heads_up = self.ai.get_winning_odds(['As', 'Kd'], self.status())
+        self.assertEqual(heads_up, self.ai.get_winning_odds(['As', 'Kd'], status))
+
+    def test_raise_the_nuts(self):
+        actions = self.ai.get_strategy(['As', 'Ks'], self.status(['Qs', 'Js', '10s', '2d', '3c'], {'a': 50}, 100))
+        self.assertEqual(('raise', {'amount': 50 + round(0.75 * 200)}), actions[0])
+        self.assertEqual(0.0, self.ai.last_odds.error)
+
+    def test_fold_trash_against_big_bet(self):
+        actions = self.ai.get_strategy(['7c', '2d'], self.status(['As', 'Ks', 'Qh'], {'a': 500}, 100))
+        self.assertEqual('fold', actions[0])
+
+    def test_check_weak_hand_for_free(self):
+        self.assertEqual(['check', 'call'], self.ai.get_strategy(['7c', '2d'], self.status(players=('me', 'a', 'b'))))
+
+    def test_call_with_pot_odds(self):
+        actions = self.ai.get_strategy(['8h', '9h'], self.status(['Ah', '2h', 'Kc'], {'a': 10}, 200))
+        self.assertEqual('call', actions[0])
+
+    def test_all_in_raise_capped_by_stack(self):
+        actions = self.ai.get_strategy(['Ah', 'Ad'], self.status(bets={'a': 20}, pot=30, stack=60))
+        self.assertEqual(('raise', {'amount': 60}), actions[0])
+
+    def test_deadline(self):
+        # an undecided spot, the flop estimate alone can not settle it
+        status = self.status(['Jh', '10h', '3c'], {'a': 30}, 60)
+        start = time.perf_counter()
+        self.ai.get_strategy(['Qh', '4d'], status, deadline=start)
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertEqual(0.2, self.ai.last_odds.error)
+        self.ai.get_strategy(['Qh', '4d'], status, deadline=time.perf_counter() + 0.1)
+        self.assertLess(self.ai.last_odds.error, 0.2)
+        self.assertEqual(0, self.ai.last_odds.samples % 500)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_read_the_bettor(self):
+        stats = OpponentStats()
+        self.ai.stats = stats
+        flop = self.status(['Jh', '10h', '3c'], {'a': 30}, 60)
+        self.assertEqual(0, self.ai.read(flop))
+        opponent(stats, 'a', 10, aggressive=0, passive=5)
+        self.assertEqual(0, self.ai.read(flop))
+        # a passive player betting has it, calling takes more equity
+        opponent(stats, 'a', 100, pfr=40, aggressive=2, passive=10)
+        self.assertEqual(1, self.ai.read(flop))
+        self.assertAlmostEqual(30 / 120 + 0.05, self.ai.thresholds(30, 90, 1, self.ai.read(flop))[0])
+        # preflop the raise frequency counts, and it raises a lot
+        self.assertEqual(-1, self.ai.read(self.status(bets={'a': 30}, pot=0)))
+        self.assertEqual(0, self.ai.read(self.status(bets={'me': 30, 'a': 10}, pot=0)))
+        self.ai.get_strategy(['Qh', '4d'], flop, deadline=time.perf_counter())
@@ -0,0 +1,164 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock, patch
+
+import requests
+
+from history import HistoryRecorder, replay
+from jsonconfig import JSONConfig
+import metrics
+from pokerclient import Player
+
+
+def response(status_code=200, json=None, text='', headers=None):
+    return Mock(status_code=status_code, json=Mock(return_value=json), text=text, headers=headers or {})
+
+
+class TestPlayer(TestCase):
+    def setUp(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.config', delete=False) as f:
+            f.write('[players]\nFetteElke = "uuid"\n')
+        self.addCleanup(os.remove, f.name)
+        self.addCleanup(lambda: os.path.exists(f.name + '.lock') and os.remove(f.name + '.lock'))
+        self.configfile = f.name
+        self.player = Player(configfile=f.name, tablename='t1', backoff=0, UUID='uuid')
+        self.player.session = Mock()
+
+    def test_lazy_construction(self):
+        with patch('pokerclient.JSONConfig') as config, patch.object(Player, 'register_user') as register:
+            player = Player(configfile='missing.config', tablename='t1')
+        config.assert_not_called()
+        register.assert_not_called()
+        self.assertIsNone(player._session)
+
+    def test_uuid_from_config(self):
+        player = Player(configfile=self.configfile, tablename='t1')
+        player.session = Mock()
+        self.assertEqual('uuid', player.UUID)
+        player.session.request.assert_not_called()
+
+    def test_uuid_from_baseline_config(self):
+        with open(self.configfile, 'w') as f:
+            f.write('[players]\n"FetteElke" = uuid\n')
+        player = Player(configfile=self.configfile, tablename='t1')
+        player.session = Mock()
+        self.assertEqual('uuid', player.UUID)
+        player.session.request.assert_not_called()
+
+    def test_register_missing_player(self):
+        player = Player(configfile=self.configfile, tablename='t1', playername='new')
+        player.session = Mock()
+        player.session.request.return_value = response(200, text='uuid-new')
+        self.assertEqual('uuid-new', player.UUID)
+        self.assertEqual('uuid-new', player.UUID)
+        self.assertEqual(1, player.session.request.call_count)
+        self.assertEqual('uuid-new', JSONConfig(self.configfile).get('players', 'new'))
+        self.assertEqual('uuid', JSONConfig(self.configfile).get('players', 'FetteElke'))
+
+    def test_opponent_stats(self):
+        self.assertIsNone(self.player.ai.stats)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        player = Player(configfile=self.configfile, tablename='t1', stats_file=os.path.join(directory, 'stats'))
+        self.assertIs(player.stats, player.ai.stats)
+
+    def test_light_import(self):
+        heavy = ['numpy', 'requests', 'unittest', 'multiprocessing']
+        for module in ('pokerclient', 'client'):
+            code = 'import sys, {}; print(*[m for m in {!r} if m in sys.modules])'.format(module, heavy)
+            output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                    check=True, capture_output=True, text=True).stdout
+            self.assertEqual('', output.strip(), module)
+
+    def test_retry_idempotent(self):
+        self.player.session.request.side_effect = [requests.ConnectionError(), response(503), response(200, {})]
+        self.assertEqual(200, self.player.request('GET', '/tables').status_code)
+        self.assertEqual(3, self.player.session.request.call_count)
+
+    def test_give_up(self):
+        self.player.session.request.side_effect = requests.ConnectionError()
+        with self.assertRaises(requests.ConnectionError):
+            self.player.request('GET', '/tables')
+        self.assertEqual(self.player.retries + 1, self.player.session.request.call_count)
+
+    def test_no_retry_action_after_read_timeout(self):
+        self.player.session.request.side_effect = [requests.ReadTimeout(), response(200)]
+        with self.assertRaises(requests.ReadTimeout):
+            self.player.table_action('call')
+        self.player.session.request.side_effect = [response(503), response(200)]
+        self.assertEqual(503, self.player.table_action('call'))
+
+    def test_timeout(self):
+        self.player.session.request.return_value = response(200, {})
+        self.player.request('GET', '/tables')
+        self.assertEqual(self.player.timeout, self.player.session.request.call_args[1]['timeout'])
+
+    def test_join_once(self):
+        tables = {'tables': [{'name': 't1', 'max_player_count': 3, 'players': {'1': 'other'}}]}
+        self.player.session.request.side_effect = [response(200, tables), response(200)]
+        self.player.join_table()
+        self.player.join_table()
+        self.assertEqual(2, self.player.session.request.call_count)
+        self.assertEqual({'position': 2}, self.player.session.request.call_args[1]['json'])
+        self.assertEqual(2, self.player.seat)
+
+    def test_conditional_status(self):
+        status = {'current_player': 'x', 'players': {'1': 'x'}}
+        self.player.session.request.side_effect = [response(200, status, headers={'ETag': '"1"'}), response(304)]
+        self.assertEqual(status, self.player.get_table_status())
+        self.assertEqual(status, self.player.get_table_status())
+        self.assertEqual({'If-None-Match': '"1"'}, self.player.session.request.call_args[1]['headers'])
+
+    def test_metrics(self):
+        self.addCleanup(metrics.REGISTRY.reset)
+        self.addCleanup(metrics.disable)
+        metrics.enable()
+        status = {'current_player': 'x', 'players': {'1': 'x'}}
+        self.player.session.request.side_effect = [response(200, status, headers={'ETag': '"1"'}), response(304)]
+        self.player.get_table_status()
+        self.player.get_table_status()
+        self.assertEqual(2, metrics.REGISTRY.histograms['http_status_seconds'].count)
+        self.assertEqual(1, metrics.REGISTRY.counters['http_not_modified_total'])
+        self.player.session.request.side_effect = [response(200)]
+        self.player.join_table(2)
+        self.assertEqual(1, metrics.REGISTRY.histograms['http_join_seconds'].count)
+
+    def test_lost_seat(self):
+        self.player.seat = 2
+        self.player.session.request.return_value = response(200, {'current_player': 'x', 'players': {'1': 'x'}})
+        self.player.get_table_status()
+        self.assertIsNone(self.player.seat)
+
+    def test_act(self):
+        status = {'current_player': 'FetteElke', 'players': {'1': 'FetteElke', '2': 'x'}, 'hole_cards': ['7c', '2d'],
+                  'community_cards': ['As', 'Ks', 'Qh'], 'bets': {'x': 500}, 'pot': 100}
+        self.player.table.apply(status)
+        self.player.session.request.return_value = response(200)
+        self.assertEqual('fold', self.player.act(status))
+        self.assertTrue(self.player.session.request.call_args[0][1].endswith('/actions/fold'))
+
+    def test_record_actions(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.player.history = HistoryRecorder(directory, session='s')
+        status = {'current_player': 'FetteElke', 'players': {'1': 'FetteElke'}, 'hand_id': 1}
+        self.player.history.observe(self.player.table, self.player.table.apply(status))
+        self.player.session.request.return_value = response(200)
+        self.player.act(status)
+        self.player.history.close()
+        hand, = replay(directory)
+        self.assertEqual([('FetteElke', 'call', 0)], hand.actions)
+
+    def test_act_without_hole_cards(self):
+        self.player.session.request.side_effect = [response(400), response(200)]
+        self.assertEqual('check', self.player.act({'current_player': 'FetteElke'}))
+
+    def test_unchanged_status_is_not_applied_again(self):
+        status = {'current_player': 'x', 'players': {'1': 'x'}}
+        self.player.session.request.side_effect = [response(200, status, headers={'ETag': '"1"'}), response(304)]
+        self.assertTrue(self.player.table.apply(self.player.get_table_status()))
+        self.assertEqual([], self.player.table.apply(self.player.get_table_status()))
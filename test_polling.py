@@ -0,0 +1,50 @@
+from unittest import TestCase
+
+from polling import AdaptivePoller, seats_until_turn
+
+
+def example_status(current, players=('a', 'b', 'c', 'd'), active=None):
+    result = {'players': {str(i + 1): name for i, name in enumerate(players)}, 'current_player': current}
+    if active is not None:
+        result['active_players'] = active
+    return result
+
+
+class TestSeatsUntilTurn(TestCase):
+    def test_distance(self):
+        self.assertEqual(0, seats_until_turn(example_status('c'), 'c'))
+        self.assertEqual(1, seats_until_turn(example_status('b'), 'c'))
+        self.assertEqual(3, seats_until_turn(example_status('d'), 'c'))
+
+    def test_folded_players(self):
+        self.assertEqual(1, seats_until_turn(example_status('a', active=['a', 'c', 'd']), 'c'))
+        self.assertIsNone(seats_until_turn(example_status('a', active=['a', 'd']), 'c'))
+
+    def test_not_seated(self):
+        self.assertIsNone(seats_until_turn(example_status('a'), 'x'))
+        self.assertIsNone(seats_until_turn(example_status(None), 'a'))
+        self.assertIsNone(seats_until_turn(500, 'a'))
+
+
+class TestAdaptivePoller(TestCase):
+    def test_tighten_when_approaching(self):
+        poller = AdaptivePoller('d', min_interval=0.01, base_interval=0.3)
+        intervals = [poller.next_interval(example_status(current)) for current in 'abcd']
+        self.assertEqual([0.04, 0.02, 0.01, 0.01], intervals)
+
+    def test_back_off_when_out_of_hand(self):
+        poller = AdaptivePoller('d', base_interval=0.2, max_interval=1.0, backoff=2)
+        intervals = [poller.next_interval(example_status('a', active=['a', 'b'])) for _ in range(4)]
+        self.assertEqual([0.4, 0.8, 1.0, 1.0], intervals)
+        self.assertEqual(0.02, poller.next_interval(example_status('a', active=['a', 'd'])))
+        self.assertEqual(0.4, poller.next_interval(example_status(None)))
+
+    def test_latency(self):
+        poller = AdaptivePoller('b')
+        poller.next_interval(example_status('a'), now=10.0)
+        poller.next_interval(example_status('b'), now=10.1)
+        poller.acted(now=10.15)
+        report = poller.report()
+        self.assertAlmostEqual(0.1, report['detection']['max'])
+        self.assertAlmostEqual(0.15, report['reaction']['mean'])
+        self.assertEqual(1, report['reaction']['count'])
@@ -0,0 +1,24 @@
+from unittest import TestCase
+
+from preflop import hand_class, hand_classes, preflop_odds
+import ranking
+
+
+class TestPreflop(TestCase):
+    def test_hand_class(self):
+        self.assertEqual('AKs', hand_class(ranking.encode_cards(['Kh', 'Ah'])))
+        self.assertEqual('T9o', hand_class(ranking.encode_cards(['9h', '10d'])))
+        self.assertEqual('22', hand_class(ranking.encode_cards(['2c', '2d'])))
+
+    def test_classes(self):
+        classes = hand_classes()
+        self.assertEqual(169, len(classes))
+        for name, hole in classes.items():
+            self.assertEqual(name, hand_class(hole))
+
+    def test_table(self):
+        aces = preflop_odds(ranking.encode_cards(['As', 'Ah']), 1)
+        self.assertAlmostEqual(0.85, aces.equity, delta=0.01)
+        self.assertLess(preflop_odds(ranking.encode_cards(['As', 'Ah']), 9).equity, aces.equity)
+        self.assertLess(preflop_odds(ranking.encode_cards(['7s', '2h']), 1).equity, 0.4)
+        self.assertIsNone(preflop_odds(ranking.encode_cards(['7s', '2h']), 10))
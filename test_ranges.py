@@ -0,0 +1,87 @@
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import equity
+from ranges import COMBOS, combo_index, hand_vs_range, parse_range, range_odds
+import ranking
+
+
+class TestParse(TestCase):
+    def holdings(self, text):
+        return len(parse_range(text))
+
+    def test_counts(self):
+        self.assertEqual(6, self.holdings('QQ'))
+        self.assertEqual(18, self.holdings('QQ+'))
+        self.assertEqual(24, self.holdings('22-55'))
+        self.assertEqual(4, self.holdings('AKs'))
+        self.assertEqual(12, self.holdings('AKo'))
+        self.assertEqual(16, self.holdings('KA'))
+        self.assertEqual(16, self.holdings('ATs+'))
+        self.assertEqual(16, self.holdings('A2s-A5s'))
+        self.assertEqual(1, self.holdings('AsKd'))
+        self.assertEqual(26, self.holdings('QQ+, AKs, 76s'))
+        self.assertEqual(94, self.holdings('22+, 32+'))
+        self.assertEqual(len(COMBOS), self.holdings('any'))
+
+    def test_weights_and_membership(self):
+        r = parse_range('AKs:0.5, QQ')
+        self.assertEqual(0.5, r.weights[combo_index(ranking.encode_cards(['As', 'Ks']))])
+        self.assertIn(ranking.encode_cards(['Qh', 'Qd']), r)
+        self.assertNotIn(ranking.encode_cards(['As', 'Kd']), r)
+
+    def test_remove_dead_cards(self):
+        r = parse_range('QQ+, AKs')
+        self.assertEqual(22 - 3, len(r.without(ranking.encode_cards(['Qh']))))
+        self.assertEqual(19 - 1 - 3, len(r.without(ranking.encode_cards(['Qh', 'Ks']))))
+        self.assertEqual(22, len(r))
+
+    def test_invalid(self):
+        for text in ('QQs', 'AX', 'AsAs', 'AKs-QJs', 'A2s-A5o'):
+            with self.assertRaises(ValueError):
+                parse_range(text)
+
+
+@skipIf(np is None, 'numpy is not installed')
+class TestRangeOdds(TestCase):
+    def test_matches_exact_against_any_hand(self):
+        hole = ranking.encode_cards(['Ah', 'Kh'])
+        board = ranking.encode_cards(['Qh', '7c', '2d', '9s'])
+        expected = equity.exact_odds(hole, board, 1)
+        odds = hand_vs_range(hole, 'any', board)
+        self.assertAlmostEqual(expected.equity, odds.equity)
+        self.assertAlmostEqual(expected.tie, odds.tie)
+        self.assertEqual(0.0, odds.error)
+
+    def test_brute_force(self):
+        hero = parse_range('JJ+, AQs')
+        villain = parse_range('TT+, AK:0.5, 76s')
+        board = ranking.encode_cards(['Js', '8c', '5h', 'Ad'])
+        wins = ties = total = 0.0
+        for river in ranking.deck:
+            if river in board:
+                continue
+            full_board = board + [river]
+            for h, hw in hero.combos(full_board):
+                for v, vw in villain.combos(full_board + list(h)):
+                    a, b = ranking.evaluate(list(h) + full_board), ranking.evaluate(list(v) + full_board)
+                    wins += hw * vw * (a > b)
+                    ties += hw * vw * (a == b)
+                    total += hw * vw
+        odds = range_odds(hero, villain, board)
+        self.assertAlmostEqual(wins / total, odds.win)
+        self.assertAlmostEqual(ties / total, odds.tie)
+
+    def test_sampled(self):
+        odds = hand_vs_range(ranking.encode_cards(['Ah', 'Ad']), 'KK', max_runouts=500, seed=1)
+        self.assertEqual(500, odds.samples)
+        self.assertAlmostEqual(0.82, odds.equity, delta=max(odds.error, 0.01) + 0.01)
+        self.assertGreater(odds.error, 0)
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            hand_vs_range(ranking.encode_cards(['Ah', 'Ad']), 'AhAd')
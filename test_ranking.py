@@ -0,0 +1,368 @@
+from itertools import combinations
+import random
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ranking import (SHORT_DECK, HandState, canonical_cards, canonical_codes, create_card, deck, decode_cards,
+                     encode_cards, evaluate, evaluate_short_deck, find_flush, find_full_house, find_high_card,
+                     find_n_of_a_kind, find_straight, find_straight_flush, find_two_pairs, parse_cards, rank_function,
+                     rank_many, rank_value, suits, unpack_strength)
+
+
+class TestFindHighCard(TestCase):
+    def test_empty(self):
+        self.assertEqual([], find_high_card([]))
+
+    def test_less_than_five(self):
+        cards = parse_cards(['5d', 'Jh', 'As'])
+        self.assertEqual([14, 11, 5], find_high_card(cards))
+
+    def test_more_than_five(self):
+        cards = parse_cards(['5d', 'Jh', 'As', '10c', '2c', '2d', '4d'])
+        self.assertEqual([14, 11, 10, 5, 4], find_high_card(cards))
+
+
+class TestNOfAKind(TestCase):
+    def test_not_found(self):
+        cards = parse_cards(['5d', 'Jh', 'As', '10c', '2c', '3d', '4d'])
+        self.assertIsNone(find_n_of_a_kind(2, cards))
+
+    def test_one_result(self):
+        cards = parse_cards(['5d', 'Jh', 'As', '10c', '2c', '2d', '4d'])
+        self.assertEqual([2, 14, 11, 10], find_n_of_a_kind(2, cards))
+
+    def test_two_results(self):
+        cards = parse_cards(['5d', '5c', '5h', '2s', '2c', '2d', 'As'])
+        self.assertEqual([5, 14, 2], find_n_of_a_kind(3, cards))
+
+    def test_bigger_n(self):
+        cards = parse_cards(['5d', 'Jh', 'As', '10c', '5c', '5d', '5d'])
+        self.assertEqual([5, 14], find_n_of_a_kind(4, cards))
+
+
+class TestFindTwoPairs(TestCase):
+    def test_not_found(self):
+        cards = parse_cards(['5d', 'Jh', 'As', '5c', '2c', '3d', '4d'])
+        self.assertIsNone(find_two_pairs(cards))
+
+    def test_found(self):
+        cards = parse_cards(['5d', 'Jh', 'As', '5c', '2c', '2d', '4d'])
+        self.assertEqual([5, 2, 14], find_two_pairs(cards))
+
+    def test_only_four_cards(self):
+        cards = parse_cards(['5d', '5c', '2c', '2d'])
+        self.assertEqual([5, 2], find_two_pairs(cards))
+
+    def test_three_pairs(self):
+        cards = parse_cards(['5d', '2h', 'As', '5c', '2c', 'Jd', 'Jd'])
+        self.assertEqual([11, 5, 14], find_two_pairs(cards))
+
+
+class TestFindStraight(TestCase):
+    def test_not_found(self):
+        cards = parse_cards(['4d', '7h', '2s', '5c', '7c', '6d', 'Qd'])
+        self.assertIsNone(find_straight(cards))
+
+    def test_with_double(self):
+        cards = parse_cards(['4d', '7h', '8s', '5c', '7c', '6d', 'Qd'])
+        self.assertEqual(8, find_straight(cards))
+
+    def test_straight_with_six_cards(self):
+        cards = parse_cards(['4d', '8h', '3s', '5c', '7c', '6d', 'Qd'])
+        self.assertEqual(8, find_straight(cards))
+
+    def test_find_straight_low_ace(self):
+        cards = parse_cards(['4d', '8h', '3s', '5c', '2c', '7d', 'Ad'])
+        self.assertEqual(5, find_straight(cards))
+
+    def test_dont_use_low_ace_if_better_straight_possible(self):
+        cards = parse_cards(['4d', '8h', '3s', '5c', '2c', '6d', 'Ad'])
+        self.assertEqual(6, find_straight(cards))
+
+    def test_no_low_king(self):
+        cards = parse_cards(['Kd', '8h', '3s', '4c', '2c', '7d', 'Ad'])
+        self.assertIsNone(find_straight(cards))
+
+    def test_card_strings(self):
+        self.assertEqual(14, find_straight(['10d', 'Jh', 'Qs', 'Kc', 'Ac']))
+        self.assertIsNone(find_straight([]))
+
+    def test_two_straights(self):
+        cards = parse_cards(['Ad', '2h', '3s', '4c', '5c', '9d', '10d', 'Jh', 'Qs', 'Kc'])
+        self.assertEqual(14, find_straight(cards))
+
+
+class TestFindFlush(TestCase):
+    def test_not_found(self):
+        cards = parse_cards(['10d', '8d', '3c', '5h', 'Qd', '7d', 'As'])
+        self.assertIsNone(find_flush(cards))
+
+    def test_find_flush(self):
+        cards = parse_cards(['10d', '8d', '3d', '5d', 'Qd', 'As'])
+        self.assertEqual([12, 10, 8, 5, 3], find_flush(cards))
+
+    def test_more_than_five_cards(self):
+        cards = parse_cards(['10d', '8d', '3d', '5d', 'Qd', '7d', 'As'])
+        self.assertEqual([12, 10, 8, 7, 5], find_flush(cards))
+
+    def test_best_suit(self):
+        cards = ['2s', '3s', '4s', '6s', 'Ks', '9d', '8d', '7d', '5d', 'Kd', 'Qd']
+        self.assertEqual([13, 12, 9, 8, 7], find_flush(cards))
+        self.assertEqual([13, 12, 9, 8, 7], find_flush(list(reversed(cards))))
+
+
+class TestFindFullHouse(TestCase):
+    def test_no_triple(self):
+        cards = parse_cards(['10d', '10s', '3c', '3h', 'Qd', '7d', 'As'])
+        self.assertIsNone(find_full_house(cards))
+
+    def test_no_pair(self):
+        cards = parse_cards(['10d', '10s', '3c', '10h', 'Qd', '7d', 'As'])
+        self.assertIsNone(find_full_house(cards))
+
+    def test_find_full_house(self):
+        cards = parse_cards(['10d', '10s', '3d', '5d', '3h', '3c', 'As'])
+        self.assertEqual([3, 10], find_full_house(cards))
+
+    def test_choose_best(self):
+        cards = parse_cards(['10d', '10s', '3d', 'Qd', '3h', '3c', 'Qs'])
+        self.assertEqual([3, 12], find_full_house(cards))
+
+    def two_triples(self):
+        cards = parse_cards(['10d', '10s', '10h', '3d', '3h', 'Qc', '3s'])
+        self.assertEqual([3, 12], find_full_house(cards))
+
+
+class TestFindStraightFlush(TestCase):
+    def test_no_flush(self):
+        cards = parse_cards(['2d', '3d', '4s', '5c', '6d', '7d', '8d'])
+        self.assertIsNone(find_straight_flush(cards))
+
+    def test_no_straight(self):
+        cards = parse_cards(['10d', '10d', '3d', '3d', 'Qd', '7d', 'Ad'])
+        self.assertIsNone(find_straight_flush(cards))
+
+    def test_find_straight_flush(self):
+        cards = parse_cards(['2d', '3d', '4d', '5d', '6d', '7d', '8c'])
+        self.assertEqual(7, find_straight_flush(cards))
+
+    def test_with_low_ace(self):
+        cards = parse_cards(['2d', '3d', '4d', '5d', '6c', '7c', 'Ad'])
+        self.assertEqual(5, find_straight_flush(cards))
+
+    def test_every_suit(self):
+        # the spades come first and hold a flush without a straight
+        cards = ['As', 'Ks', '9s', '7s', '2s', '8h', '9h', '10h', 'Jh', 'Qh']
+        self.assertEqual(12, find_straight_flush(cards))
+        self.assertEqual(12, find_straight_flush(cards + ['Ac', '2c', '3c', '4c', '5c']))
+
+
+class TestRanking(TestCase):
+    # In particular check cases where two rankings apply (e.g. Full House and Flush)
+    card_sets = [
+        # Straight Flush
+        ['As', 'Ks', 'Qs', 'Js', '10s', '2c', '3c'],
+        ['Ks', 'Qs', 'Js', '10s', '9s', '2c', '3c'],
+        # 4 of a kind
+        ['10s', '10d', '10c', '10h', 'As', '2c', '2d'],
+        ['10s', '10d', '10c', '10h', 'Ks', '2c', '2d'],
+        # Full House
+        ['As', 'Ad', 'Ah', 'Kh', 'Ks', '2c', '2d'],
+        ['3s', '3d', '3h', 'Kh', 'Ks', '2c', '2d'],
+        # Flush
+        ['3s', 'Ks', '4s', '10s', '7s', '2c', '2d'],
+        ['3s', 'Qs', '4s', '10s', '7s', '2c', '2d'],
+        # Straight
+        ['3s', '4d', '5h', '6d', '7c', '2c', '2d'],
+        ['As', '2c', '3s', '4d', '5h', '7c', '2d'],
+        # 3 of a kind
+        ['10s', '10d', '10c', 'Ah', 'Ks', '3c', '2d'],
+        ['10s', '10d', '10c', 'Ah', 'Qs', '3c', '2d'],
+        # Two Pairs
+        ['10s', '10d', 'Kh', '4c', '4c', '2h', '6d'],
+        ['10s', '10d', 'Ah', '3c', '3c', '2h', '6d'],
+        ['10s', '10d', '4h', '3c', '3c', '2h', '6d'],
+        # 2 of a kind
+        ['10s', '10d', 'Ah', '4c', '5c', '2h', '6d'],
+        ['10s', '10d', 'Kh', '3c', '5c', '2h', '6d'],
+        # High card
+        ['Qs', '10d', 'Ah', '3c', '5c', '2h', '6d'],
+        ['Qs', '10d', 'Kh', '3c', '5c', '2h', '6d'],
+    ]
+
+    def test_ranking(self):
+        card_sets = self.card_sets
+        ranks = [rank_function(c) for c in card_sets]
+        for rank, card_set in zip(ranks, card_sets):
+            print(rank, card_set)
+
+        sorted_card_sets = sorted(card_sets, key=rank_function, reverse=True)
+        self.assertListEqual(card_sets, sorted_card_sets)
+
+
+class TestEncoding(TestCase):
+    def test_roundtrip(self):
+        cards = [create_card(r, s) for r in range(2, 15) for s in suits]
+        self.assertEqual(deck, encode_cards(cards))
+        self.assertEqual(cards, decode_cards(deck))
+
+    def test_parsed_cards(self):
+        self.assertEqual(encode_cards(['As', '10d']), encode_cards(parse_cards(['10d', 'As'])))
+
+
+class TestCanonical(TestCase):
+    def test_suit_isomorphic(self):
+        self.assertEqual(canonical_cards(['Ah', 'Kh']), canonical_cards(['As', 'Ks']))
+        self.assertEqual(canonical_cards(['Ah', 'Kh'], ['2h', '7c', '9d']),
+                         canonical_cards(['Ks', 'As'], ['9c', '2s', '7d']))
+
+    def test_not_isomorphic(self):
+        self.assertNotEqual(canonical_cards(['Ah', 'Kh']), canonical_cards(['Ah', 'Kd']))
+        self.assertNotEqual(canonical_cards(['Ah', 'Kh'], ['2h', '7c', '9d']),
+                            canonical_cards(['Ah', 'Kh'], ['2c', '7h', '9d']))
+
+    def test_preserves_strength(self):
+        rng = random.Random(8)
+        for _ in range(200):
+            cards = rng.sample(deck, 7)
+            hole, board = canonical_codes(cards[:2], cards[2:])
+            self.assertEqual(evaluate(cards), evaluate(hole + board))
+
+
+class TestEvaluate(TestCase):
+    def test_ranking_order(self):
+        card_sets = TestRanking.card_sets
+        self.assertListEqual(card_sets, sorted(card_sets, key=rank_value, reverse=True))
+
+    def test_wheel(self):
+        self.assertEqual((5, 5), unpack_strength(rank_value(['As', '2c', '3s', '4d', '5h', 'Kc', 'Kd'])))
+        self.assertEqual((9, 5), unpack_strength(rank_value(['As', '2s', '3s', '4s', '5s', '6c', 'Kd'])))
+
+    def test_agrees_with_rank_function(self):
+        rng = random.Random(17)
+        for n in (1, 2, 3, 4, 5, 6, 7) * 300:
+            cards = decode_cards(rng.sample(deck, n))
+            self.assertEqual(rank_function(cards), unpack_strength(rank_value(cards)), cards)
+
+    def test_more_than_seven_cards(self):
+        # the best five card hand decides
+        rng = random.Random(20)
+        for n in (8, 9, 10, 11, 12) * 40:
+            cards = rng.sample(deck, n)
+            self.assertEqual(max(evaluate(hand) for hand in combinations(cards, 5)), evaluate(cards), cards)
+        cards = encode_cards(['2s', '3s', '4s', '6s', 'Ks', '9d', '8d', '7d', '5d', 'Kd', 'Qd'])
+        self.assertEqual((6, [13, 12, 9, 8, 7]), unpack_strength(evaluate(cards)))
+
+
+def short_deck_reference(cards):
+    """The short-deck (category, tie break) of five cards, from the Hold'em one."""
+    category, ranks = unpack_strength(evaluate(cards))
+    if sorted(c >> 2 for c in cards) == [4, 5, 6, 7, 12]:
+        return (9 if category == 6 else 5), 9
+    return {6: 7, 7: 6}.get(category, category), ranks
+
+
+class TestShortDeck(TestCase):
+    def test_deck(self):
+        self.assertEqual(36, len(SHORT_DECK))
+        self.assertEqual(['6s', 'Ah'], decode_cards([SHORT_DECK[0], SHORT_DECK[-1]]))
+
+    def test_order(self):
+        card_sets = [
+            ['Ad', '6d', '7d', '8d', '9d', 'Kc', 'Ks'],
+            ['Kd', 'Kc', 'Kh', 'Ks', '6d', '7d', '9d'],
+            ['Jd', '6d', '7d', '8d', '10d', 'Jc', 'Js'],
+            ['Jh', 'Jd', 'Jc', '6s', '6d', 'Ah', 'Kh'],
+            ['6s', '7d', '8h', '9d', '10c', 'Jc', 'Jd'],
+            ['As', '6d', '7h', '8d', '9c', '9s', '9d'],
+            ['9h', '9s', '9d', 'Ah', 'Kd', '7c', '6d'],
+        ]
+        strengths = [evaluate_short_deck(encode_cards(cards)) for cards in card_sets]
+        self.assertEqual(sorted(strengths, reverse=True), strengths)
+        self.assertEqual([9, 8, 7, 6, 5, 5, 4], [s >> 20 for s in strengths])
+        self.assertEqual((5, 9), unpack_strength(strengths[5]))
+
+    def test_agrees_with_five_card_reference(self):
+        rng = random.Random(21)
+        for n in (5, 6, 7) * 400:
+            if rng.random() < 0.3:
+                # deal one suit first to cover flushes
+                suit = rng.randrange(4)
+                cards = rng.sample([c for c in SHORT_DECK if c & 3 == suit], 5)
+                cards += rng.sample([c for c in SHORT_DECK if c not in cards], n - 5)
+            else:
+                cards = rng.sample(SHORT_DECK, n)
+            expected = max(short_deck_reference(hand) for hand in combinations(cards, 5))
+            self.assertEqual(expected, unpack_strength(evaluate_short_deck(cards)), decode_cards(cards))
+
+
+class TestHandState(TestCase):
+    def test_agrees_with_evaluate(self):
+        rng = random.Random(19)
+        for _ in range(300):
+            cards = rng.sample(deck, 9)
+            state = HandState(cards[:2])
+            for i in range(2, 8):
+                self.assertEqual(evaluate(cards[:i]), state.strength(), decode_cards(cards[:i]))
+                state.add_card(cards[i])
+            # take a card out again and put another one in, as when walking through runouts
+            state.remove_card(cards[7]).add_card(cards[8])
+            self.assertEqual(evaluate(cards[:7] + cards[8:]), state.strength())
+            self.assertEqual(sorted(cards[:7] + cards[8:]), state.cards)
+
+    def test_duplicates(self):
+        state = HandState(encode_cards(['As', 'Kd']))
+        with self.assertRaises(ValueError):
+            state.add_card(encode_cards(['As'])[0])
+        with self.assertRaises(ValueError):
+            state.remove_card(encode_cards(['Ah'])[0])
+
+    def test_copy(self):
+        state = HandState(encode_cards(['As', 'Kd']))
+        other = state.copy().add_card(encode_cards(['Ks'])[0])
+        self.assertEqual(2, len(state))
+        self.assertEqual(2, other.category())
+
+    def test_flush_draw_outs(self):
+        state = HandState(encode_cards(['As', '8s', 'Ks', '7s', '2d']))
+        outs = decode_cards(state.outs())
+        # nine spades make the flush, the other aces, kings, eights and sevens and two deuces (2s is a spade) a pair
+        self.assertEqual(9 + 4 * 3 + 2, len(outs))
+        self.assertIn('Qs', outs)
+        self.assertNotIn('Qd', outs)
+        self.assertEqual(8 + 4 * 3 + 2, len(state.outs(dead=encode_cards(['Qs']))))
+
+    def test_outs_brute_force(self):
+        rng = random.Random(23)
+        for n in (5, 6) * 100:
+            cards = rng.sample(deck, n)
+            state = HandState(cards)
+            category = evaluate(cards) >> 20
+            expected = [c for c in deck if c not in cards and evaluate(cards + [c]) >> 20 > category]
+            self.assertEqual(expected, state.outs(), decode_cards(cards))
+
+
+@skipIf(np is None, 'numpy is not installed')
+class TestRankMany(TestCase):
+    def test_ranking_order(self):
+        card_sets = TestRanking.card_sets
+        values = rank_many([encode_cards(c) for c in card_sets])
+        self.assertListEqual([rank_value(c) for c in card_sets], values.tolist())
+
+    def test_agrees_with_evaluate(self):
+        rng = random.Random(11)
+        for n in (5, 6, 7):
+            hands = [rng.sample(deck, n) for _ in range(3000)]
+            self.assertListEqual([evaluate(h) for h in hands], rank_many(hands).tolist())
+
+    def test_flushes(self):
+        hands = [[0, 8, 16, 24, 32, 1, 2], [0, 4, 8, 12, 48, 5, 9], [48, 44, 36, 32, 12, 13, 14]]
+        self.assertListEqual([evaluate(h) for h in hands], rank_many(hands).tolist())
+
+    def test_bad_shape(self):
+        with self.assertRaises(ValueError):
+            rank_many([[0, 1, 2, 3]])
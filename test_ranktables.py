@@ -0,0 +1,102 @@
+from itertools import combinations
+import random
+from unittest import TestCase, skipIf
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import ranking
+from ranktables import OmahaBoard, evaluate, evaluate_key, evaluate_many, evaluate_omaha, hand_key, rank_value
+import test_ranking
+
+
+class TestRankTables(TestCase):
+    def test_ranking_order(self):
+        card_sets = test_ranking.TestRanking.card_sets
+        self.assertListEqual(card_sets, sorted(card_sets, key=rank_value, reverse=True))
+
+    def test_agrees_with_evaluate(self):
+        rng = random.Random(3)
+        for n in (1, 2, 4, 5, 6, 7, 8) * 1000:
+            cards = rng.sample(ranking.deck, n)
+            self.assertEqual(ranking.evaluate(cards), evaluate(cards), ranking.decode_cards(cards))
+
+    @skipIf(np is None, 'numpy is not installed')
+    def test_evaluate_many(self):
+        rng = np.random.default_rng(4)
+        for n in (5, 6, 7):
+            order = np.argsort(rng.random((3000, 52)), axis=1)
+            # in a third of the hands, deal the cards of one suit first to cover flushes
+            order[:1000] = np.argsort(rng.random((1000, 52)) + (np.arange(52) & 3 != 0), axis=1)
+            hands = order[:, :n]
+            expected = [ranking.evaluate(h) for h in hands.tolist()]
+            self.assertEqual(expected, evaluate_many(hands).tolist())
+            self.assertEqual(expected[:10], evaluate_many(hands[:10].reshape(2, 5, n)).ravel().tolist())
+
+    def test_incremental_key(self):
+        rng = random.Random(9)
+        for _ in range(1000):
+            cards = rng.sample(ranking.deck, 7)
+            key = hand_key(cards[2:], hand_key(cards[:2]))
+            self.assertEqual(hand_key(cards), key)
+            self.assertEqual(evaluate(cards), evaluate_key(key, cards))
+
+    def test_flushes(self):
+        rng = random.Random(5)
+        for n in (5, 6, 7) * 300:
+            suit = rng.randrange(4)
+            cards = [4 * r + suit for r in rng.sample(range(13), 5)]
+            cards += rng.sample([c for c in ranking.deck if c not in cards], n - 5)
+            self.assertEqual(ranking.evaluate(cards), evaluate(cards), ranking.decode_cards(cards))
+
+
+def omaha_brute_force(hole, board):
+    return max(ranking.evaluate(pair + triple) for pair in combinations(hole, 2) for triple in combinations(board, 3))
+
+
+class TestOmaha(TestCase):
+    def test_agrees_with_brute_force(self):
+        rng = random.Random(21)
+        for board_size in (3, 4, 5):
+            for _ in range(300):
+                cards = rng.sample(ranking.deck, 4 + board_size)
+                hole, board = cards[:4], cards[4:]
+                self.assertEqual(omaha_brute_force(hole, board), evaluate_omaha(hole, board),
+                                 (ranking.decode_cards(hole), ranking.decode_cards(board)))
+
+    def test_suited_and_paired_boards(self):
+        rng = random.Random(22)
+        for _ in range(300):
+            # three or more cards of one suit, or a pair, on the board, and suited or paired holdings
+            suit = rng.randrange(4)
+            board = [4 * r + suit for r in rng.sample(range(13), rng.randint(3, 5))][:5]
+            if rng.random() < 0.5:
+                board[-1] = board[0] ^ 1
+            hole = rng.sample([c for c in ranking.deck if c not in board and c & 3 in (suit, suit ^ 1)], 4)
+            self.assertEqual(omaha_brute_force(hole, board), evaluate_omaha(hole, board),
+                             (ranking.decode_cards(hole), ranking.decode_cards(board)))
+
+    def test_exactly_two_hole_cards(self):
+        board = ranking.encode_cards(['As', 'Ks', 'Qs', 'Js', '2d'])
+        # a single ten of spades makes neither the royal flush nor a straight with four board cards
+        hole = ranking.encode_cards(['10s', '3h', '3c', '4h'])
+        self.assertEqual((2, [3, 14, 13, 12]), ranking.unpack_strength(evaluate_omaha(hole, board)))
+        # the royal flush would take four board cards, K-Q-J and the two spades make the king high straight flush
+        hole = ranking.encode_cards(['10s', '9s', '3c', '4h'])
+        self.assertEqual((9, 13), ranking.unpack_strength(evaluate_omaha(hole, board)))
+
+    def test_board_reuse(self):
+        rng = random.Random(23)
+        cards = rng.sample(ranking.deck, 5 + 4 * 10)
+        board = OmahaBoard(cards[:5])
+        for i in range(5, len(cards), 4):
+            hole = cards[i:i + 4]
+            self.assertEqual(omaha_brute_force(hole, cards[:5]), board.evaluate(hole))
+
+    def test_bad_sizes(self):
+        with self.assertRaises(ValueError):
+            OmahaBoard([0, 1])
+        with self.assertRaises(ValueError):
+            evaluate_omaha([0], [4, 8, 12])
@@ -0,0 +1,66 @@
+from unittest import TestCase
+
+import ranking
+from tablestate import Event, TableState
+
+
+class TestTableState(TestCase):
+    def status(self, **kwargs):
+        status = {'players': {'1': 'a', '2': 'me'}, 'current_player': 'a', 'hand_id': 1,
+                  'hole_cards': ['As', 'Kd'], 'community_cards': [], 'bets': {'a': 1, 'me': 2}}
+        status.update(kwargs)
+        return status
+
+    def kinds(self, events):
+        return [e.kind for e in events]
+
+    def test_first_status(self):
+        state = TableState('me')
+        events = state.apply(self.status())
+        self.assertEqual(['joined', 'joined', 'new_hand', 'hole_cards', 'bet', 'bet'], self.kinds(events))
+        self.assertEqual(ranking.encode_cards(['As', 'Kd']), state.hole_codes)
+        self.assertEqual('preflop', state.street)
+        self.assertEqual(0, state.to_call())
+
+    def test_unchanged(self):
+        state = TableState('me')
+        status = self.status()
+        state.apply(status)
+        self.assertEqual([], state.apply(status))
+        self.assertEqual([], state.apply(self.status()))
+
+    def test_betting_round(self):
+        state = TableState('me')
+        state.apply(self.status())
+        events = state.apply(self.status(bets={'a': 6, 'me': 2}, current_player='me'))
+        self.assertEqual([Event('bet', 'a', 6), Event('our_turn', 'me')], events)
+        self.assertEqual(4, state.to_call())
+
+    def test_streets(self):
+        state = TableState('me')
+        state.apply(self.status())
+        events = state.apply(self.status(community_cards=['2c', '3c', '4c'], bets={}))
+        self.assertEqual([Event('board', value=['2c', '3c', '4c'])], events)
+        events = state.apply(self.status(community_cards=['2c', '3c', '4c', '5c'], bets={}))
+        self.assertEqual([Event('board', value=['5c'])], events)
+        self.assertEqual(ranking.encode_cards(['2c', '3c', '4c', '5c']), state.board_codes)
+        self.assertEqual('turn', state.street)
+        self.assertEqual(ranking.evaluate(state.hole_codes + state.board_codes), state.hand.strength())
+        self.assertEqual(5, state.hand.category())
+
+    def test_new_hand(self):
+        state = TableState('me')
+        state.apply(self.status(community_cards=['2c', '3c', '4c']))
+        events = state.apply(self.status(hand_id=2, hole_cards=['7h', '7d']))
+        self.assertEqual(['new_hand', 'hole_cards', 'bet', 'bet'], self.kinds(events))
+        self.assertEqual([], state.board)
+        self.assertEqual(2, state.hand_count)
+        self.assertEqual(sorted(ranking.encode_cards(['7h', '7d'])), state.hand.cards)
+
+    def test_folds_and_listeners(self):
+        state = TableState('me')
+        seen = []
+        state.subscribe('fold', seen.append)
+        state.apply(self.status(active_players=['a', 'me']))
+        state.apply(self.status(active_players=['me']))
+        self.assertEqual([Event('fold', 'a')], seen)